@@ -0,0 +1,24 @@
+"""
+Runs against the database configured in config.ini, like the bot itself.
+"""
+from tg_bot.modules.sql import cleaner_sql
+
+CHAT_ID = -1001234567890
+
+
+def test_cleaner_cache_keys_round_trip_as_int():
+    cleaner_sql.chat_ignore_command(CHAT_ID, "roundtrip")
+    try:
+        # rebuild the cache from the rows, as a restart would
+        cleaner_sql.CLEANER_CHATS.clear()
+        cleaner_sql.__load_cleaner_list()
+
+        assert CHAT_ID in cleaner_sql.CLEANER_CHATS
+        assert str(CHAT_ID) not in cleaner_sql.CLEANER_CHATS
+        assert cleaner_sql.is_command_ignored(CHAT_ID, "roundtrip")
+        assert cleaner_sql.is_command_ignored(str(CHAT_ID), "RoundTrip")
+        assert "roundtrip" in cleaner_sql.get_all_ignored(CHAT_ID)[1]
+    finally:
+        cleaner_sql.chat_unignore_command(CHAT_ID, "roundtrip")
+
+    assert not cleaner_sql.is_command_ignored(CHAT_ID, "roundtrip")
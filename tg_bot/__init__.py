@@ -3,7 +3,6 @@ import sys
 import time
 import os
 from typing import List
-from redis import Redis
 from configparser import ConfigParser
 from logging.handlers import RotatingFileHandler
 from dataclasses import dataclass
@@ -78,6 +77,8 @@ class KigyoINIT:
         self.BAN_STICKER: str = self.parser.get("BAN_STICKER", None)
         self.TOKEN: str = self.parser.get("TOKEN")
         self.DB_URI: str = self.parser.get("SQLALCHEMY_DATABASE_URI")
+        self.DB_REPLICA_URIS: List[str] = self.parser.get("SQLALCHEMY_REPLICA_URIS", "").split()
+        self.DB_READ_YOUR_WRITES: float = self.parser.getfloat("DB_READ_YOUR_WRITES", 5.0)
         self.LOAD: List[str] = self.parser.get("LOAD", "").split()
         self.MESSAGE_DUMP: int = self.parser.getint("MESSAGE_DUMP", None)
         self.GBAN_LOGS: int = self.parser.getint("GBAN_LOGS", None)
@@ -100,10 +101,29 @@ class KigyoINIT:
         self.POSTGRES_MAX_OVERFLOW: int = self.parser.getint("POSTGRES_MAX_OVERFLOW", 10)
         self.POSTGRES_POOL_TIMEOUT: int = self.parser.getint("POSTGRES_POOL_TIMEOUT", 30)
         self.POSTGRES_POOL_RECYCLE: int = self.parser.getint("POSTGRES_POOL_RECYCLE", 1800)
+        self.POSTGRES_POOL_PRE_PING: bool = self.parser.getboolean("POSTGRES_POOL_PRE_PING", False)
+        self.POSTGRES_POOL_ADAPTIVE: bool = self.parser.getboolean("POSTGRES_POOL_ADAPTIVE", False)
+        self.METRICS_HOST: str = self.parser.get("METRICS_HOST", "127.0.0.1")
+        self.METRICS_PORT: int = self.parser.getint("METRICS_PORT", 0)
+        self.SQL_WORKERS: int = self.parser.getint("SQL_WORKERS", 4)
+        self.FANOUT_CONCURRENCY: int = self.parser.getint("FANOUT_CONCURRENCY", 8)
+        self.FANOUT_RATE: float = self.parser.getfloat("FANOUT_RATE", 25.0)
+        self.QUERY_CACHE_SIZE: int = self.parser.getint("QUERY_CACHE_SIZE", 2048)
+        self.QUERY_CACHE_TTL: int = self.parser.getint("QUERY_CACHE_TTL", 300)
+        self.QUERY_CACHE_MB: int = self.parser.getint("QUERY_CACHE_MB", 32)
+        self.LAZY_LOADERS: List[str] = self.parser.get("LAZY_LOADERS", "").split()
+        self.BIGINT_CHAT_IDS: bool = self.parser.getboolean("BIGINT_CHAT_IDS", False)
         self.REDIS_HOST: str = self.parser.get("REDIS_HOST", "localhost")
         self.REDIS_PORT: int = self.parser.getint("REDIS_PORT", 6379)
         self.REDIS_DB: int = self.parser.getint("REDIS_DB", 0)
         self.REDIS_PASSWORD: str = self.parser.get("REDIS_PASSWORD", None)
+        self.REDIS_MAX_CONNECTIONS: int = self.parser.getint("REDIS_MAX_CONNECTIONS", 32)
+        self.REDIS_SOCKET_TIMEOUT: float = self.parser.getfloat("REDIS_SOCKET_TIMEOUT", 1.0)
+        self.REDIS_SOCKET_KEEPALIVE: bool = self.parser.getboolean("REDIS_SOCKET_KEEPALIVE", True)
+        self.REDIS_HEALTH_CHECK_INTERVAL: int = self.parser.getint("REDIS_HEALTH_CHECK_INTERVAL", 30)
+        self.REDIS_CLIENT_CACHE: bool = self.parser.getboolean("REDIS_CLIENT_CACHE", False)
+        self.REDIS_CLIENT_CACHE_SIZE: int = self.parser.getint("REDIS_CLIENT_CACHE_SIZE", 10000)
+        self.FLOOD_REDIS: bool = self.parser.getboolean("FLOOD_REDIS", False)
 
 
 KInit = KigyoINIT(parser=kigconfig)
@@ -145,9 +165,12 @@ REDIS_HOST = KInit.REDIS_HOST
 REDIS_PORT = KInit.REDIS_PORT
 REDIS_PASSWORD = KInit.REDIS_PASSWORD
 REDIS_DB = KInit.REDIS_DB
+FLOOD_REDIS = KInit.FLOOD_REDIS
 STANZA_REFRESH_TOKEN = KInit.STANZA_REFRESH_TOKEN
 # Configure Redis connection
-redis_conn = Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, db=REDIS_DB)
+from tg_bot.modules.helper_funcs.redis_pool import get_redis  # noqa: E402
+
+redis_conn = get_redis()
 
 # Test Redis connection
 try:
@@ -38,7 +38,10 @@ from tg_bot import (
 )
 
 # NEW: ensure we insert the bot into DB after init
-from tg_bot.modules.sql.users_sql import ensure_bot_in_db_app
+from tg_bot.modules.sql import warm_caches
+from tg_bot.modules.sql.index_audit import ensure_indexes
+from tg_bot.modules.helper_funcs.metrics import start_metrics_server
+from tg_bot.modules.sql.users_sql import ensure_bot_in_db_app, flush_user_buffer
 
 # needed to dynamically load modules
 # NOTE: Module order is not guaranteed, specify that in the config file!
@@ -590,6 +593,9 @@ async def _post_init(app: Application):
     # Ensure bot is present in DB (PTB 20+ safe place)
     await ensure_bot_in_db_app(app)
 
+    # Prometheus endpoint, only when METRICS_PORT is set
+    await start_metrics_server()
+
     logging.info(f"Spiral initialized. BOT: [@{me.username}]")
 
 async def _graceful_shutdown():
@@ -597,8 +603,20 @@ async def _graceful_shutdown():
         await application.stop()
     with suppress(Exception):
         await application.shutdown()
+    # write out users/chats still sitting in the write-behind buffer
+    with suppress(Exception):
+        flush_user_buffer()
 
 def main():
+    # Build indexes declared after their tables were first created
+    try:
+        ensure_indexes()
+    except Exception:
+        logging.exception("Could not create missing indexes")
+
+    # Fill the in-memory caches of every loaded *_sql module
+    warm_caches()
+
     # Post-init hook
     application.post_init = _post_init
 
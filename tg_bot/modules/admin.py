@@ -12,6 +12,7 @@ from tg_bot.modules.helper_funcs.chat_status import (
     can_pin,
     can_promote,
     connection_status,
+    get_bot_member,
 )
 from tg_bot.modules.helper_funcs.decorators import kigcmd, rate_limit
 from tg_bot.modules.helper_funcs.extraction import extract_user, extract_user_and_text
@@ -56,7 +57,7 @@ async def promote(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optiona
         return
 
     # set same perms as bot - bot can't assign higher perms than itself!
-    bot_member = await chat.get_member(bot.id)
+    bot_member = await get_bot_member(chat, bot.id)
 
     try:
         await bot.promote_chat_member(
@@ -319,7 +320,7 @@ async def invite(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.username:
         await update.effective_message.reply_text(f"https://t.me/{chat.username}")
     elif chat.type in (ChatType.SUPERGROUP, ChatType.CHANNEL):
-        bot_member = await chat.get_member(bot.id)
+        bot_member = await get_bot_member(chat, bot.id)
         if getattr(bot_member, "can_invite_users", False):
             invitelink = await bot.export_chat_invite_link(chat.id)
             await update.effective_message.reply_text(invitelink)
@@ -6,6 +6,7 @@ from telegram.constants import ParseMode
 from telegram.ext import ContextTypes, ChatMemberHandler
 import tg_bot.modules.sql.log_channel_sql as logsql
 from tg_bot import dispatcher
+from tg_bot.modules.helper_funcs.chat_status import update_bot_member
 from tg_bot.modules.log_channel import loggable
 
 import tg_bot.modules.sql.logger_sql as sql
@@ -340,3 +341,17 @@ async def chatmemberupdates(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 return log_message
 
     return ""
+
+
+async def botmemberupdates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # keep the shared bot-permission cache in sync with our own promotions/demotions
+    if update.my_chat_member:
+        update_bot_member(update.effective_chat.id, update.my_chat_member.new_chat_member)
+
+
+BOT_MEMBER_GROUP = -20
+
+dispatcher.add_handler(
+    ChatMemberHandler(botmemberupdates, ChatMemberHandler.MY_CHAT_MEMBER),
+    group=BOT_MEMBER_GROUP,
+)
@@ -16,16 +16,15 @@ from telegram.ext import ContextTypes, filters
 from telegram.helpers import mention_html
 
 from tg_bot import SARDEGNA_USERS, WHITELIST_USERS
-from tg_bot.modules.sql.approve_sql import is_approved
 from tg_bot.modules.helper_funcs.chat_status import (
     bot_admin,
     can_restrict,
     connection_status,
-    is_user_admin,
     user_admin_no_reply,
 )
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 from tg_bot.modules.log_channel import loggable
-from tg_bot.modules.sql import antiflood_sql as sql
+from tg_bot.modules.sql import antiflood_sql as sql, run_blocking
 from tg_bot.modules.helper_funcs.string_handling import extract_time
 from tg_bot.modules.connection import connected
 from tg_bot.modules.helper_funcs.alternate import send_message
@@ -48,17 +47,19 @@ async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Opt
     if not user or not chat or not msg:  # ignore channels or invalid updates
         return ""
 
+    mod_ctx = get_moderation_context(update, context)
+
     # ignore admins and whitelists
     if (
-        await is_user_admin(update, user.id)
-        or user.id in WHITELIST_USERS
+        user.id in WHITELIST_USERS
         or user.id in SARDEGNA_USERS
+        or await mod_ctx.is_admin()
     ):
         sql.update_flood(chat.id, None)
         return ""
 
     # ignore approved users
-    if is_approved(chat.id, user.id):
+    if mod_ctx.is_approved:
         sql.update_flood(chat.id, None)
         return ""
 
@@ -118,7 +119,7 @@ async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Opt
         await msg.reply_text(
             "I can't restrict people here, give me permissions first! Until then, I'll disable anti-flood."
         )
-        sql.set_flood(chat.id, 0)
+        await run_blocking(sql.set_flood, chat.id, 0)
         return (
             "<b>{}:</b>"
             "\n#INFO"
@@ -200,7 +201,7 @@ async def set_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     if len(args) >= 1:
         val = args[0].lower()
         if val in ["off", "no", "0"]:
-            sql.set_flood(chat_id, 0)
+            await run_blocking(sql.set_flood, chat_id, 0)
             if conn:
                 await message.reply_text(f"Antiflood has been disabled in {chat_name}.")
             else:
@@ -209,7 +210,7 @@ async def set_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
         elif val.isdigit():
             amount = int(val)
             if amount <= 0:
-                sql.set_flood(chat_id, 0)
+                await run_blocking(sql.set_flood, chat_id, 0)
                 if conn:
                     await message.reply_text(f"Antiflood has been disabled in {chat_name}.")
                 else:
@@ -231,14 +232,25 @@ async def set_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
                 return ""
 
             else:
-                sql.set_flood(chat_id, amount)
+                window = 0
+                if len(args) >= 2:
+                    window = args[1].lower().rstrip("s")
+                    if not window.isdigit() or not 0 < int(window) <= sql.FLOOD_TTL:
+                        await message.reply_text(
+                            f"The time window must be between 1 and {sql.FLOOD_TTL} seconds."
+                        )
+                        return ""
+                    window = int(window)
+
+                setting = f"{amount} in {window}s" if window else str(amount)
+                await run_blocking(sql.set_flood, chat_id, amount, window)
                 if conn:
                     await message.reply_text(
-                        f"Anti-flood has been set to {amount} in chat: {chat_name}"
+                        f"Anti-flood has been set to {setting} in chat: {chat_name}"
                     )
                 else:
                     await message.reply_text(
-                        f"Successfully updated anti-flood limit to {amount}!"
+                        f"Successfully updated anti-flood limit to {setting}!"
                     )
                 return (
                     "<b>{}:</b>"
@@ -247,7 +259,7 @@ async def set_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
                     "\nSet antiflood to <code>{}</code>.".format(
                         html.escape(chat_name),
                         mention_html(user.id, user.first_name),
-                        amount,
+                        setting,
                     ),
                 )
 
@@ -255,7 +267,7 @@ async def set_flood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
             await message.reply_text("Invalid argument please use a number, 'off' or 'no'")
     else:
         await message.reply_text(
-            "Use <code>/setflood number</code> to enable antiflood.\n"
+            "Use <code>/setflood number [seconds]</code> to enable antiflood.\n"
             "Or use <code>/setflood off</code> to disable antiflood!.",
             parse_mode=ParseMode.HTML,
         )
@@ -288,6 +300,12 @@ async def flood(update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_name = update.effective_message.chat.title
 
     limit = sql.get_flood_limit(chat_id)
+    window = sql.get_flood_window(chat_id)
+    setting = (
+        f"{limit} messages within {window} seconds"
+        if window
+        else f"{limit} consecutive messages"
+    )
     if limit == 0:
         if conn:
             await msg.reply_text(f"I'm not enforcing any flood control in {chat_name}!")
@@ -295,11 +313,11 @@ async def flood(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await msg.reply_text("I'm not enforcing any flood control here!")
     elif conn:
         await msg.reply_text(
-            f"I'm currently restricting members after {limit} consecutive messages in {chat_name}."
+            f"I'm currently restricting members after {setting} in {chat_name}."
         )
     else:
         await msg.reply_text(
-            f"I'm currently restricting members after {limit} consecutive messages."
+            f"I'm currently restricting members after {setting}."
         )
 
 
@@ -416,8 +434,13 @@ def __migrate__(old_chat_id, new_chat_id):
 
 def __chat_settings__(chat_id, user_id):
     limit = sql.get_flood_limit(chat_id)
+    window = sql.get_flood_window(chat_id)
     if limit == 0:
         return "Not enforcing flood control."
+    elif window:
+        return "Antiflood has been set to <code>{}</code> in <code>{}s</code>.".format(
+            limit, window
+        )
     else:
         return "Antiflood has been set to <code>{}</code>.".format(limit)
 
@@ -1,14 +1,16 @@
 import html
 import time
 from datetime import datetime
+from functools import partial
 from io import BytesIO
 
 from telegram import Update, ChatMemberBanned
 from telegram.constants import ParseMode, ChatMemberStatus, ChatType
-from telegram.error import BadRequest, TelegramError
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes, filters
 from telegram.helpers import mention_html
 
+from tg_bot.modules.sql import fanout_sql, run_blocking
 from tg_bot.modules.sql.users_sql import get_user_com_chats
 import tg_bot.modules.sql.antispam_sql as sql
 from tg_bot import (
@@ -23,11 +25,14 @@ from tg_bot import (
     log,
 )
 from tg_bot.modules.helper_funcs.chat_status import (
+    bot_has_right,
     is_user_admin,
     support_plus,
 )
 from tg_bot.modules.helper_funcs.extraction import extract_user, extract_user_and_text
+from tg_bot.modules.helper_funcs.fanout import FanOut
 from tg_bot.modules.helper_funcs.misc import send_to_list
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 from tg_bot.modules.helper_funcs.decorators import kigcmd, kigmsg
 
 from ..modules.helper_funcs.anonymous import user_admin, AdminPerms
@@ -63,6 +68,155 @@ UNGBAN_ERRORS = {
 }
 
 
+def _gban_targets(user_id):
+    return sorted(sql.gban_enforcing_chats(get_user_com_chats(user_id)))
+
+
+async def _report_progress(bot, payload, result):
+    if payload["log_msg_id"]:
+        await bot.edit_message_text(
+            payload["log_message"] + f"\n<b>Progress:</b> <code>{result.done}/{result.total}</code>",
+            chat_id=GBAN_LOGS,
+            message_id=payload["log_msg_id"],
+            parse_mode=ParseMode.HTML,
+        )
+
+
+async def _fan_out(bot, kind, payload, call, errors, start, affected):
+    """
+    Runs call over the user's gban-enforcing chats as a resumable fan-out
+    job. The chat list is stored with the job when it starts, so a resumed
+    job continues over exactly the list its cursor indexes.
+    """
+    job_id = f"{kind}:{payload['user_id']}"
+    if not start:
+        payload["targets"] = await run_blocking(_gban_targets, payload["user_id"])
+        await run_blocking(fanout_sql.start_job, job_id, kind, payload)
+
+    def on_error(chat_id, excp):
+        # abort on the first BadRequest that is not an expected per-chat failure
+        return isinstance(excp, BadRequest) and excp.message not in errors
+
+    fanout = FanOut(
+        payload["targets"],
+        call,
+        on_error=on_error,
+        on_progress=partial(_report_progress, bot, payload),
+        job_id=job_id,
+        start=start,
+        affected=affected,
+    )
+    return await fanout.run()
+
+
+async def _run_gban(bot, payload, start=0, affected=0):
+    user_id = payload["user_id"]
+
+    async def ban(chat_id):
+        await bot.ban_chat_member(chat_id, user_id)
+        return True
+
+    return await _fan_out(bot, "gban", payload, ban, GBAN_ERRORS, start, affected)
+
+
+async def _run_ungban(bot, payload, start=0, affected=0):
+    user_id = payload["user_id"]
+
+    async def unban(chat_id):
+        member = await bot.get_chat_member(chat_id, user_id)
+        if isinstance(member, ChatMemberBanned):
+            await bot.unban_chat_member(chat_id, user_id)
+            return True
+        return False
+
+    return await _fan_out(bot, "ungban", payload, unban, UNGBAN_ERRORS, start, affected)
+
+
+async def _gban_failed(bot, payload, result):
+    if GBAN_LOGS:
+        await bot.send_message(
+            GBAN_LOGS,
+            f"Could not gban due to {result.error.message}",
+            parse_mode=ParseMode.HTML,
+        )
+    else:
+        await send_to_list(
+            bot,
+            SUDO_USERS + SUPPORT_USERS,
+            f"Could not gban due to: {result.error.message}",
+        )
+    sql.ungban_user(payload["user_id"])
+
+
+async def _gban_finished(bot, payload, result):
+    if GBAN_LOGS:
+        await bot.edit_message_text(
+            payload["log_message"] + f"\n<b>Chats affected:</b> <code>{result.affected}</code>",
+            chat_id=GBAN_LOGS,
+            message_id=payload["log_msg_id"],
+            parse_mode=ParseMode.HTML,
+        )
+    else:
+        await send_to_list(
+            bot,
+            SUDO_USERS + SUPPORT_USERS,
+            f"Gban complete! (User banned in <code>{result.affected}</code> chats)",
+            html=True,
+        )
+
+
+async def _ungban_failed(bot, result):
+    if GBAN_LOGS:
+        await bot.send_message(
+            GBAN_LOGS,
+            f"Could not un-gban due to: {result.error.message}",
+            parse_mode=ParseMode.HTML,
+        )
+    else:
+        await bot.send_message(OWNER_ID, f"Could not un-gban due to: {result.error.message}")
+
+
+async def _ungban_finished(bot, payload, result):
+    sql.ungban_user(payload["user_id"])
+
+    if GBAN_LOGS:
+        await bot.edit_message_text(
+            payload["log_message"] + f"\n<b>Chats affected:</b> {result.affected}",
+            chat_id=GBAN_LOGS,
+            message_id=payload["log_msg_id"],
+            parse_mode=ParseMode.HTML,
+        )
+    else:
+        await send_to_list(bot, SUDO_USERS + SUPPORT_USERS, "un-gban complete!")
+
+
+async def resume_gban_jobs(context: ContextTypes.DEFAULT_TYPE):
+    """Finishes gbans and ungbans that a restart interrupted."""
+    bot = context.bot
+    for job in await run_blocking(fanout_sql.get_jobs, "gban", "ungban"):
+        payload = job["payload"]
+        # both kinds run while the user is gbanned, as ungban is recorded
+        # only after its sweep; if they no longer are, an ungban already
+        # finished and the job is stale
+        if not sql.is_user_gbanned(payload["user_id"]):
+            log.info(f"[Antispam] Dropping stale {job['job_id']}")
+            await run_blocking(fanout_sql.finish_job, job["job_id"])
+            continue
+        log.info(f"[Antispam] Resuming {job['job_id']} at chat {job['cursor']}")
+        if job["kind"] == "gban":
+            result = await _run_gban(bot, payload, job["cursor"], job["affected"])
+            if result.aborted:
+                await _gban_failed(bot, payload, result)
+            else:
+                await _gban_finished(bot, payload, result)
+        else:
+            result = await _run_ungban(bot, payload, job["cursor"], job["affected"])
+            if result.aborted:
+                await _ungban_failed(bot, result)
+            else:
+                await _ungban_finished(bot, payload, result)
+
+
 @kigcmd(command="gban")
 @support_plus
 async def gban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # sourcery no-metrics
@@ -171,51 +325,17 @@ async def gban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # sourcery
 
     sql.gban_user(user_id, user_chat.username or user_chat.first_name, reason)
 
-    chats = get_user_com_chats(user_id)
-    gbanned_chats = 0
-
-    for _chat in chats:
-        chat_id = int(_chat)
-
-        # Check if this group has disabled gbans
-        if not sql.does_chat_gban(chat_id):
-            continue
-
-        try:
-            await bot.ban_chat_member(chat_id, user_id)
-            gbanned_chats += 1
-        except BadRequest as excp:
-            if excp.message not in GBAN_ERRORS:
-                await message.reply_text(f"Could not gban due to: {excp.message}")
-                if GBAN_LOGS:
-                    await bot.send_message(
-                        GBAN_LOGS,
-                        f"Could not gban due to {excp.message}",
-                        parse_mode=ParseMode.HTML,
-                    )
-                else:
-                    await send_to_list(
-                        bot,
-                        SUDO_USERS + SUPPORT_USERS,
-                        f"Could not gban due to: {excp.message}",
-                    )
-                sql.ungban_user(user_id)
-                return
-        except TelegramError:
-            pass
-
-    if GBAN_LOGS:
-        await log_msg.edit_text(
-            log_message + f"\n<b>Chats affected:</b> <code>{gbanned_chats}</code>",
-            parse_mode=ParseMode.HTML,
-        )
-    else:
-        await send_to_list(
-            bot,
-            SUDO_USERS + SUPPORT_USERS,
-            f"Gban complete! (User banned in <code>{gbanned_chats}</code> chats)",
-            html=True,
-        )
+    payload = {
+        "user_id": user_id,
+        "log_message": log_message,
+        "log_msg_id": log_msg.message_id if GBAN_LOGS else None,
+    }
+    result = await _run_gban(bot, payload)
+    if result.aborted:
+        await message.reply_text(f"Could not gban due to: {result.error.message}")
+        await _gban_failed(bot, payload, result)
+        return
+    await _gban_finished(bot, payload, result)
 
     end_time = time.time()
     gban_time = round((end_time - start_time), 2)
@@ -290,48 +410,17 @@ async def ungban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # sourcer
     else:
         await send_to_list(bot, SUDO_USERS + SUPPORT_USERS, log_message, html=True)
 
-    chats = get_user_com_chats(user_id)
-    ungbanned_chats = 0
-
-    for _chat in chats:
-        chat_id = int(_chat)
-
-        # Check if this group has disabled gbans
-        if not sql.does_chat_gban(chat_id):
-            continue
-
-        try:
-            member = await bot.get_chat_member(chat_id, user_id)
-            if isinstance(member, ChatMemberBanned):
-                await bot.unban_chat_member(chat_id, user_id)
-                ungbanned_chats += 1
-
-        except BadRequest as excp:
-            if excp.message not in UNGBAN_ERRORS:
-                await message.reply_text(f"Could not un-gban due to: {excp.message}")
-                if GBAN_LOGS:
-                    await bot.send_message(
-                        GBAN_LOGS,
-                        f"Could not un-gban due to: {excp.message}",
-                        parse_mode=ParseMode.HTML,
-                    )
-                else:
-                    await bot.send_message(
-                        OWNER_ID, f"Could not un-gban due to: {excp.message}"
-                    )
-                return
-        except TelegramError:
-            pass
-
-    sql.ungban_user(user_id)
-
-    if GBAN_LOGS:
-        await log_msg.edit_text(
-            log_message + f"\n<b>Chats affected:</b> {ungbanned_chats}",
-            parse_mode=ParseMode.HTML,
-        )
-    else:
-        await send_to_list(context.bot, SUDO_USERS + SUPPORT_USERS, "un-gban complete!")
+    payload = {
+        "user_id": user_id,
+        "log_message": log_message,
+        "log_msg_id": log_msg.message_id if GBAN_LOGS else None,
+    }
+    result = await _run_ungban(bot, payload)
+    if result.aborted:
+        await message.reply_text(f"Could not un-gban due to: {result.error.message}")
+        await _ungban_failed(bot, result)
+        return
+    await _ungban_finished(bot, payload, result)
 
     end_time = time.time()
     ungban_time = round((end_time - start_time), 2)
@@ -396,17 +485,13 @@ async def enforce_gban(update: Update, context: ContextTypes.DEFAULT_TYPE):
     bot = context.bot
     chat = update.effective_chat
 
-    try:
-        bot_member = await chat.get_member(bot.id)
-        can_restrict = getattr(bot_member, "can_restrict_members", False)
-    except Exception:
-        can_restrict = False
-
-    if sql.does_chat_gban(chat.id) and can_restrict:
+    if sql.does_chat_gban(chat.id) and await bot_has_right(
+        chat, bot.id, "can_restrict_members"
+    ):
         user = update.effective_user
         msg = update.effective_message
 
-        if user and not await is_user_admin(update, user.id):
+        if user and not await get_moderation_context(update, context).is_admin():
             await check_and_ban(update, context, user.id)
             return
 
@@ -490,6 +575,11 @@ def __chat_settings__(chat_id, user_id):
     return "This chat is enforcing gbans: <code>{}</code>.".format(sql.does_chat_gban(chat_id))
 
 
+if application.job_queue:
+    # give the bot a moment to come up before picking interrupted jobs back up
+    application.job_queue.run_once(resume_gban_jobs, 15)
+
+
 from tg_bot.modules.language import gs
 
 
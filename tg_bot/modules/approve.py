@@ -190,10 +190,7 @@ async def unapproveall_btn(update: Update, _: ContextTypes.DEFAULT_TYPE):
 
     if query.data == "unapproveall_user":
         if member.status == ChatMemberStatus.OWNER or query.from_user.id in SUDO_USERS:
-            approved_users = sql.list_approved(chat.id)
-            users = [int(i.user_id) for i in approved_users]
-            for user_id in users:
-                sql.disapprove(chat.id, user_id)
+            sql.disapprove_all(chat.id)
             await message.edit_text("All approved users have been unapproved.")
         elif member.status == ChatMemberStatus.ADMINISTRATOR:
             await query.answer("Only owner of the chat can do this.")
@@ -210,6 +207,10 @@ async def unapproveall_btn(update: Update, _: ContextTypes.DEFAULT_TYPE):
             await query.answer("You need to be admin to do this.")
 
 
+def __migrate__(old_chat_id, new_chat_id):
+    sql.migrate_chat(old_chat_id, new_chat_id)
+
+
 from tg_bot.modules.language import gs
 
 
@@ -114,7 +114,9 @@ async def import_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         try:
             for mod in _data_import_modules():
-                mod.__import_data__(int(chat.id), data)
+                imported = mod.__import_data__(int(chat.id), data)
+                if inspect.isawaitable(imported):
+                    await imported
         except Exception:
             await msg.reply_text(
                 "An error occurred while recovering your data. The process failed. If you experience a problem with this, please take it to @spiralsupport",
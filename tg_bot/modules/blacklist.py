@@ -1,5 +1,4 @@
 import html
-import re
 
 from telegram import ChatPermissions
 from telegram.constants import ParseMode
@@ -7,11 +6,10 @@ from telegram.error import BadRequest
 from telegram.ext import filters
 from telegram.helpers import mention_html
 
-from tg_bot.modules.sql.approve_sql import is_approved
 import tg_bot.modules.sql.blacklist_sql as sql
 from tg_bot import log
 from tg_bot.modules.helper_funcs.chat_status import user_admin as u_admin, user_not_admin
-from tg_bot.modules.helper_funcs.extraction import extract_text
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 from tg_bot.modules.helper_funcs.misc import split_message
 from tg_bot.modules.log_channel import loggable
 from tg_bot.modules.warns import warn
@@ -98,12 +96,19 @@ async def add_blacklist(update, context):
             {
                 trigger.strip()
                 for trigger in text.split("\n")
-                if trigger.strip()
+                # a trigger of only wildcards would match every message
+                if trigger.strip().strip("*")
             }
         )
+        if not to_blacklist:
+            await send_message(
+                update.effective_message,
+                "Blacklist triggers need at least one character besides <code>*</code>.",
+                parse_mode=ParseMode.HTML,
+            )
+            return
 
-        for trigger in to_blacklist:
-            sql.add_to_blacklist(chat_id, trigger.lower())
+        sql.add_many_to_blacklist(chat_id, (trigger.lower() for trigger in to_blacklist))
 
         if len(to_blacklist) == 1:
             await send_message(
@@ -360,95 +365,92 @@ async def del_blacklist(update, context):  # sourcery no-metrics
     message = update.effective_message
     user = update.effective_user
     bot = context.bot
-    to_match = extract_text(message)
+    mod_ctx = get_moderation_context(update, context)
+    to_match = mod_ctx.text
     if not to_match:
         return
-    if is_approved(chat.id, user.id):
+    if mod_ctx.is_approved:
         return
-    getmode, value = sql.get_blacklist_setting(chat.id)
-
-    chat_filters = sql.get_chat_blacklist(chat.id)
-    for trigger in chat_filters:
-        pattern = r"( |^|[^\w])" + re.escape(trigger) + r"( |$|[^\w])"
-        if re.search(pattern, to_match, flags=re.IGNORECASE):
-            try:
-                if getmode == 0:
-                    return
-                elif getmode == 1:
-                    await message.delete()
-                elif getmode == 2:
-                    await message.delete()
-                    warn(
-                        update.effective_user,
-                        update,
-                        ("Using blacklisted trigger: {}".format(trigger)),
-                        message,
-                        update.effective_user,
-                    )
-                    return
-                elif getmode == 3:
-                    await message.delete()
-                    await bot.restrict_chat_member(
-                        chat.id,
-                        update.effective_user.id,
-                        permissions=ChatPermissions(can_send_messages=False),
-                    )
-                    await bot.send_message(
-                        chat.id,
-                        f"Muted {user.first_name} for using Blacklisted word: {trigger}!",
-                    )
-                    return
-                elif getmode == 4:
-                    await message.delete()
-                    res = await chat.unban_member(update.effective_user.id)
-                    if res:
-                        await bot.send_message(
-                            chat.id,
-                            f"Kicked {user.first_name} for using Blacklisted word: {trigger}!",
-                        )
-                    return
-                elif getmode == 5:
-                    await message.delete()
-                    await chat.ban_member(user.id)
-                    await bot.send_message(
-                        chat.id,
-                        f"Banned {user.first_name} for using Blacklisted word: {trigger}",
-                    )
-                    return
-                elif getmode == 6:
-                    await message.delete()
-                    bantime = extract_time(message, value)
-                    await chat.ban_member(user.id, until_date=bantime)
-                    await bot.send_message(
-                        chat.id,
-                        f"Banned {user.first_name} until '{value}' for using Blacklisted word: {trigger}!",
-                    )
-                    return
-                elif getmode == 7:
-                    await message.delete()
-                    mutetime = extract_time(message, value)
-                    await bot.restrict_chat_member(
-                        chat.id,
-                        user.id,
-                        until_date=mutetime,
-                        permissions=ChatPermissions(can_send_messages=False),
-                    )
+    getmode, value = mod_ctx.setting("blacklist", sql.get_blacklist_setting)
+
+    trigger = sql.match_blacklist(chat.id, to_match)
+    if trigger:
+        try:
+            if getmode == 0:
+                return
+            elif getmode == 1:
+                await message.delete()
+            elif getmode == 2:
+                await message.delete()
+                warn(
+                    update.effective_user,
+                    update,
+                    ("Using blacklisted trigger: {}".format(trigger)),
+                    message,
+                    update.effective_user,
+                )
+                return
+            elif getmode == 3:
+                await message.delete()
+                await bot.restrict_chat_member(
+                    chat.id,
+                    update.effective_user.id,
+                    permissions=ChatPermissions(can_send_messages=False),
+                )
+                await bot.send_message(
+                    chat.id,
+                    f"Muted {user.first_name} for using Blacklisted word: {trigger}!",
+                )
+                return
+            elif getmode == 4:
+                await message.delete()
+                res = await chat.unban_member(update.effective_user.id)
+                if res:
                     await bot.send_message(
                         chat.id,
-                        f"Muted {user.first_name} until '{value}' for using Blacklisted word: {trigger}!",
+                        f"Kicked {user.first_name} for using Blacklisted word: {trigger}!",
                     )
-                    return
-            except BadRequest as excp:
-                if excp.message != "Message to delete not found":
-                    log.exception("Error while deleting blacklist message.")
-            break
+                return
+            elif getmode == 5:
+                await message.delete()
+                await chat.ban_member(user.id)
+                await bot.send_message(
+                    chat.id,
+                    f"Banned {user.first_name} for using Blacklisted word: {trigger}",
+                )
+                return
+            elif getmode == 6:
+                await message.delete()
+                bantime = extract_time(message, value)
+                await chat.ban_member(user.id, until_date=bantime)
+                await bot.send_message(
+                    chat.id,
+                    f"Banned {user.first_name} until '{value}' for using Blacklisted word: {trigger}!",
+                )
+                return
+            elif getmode == 7:
+                await message.delete()
+                mutetime = extract_time(message, value)
+                await bot.restrict_chat_member(
+                    chat.id,
+                    user.id,
+                    until_date=mutetime,
+                    permissions=ChatPermissions(can_send_messages=False),
+                )
+                await bot.send_message(
+                    chat.id,
+                    f"Muted {user.first_name} until '{value}' for using Blacklisted word: {trigger}!",
+                )
+                return
+        except BadRequest as excp:
+            if excp.message != "Message to delete not found":
+                log.exception("Error while deleting blacklist message.")
 
 
 def __import_data__(chat_id, data):
     # set chat blacklist
     blacklist = data.get("blacklist", {})
-    for trigger in blacklist:
-        sql.add_to_blacklist(chat_id, trigger)
+    sql.add_many_to_blacklist(chat_id, blacklist)
 
 
 def __migrate__(old_chat_id, new_chat_id):
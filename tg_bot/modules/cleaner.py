@@ -4,6 +4,7 @@ from tg_bot import ALLOW_EXCL, application
 from tg_bot.modules.disable import DisableAbleCommandHandler  # optional; may be unused
 from tg_bot.modules.helper_funcs.chat_status import (
     bot_can_delete,
+    bot_has_right,
     connection_status,
     dev_plus,
 )
@@ -79,13 +80,9 @@ async def clean_blue_text_must_click(update: Update, context: ContextTypes.DEFAU
     if not message or not message.text:
         return
 
-    try:
-        member = await chat.get_member(bot.id)
-        can_delete = bool(getattr(member, "can_delete_messages", False))
-    except Exception:
-        can_delete = False
-
-    if can_delete and sql.is_enabled(chat.id):
+    if sql.is_enabled(chat.id) and await bot_has_right(
+        chat, bot.id, "can_delete_messages"
+    ):
         fst_word = message.text.strip().split(None, 1)[0]
 
         if len(fst_word) > 1 and any(
@@ -1,4 +1,3 @@
-import re
 from html import escape
 from typing import Optional
 
@@ -10,7 +9,7 @@ from telegram.constants import ParseMode, MessageLimit
 from telegram.ext import ApplicationHandlerStop
 
 from tg_bot import log, SUDO_USERS
-from tg_bot.modules.helper_funcs.extraction import extract_text
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 from tg_bot.modules.helper_funcs.filters import CustomFilters
 from tg_bot.modules.helper_funcs.misc import build_keyboard_parser
 from tg_bot.modules.helper_funcs.msg_types import get_filter_type
@@ -254,187 +253,184 @@ async def reply_filter(update: Update, context):  # sourcery no-metrics
 
     if not update.effective_user or update.effective_user.id == 777000:
         return
-    to_match = extract_text(message)
+    to_match = get_moderation_context(update, context).text
     if not to_match:
         return
 
-    chat_filters = sql.get_chat_triggers(chat.id)
-    for keyword in chat_filters:
-        pattern = r"( |^|[^\w])" + re.escape(keyword) + r"( |$|[^\w])"
-        if re.search(pattern, to_match, flags=re.IGNORECASE):
-            filt = sql.get_filter(chat.id, keyword)
-            if filt.reply == "there is should be a new reply":
-                buttons = sql.get_buttons(chat.id, filt.keyword)
-                keyb = build_keyboard_parser(context.bot, chat.id, buttons)
-                keyboard = InlineKeyboardMarkup(keyb)
-
-                VALID_WELCOME_FORMATTERS = [
-                    "first",
-                    "last",
-                    "fullname",
-                    "username",
-                    "id",
-                    "chatname",
-                    "mention",
-                ]
-                if filt.reply_text:
-                    valid_format = escape_invalid_curly_brackets(
-                        markdown_to_html(filt.reply_text), VALID_WELCOME_FORMATTERS
+    keyword = sql.match_chat_trigger(chat.id, to_match)
+    if keyword:
+        filt = await sql.get_filter_async(chat.id, keyword)
+        if filt.reply == "there is should be a new reply":
+            buttons = await sql.get_buttons_async(chat.id, filt.keyword)
+            keyb = build_keyboard_parser(context.bot, chat.id, buttons)
+            keyboard = InlineKeyboardMarkup(keyb)
+
+            VALID_WELCOME_FORMATTERS = [
+                "first",
+                "last",
+                "fullname",
+                "username",
+                "id",
+                "chatname",
+                "mention",
+            ]
+            if filt.reply_text:
+                valid_format = escape_invalid_curly_brackets(
+                    markdown_to_html(filt.reply_text), VALID_WELCOME_FORMATTERS
+                )
+                if valid_format:
+                    filtext = valid_format.format(
+                        first=escape(message.from_user.first_name),
+                        last=escape(
+                            message.from_user.last_name
+                            or message.from_user.first_name
+                        ),
+                        fullname=" ".join(
+                            [
+                                escape(message.from_user.first_name),
+                                escape(message.from_user.last_name),
+                            ]
+                            if message.from_user.last_name
+                            else [escape(message.from_user.first_name)]
+                        ),
+                        username="@" + escape(message.from_user.username)
+                        if message.from_user.username
+                        else mention_html(
+                            message.from_user.id, message.from_user.first_name
+                        ),
+                        mention=mention_html(
+                            message.from_user.id, message.from_user.first_name
+                        ),
+                        chatname=escape(message.chat.title)
+                        if message.chat.type != "private"
+                        else escape(message.from_user.first_name),
+                        id=message.from_user.id,
                     )
-                    if valid_format:
-                        filtext = valid_format.format(
-                            first=escape(message.from_user.first_name),
-                            last=escape(
-                                message.from_user.last_name
-                                or message.from_user.first_name
-                            ),
-                            fullname=" ".join(
-                                [
-                                    escape(message.from_user.first_name),
-                                    escape(message.from_user.last_name),
-                                ]
-                                if message.from_user.last_name
-                                else [escape(message.from_user.first_name)]
-                            ),
-                            username="@" + escape(message.from_user.username)
-                            if message.from_user.username
-                            else mention_html(
-                                message.from_user.id, message.from_user.first_name
-                            ),
-                            mention=mention_html(
-                                message.from_user.id, message.from_user.first_name
-                            ),
-                            chatname=escape(message.chat.title)
-                            if message.chat.type != "private"
-                            else escape(message.from_user.first_name),
-                            id=message.from_user.id,
-                        )
-                    else:
-                        filtext = ""
                 else:
                     filtext = ""
+            else:
+                filtext = ""
 
-                if filt.file_type in (sql.Types.BUTTON_TEXT, sql.Types.TEXT):
-                    try:
-                        await context.bot.send_message(
-                            chat.id,
-                            filtext,
-                            reply_to_message_id=message.message_id,
-                            parse_mode=ParseMode.HTML,
-                            disable_web_page_preview=True,
-                            reply_markup=keyboard,
-                        )
-                    except BadRequest as excp:
-                        error_catch = get_exception(excp, filt, chat)
-                        if error_catch == "noreply":
-                            try:
-                                await context.bot.send_message(
-                                    chat.id,
-                                    filtext,
-                                    parse_mode=ParseMode.HTML,
-                                    disable_web_page_preview=True,
-                                    reply_markup=keyboard,
-                                )
-                            except BadRequest as excp2:
-                                log.exception("Error in filters: " + excp2.message)
-                                await send_message(
-                                    update.effective_message,
-                                    get_exception(excp2, filt, chat),
-                                )
-                        else:
-                            try:
-                                await send_message(
-                                    update.effective_message,
-                                    get_exception(excp, filt, chat),
-                                )
-                            except BadRequest as excp3:
-                                log.exception("Failed to send message: " + excp3.message)
-                else:
-                    method_name = ENUM_FUNC_MAP.get(filt.file_type)
-                    if method_name == "send_sticker":
-                        await getattr(context.bot, method_name)(
-                            chat.id,
-                            filt.file_id,
-                            reply_to_message_id=message.message_id,
-                            reply_markup=keyboard,
-                        )
-                    else:
-                        await getattr(context.bot, method_name)(
-                            chat.id,
-                            filt.file_id,
-                            caption=filtext,
-                            reply_to_message_id=message.message_id,
-                            parse_mode=ParseMode.HTML,
-                            reply_markup=keyboard,
-                        )
-            elif filt.is_sticker:
-                await message.reply_sticker(filt.reply)
-            elif filt.is_document:
-                await message.reply_document(filt.reply)
-            elif filt.is_image:
-                await message.reply_photo(filt.reply)
-            elif filt.is_audio:
-                await message.reply_audio(filt.reply)
-            elif filt.is_voice:
-                await message.reply_voice(filt.reply)
-            elif filt.is_video:
-                await message.reply_video(filt.reply)
-            elif filt.has_markdown:
-                buttons = sql.get_buttons(chat.id, filt.keyword)
-                keyb = build_keyboard_parser(context.bot, chat.id, buttons)
-                keyboard = InlineKeyboardMarkup(keyb)
-
-                html_reply = markdown_to_html(filt.reply)
+            if filt.file_type in (sql.Types.BUTTON_TEXT, sql.Types.TEXT):
                 try:
-                    await send_message(
-                        update.effective_message,
-                        html_reply,
+                    await context.bot.send_message(
+                        chat.id,
+                        filtext,
+                        reply_to_message_id=message.message_id,
                         parse_mode=ParseMode.HTML,
                         disable_web_page_preview=True,
                         reply_markup=keyboard,
                     )
                 except BadRequest as excp:
-                    if excp.message == "Unsupported url protocol":
-                        try:
-                            await send_message(
-                                update.effective_message,
-                                "You seem to be trying to use an unsupported url protocol. "
-                                "Telegram doesn't support buttons for some protocols, such as tg://. Please try "
-                                "again...",
-                            )
-                        except BadRequest as excp2:
-                            log.exception("Error in filters: " + excp2.message)
-                    elif excp.message == "Reply message not found":
+                    error_catch = get_exception(excp, filt, chat)
+                    if error_catch == "noreply":
                         try:
                             await context.bot.send_message(
                                 chat.id,
-                                html_reply,
+                                filtext,
                                 parse_mode=ParseMode.HTML,
                                 disable_web_page_preview=True,
                                 reply_markup=keyboard,
                             )
-                        except BadRequest as excp3:
-                            log.exception("Error in filters: " + excp3.message)
+                        except BadRequest as excp2:
+                            log.exception("Error in filters: " + excp2.message)
+                            await send_message(
+                                update.effective_message,
+                                get_exception(excp2, filt, chat),
+                            )
                     else:
                         try:
                             await send_message(
                                 update.effective_message,
-                                "This message couldn't be sent as it's incorrectly formatted.",
+                                get_exception(excp, filt, chat),
                             )
-                        except BadRequest as excp4:
-                            log.exception("Error in filters: " + excp4.message)
-                        log.warning("Message %s could not be parsed", str(filt.reply))
-                        log.exception(
-                            "Could not parse filter %s in chat %s",
-                            str(filt.keyword),
-                            str(chat.id),
-                        )
+                        except BadRequest as excp3:
+                            log.exception("Failed to send message: " + excp3.message)
             else:
-                try:
-                    await send_message(update.effective_message, filt.reply)
-                except BadRequest as excp:
-                    log.exception("Error in filters: " + excp.message)
-            break
+                method_name = ENUM_FUNC_MAP.get(filt.file_type)
+                if method_name == "send_sticker":
+                    await getattr(context.bot, method_name)(
+                        chat.id,
+                        filt.file_id,
+                        reply_to_message_id=message.message_id,
+                        reply_markup=keyboard,
+                    )
+                else:
+                    await getattr(context.bot, method_name)(
+                        chat.id,
+                        filt.file_id,
+                        caption=filtext,
+                        reply_to_message_id=message.message_id,
+                        parse_mode=ParseMode.HTML,
+                        reply_markup=keyboard,
+                    )
+        elif filt.is_sticker:
+            await message.reply_sticker(filt.reply)
+        elif filt.is_document:
+            await message.reply_document(filt.reply)
+        elif filt.is_image:
+            await message.reply_photo(filt.reply)
+        elif filt.is_audio:
+            await message.reply_audio(filt.reply)
+        elif filt.is_voice:
+            await message.reply_voice(filt.reply)
+        elif filt.is_video:
+            await message.reply_video(filt.reply)
+        elif filt.has_markdown:
+            buttons = await sql.get_buttons_async(chat.id, filt.keyword)
+            keyb = build_keyboard_parser(context.bot, chat.id, buttons)
+            keyboard = InlineKeyboardMarkup(keyb)
+
+            html_reply = markdown_to_html(filt.reply)
+            try:
+                await send_message(
+                    update.effective_message,
+                    html_reply,
+                    parse_mode=ParseMode.HTML,
+                    disable_web_page_preview=True,
+                    reply_markup=keyboard,
+                )
+            except BadRequest as excp:
+                if excp.message == "Unsupported url protocol":
+                    try:
+                        await send_message(
+                            update.effective_message,
+                            "You seem to be trying to use an unsupported url protocol. "
+                            "Telegram doesn't support buttons for some protocols, such as tg://. Please try "
+                            "again...",
+                        )
+                    except BadRequest as excp2:
+                        log.exception("Error in filters: " + excp2.message)
+                elif excp.message == "Reply message not found":
+                    try:
+                        await context.bot.send_message(
+                            chat.id,
+                            html_reply,
+                            parse_mode=ParseMode.HTML,
+                            disable_web_page_preview=True,
+                            reply_markup=keyboard,
+                        )
+                    except BadRequest as excp3:
+                        log.exception("Error in filters: " + excp3.message)
+                else:
+                    try:
+                        await send_message(
+                            update.effective_message,
+                            "This message couldn't be sent as it's incorrectly formatted.",
+                        )
+                    except BadRequest as excp4:
+                        log.exception("Error in filters: " + excp4.message)
+                    log.warning("Message %s could not be parsed", str(filt.reply))
+                    log.exception(
+                        "Could not parse filter %s in chat %s",
+                        str(filt.keyword),
+                        str(chat.id),
+                    )
+        else:
+            try:
+                await send_message(update.effective_message, filt.reply)
+            except BadRequest as excp:
+                log.exception("Error in filters: " + excp.message)
 
 
 @kigcmd(command="removeallfilters", filters=filters.ChatType.GROUPS)
@@ -476,14 +472,7 @@ async def rmall_callback(update: Update, context):
                 await msg.edit_text("No filters in this chat, nothing to stop!")
                 return
 
-            count = 0
-            filterlist = []
-            for x in allfilters:
-                count += 1
-                filterlist.append(x)
-
-            for i in filterlist:
-                sql.remove_filter(chat.id, i)
+            count = sql.remove_all_filters(chat.id)
 
             await msg.edit_text(f"Cleaned {count} filters in {chat.title}")
 
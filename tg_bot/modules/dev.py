@@ -10,8 +10,17 @@ from telegram.error import TelegramError
 from telegram.constants import ParseMode
 from telegram.ext import CallbackQueryHandler, CommandHandler, ContextTypes
 
-from tg_bot import DEV_USERS, application
+from tg_bot import DEV_USERS, KInit, application
 from tg_bot.modules.helper_funcs.chat_status import dev_plus
+from tg_bot.modules.sql import (
+    BLOCKING_STATS,
+    POOL_ADAPT_INTERVAL,
+    POOL_STATS,
+    QUERY_CACHE,
+    adapt_pool_size,
+    run_blocking,
+)
+from tg_bot.modules.sql.index_audit import audit_indexes
 
 
 @dev_plus
@@ -142,11 +151,92 @@ async def get_chat_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await msg.reply_text(text=m, parse_mode=ParseMode.HTML)
 
 
+@dev_plus
+async def db_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    stats = BLOCKING_STATS.snapshot()
+    cache = QUERY_CACHE.stats()
+    m = (
+        "<b>SQL worker pool</b>\n"
+        f"<b>Workers</b>: {stats['workers']}\n"
+        f"<b>Queued</b>: {stats['queued']} | <b>Running</b>: {stats['running']}\n"
+        f"<b>Completed</b>: {stats['completed']} | <b>Failed</b>: {stats['failed']}\n"
+        "<b>Wait</b> p50/p95/max: <code>{:.1f}/{:.1f}/{:.1f} ms</code>\n"
+        "<b>Run</b> p50/p95/max: <code>{:.1f}/{:.1f}/{:.1f} ms</code>\n"
+        "\n<b>Query cache</b>\n"
+        "<b>Entries</b>: {} ({:.1f} KiB)\n"
+        "<b>Hits</b>: {} | <b>Misses</b>: {} | <b>Hit rate</b>: {:.1%}\n"
+    ).format(
+        *(stats[k] * 1000 for k in ("wait_p50", "wait_p95", "wait_max")),
+        *(stats[k] * 1000 for k in ("run_p50", "run_p95", "run_max")),
+        cache["entries"],
+        cache["bytes"] / 1024,
+        cache["hits"],
+        cache["misses"],
+        cache["hit_rate"],
+    )
+    await update.effective_message.reply_text(text=m, parse_mode=ParseMode.HTML)
+
+
+@dev_plus
+async def db_pool(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    m = ""
+    for name, pool_stats in POOL_STATS.items():
+        if pool_stats.pool is None:
+            continue
+        stats = pool_stats.snapshot()
+        m += (
+            f"<b>{name.title()} pool</b>\n"
+            f"<b>Size</b>: {stats['size']} | <b>Checked out</b>: {stats['checked_out']} "
+            f"(peak {stats['peak_checked_out']}) | <b>Overflow</b>: {stats['overflow']}\n"
+            f"<b>Checkouts</b>: {stats['checkouts']} | <b>Timeouts</b>: {stats['timeouts']}\n"
+            f"<b>Connects</b>: {stats['connects']} | <b>Recycled</b>: {stats['recycles']} "
+            f"| <b>Invalidated</b>: {stats['invalidations']}\n"
+            "<b>Wait</b> p50/p95/max: <code>{:.1f}/{:.1f}/{:.1f} ms</code>\n".format(
+                *(stats[k] * 1000 for k in ("wait_p50", "wait_p95", "wait_max"))
+            )
+        )
+        floor = KInit.POSTGRES_POOL_SIZE
+        suggested = pool_stats.suggested_size(floor, floor + KInit.POSTGRES_MAX_OVERFLOW)
+        if suggested is not None:
+            m += f"<b>Suggested size</b>: {suggested}\n"
+        m += "\n"
+    m += "<b>Pre-ping</b>: {} | <b>Adaptive</b>: {}".format(
+        "on" if KInit.POSTGRES_POOL_PRE_PING else "off",
+        "on" if KInit.POSTGRES_POOL_ADAPTIVE else "off",
+    )
+    await update.effective_message.reply_text(text=m, parse_mode=ParseMode.HTML)
+
+
+async def adapt_pool(_: ContextTypes.DEFAULT_TYPE):
+    await run_blocking(adapt_pool_size)
+
+
+@dev_plus
+async def db_indexes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    missing, unindexed = await run_blocking(audit_indexes)
+    m = "<b>Index audit</b>\n"
+    if missing:
+        m += "\n<b>Missing indexes</b>:\n" + "\n".join(
+            f" <code>{html.escape(name)}</code>" for name in missing
+        ) + "\n"
+    if unindexed:
+        m += "\n<b>Sequential scans</b>:\n" + "\n".join(
+            f" <code>{html.escape(label)}</code>: {html.escape(', '.join(tables))}"
+            for label, tables in unindexed
+        ) + "\n"
+    if not missing and not unindexed:
+        m += "Every audited query is served by an index."
+    await update.effective_message.reply_text(text=m, parse_mode=ParseMode.HTML)
+
+
 PIP_INSTALL_HANDLER = CommandHandler("install", pip_install)
 LEAVE_HANDLER = CommandHandler("leave", leave)
 GITPULL_HANDLER = CommandHandler("gitpull", gitpull)
 RESTART_HANDLER = CommandHandler("reboot", restart)
 GET_CHAT_HANDLER = CommandHandler("getchat", get_chat_by_id)
+DB_STATS_HANDLER = CommandHandler("dbstats", db_stats)
+DB_INDEXES_HANDLER = CommandHandler("dbindexes", db_indexes)
+DB_POOL_HANDLER = CommandHandler("dbpool", db_pool)
 LEAVE_CALLBACK = CallbackQueryHandler(leave_cb, pattern=r"^leavechat_cb_")
 
 application.add_handler(LEAVE_HANDLER)
@@ -154,7 +244,15 @@ application.add_handler(GITPULL_HANDLER)
 application.add_handler(RESTART_HANDLER)
 application.add_handler(PIP_INSTALL_HANDLER)
 application.add_handler(GET_CHAT_HANDLER)
+application.add_handler(DB_STATS_HANDLER)
+application.add_handler(DB_INDEXES_HANDLER)
+application.add_handler(DB_POOL_HANDLER)
 application.add_handler(LEAVE_CALLBACK)
 
+if KInit.POSTGRES_POOL_ADAPTIVE and application.job_queue:
+    application.job_queue.run_repeating(
+        adapt_pool, interval=POOL_ADAPT_INTERVAL, first=POOL_ADAPT_INTERVAL
+    )
+
 __mod_name__ = "Dev"
-__handlers__ = [LEAVE_HANDLER, GITPULL_HANDLER, RESTART_HANDLER, PIP_INSTALL_HANDLER, GET_CHAT_HANDLER, LEAVE_CALLBACK]
+__handlers__ = [LEAVE_HANDLER, GITPULL_HANDLER, RESTART_HANDLER, PIP_INSTALL_HANDLER, GET_CHAT_HANDLER, DB_STATS_HANDLER, DB_INDEXES_HANDLER, DB_POOL_HANDLER, LEAVE_CALLBACK]
@@ -9,8 +9,9 @@ import os
 import ast
 
 from telegram.ext import ContextTypes
-from telegram.error import BadRequest, TelegramError, Forbidden
+from telegram.error import BadRequest, Forbidden
 from telegram import (
+    ChatMemberBanned,
     Update,
     Chat,
     User,
@@ -28,15 +29,18 @@ from tg_bot import (
     GBAN_LOGS,
     log,
 )
+from tg_bot.modules.helper_funcs.broadcast import broadcast_pruner, start_broadcast
 from tg_bot.modules.helper_funcs.chat_status import is_user_admin
 from tg_bot.modules.helper_funcs.extraction import (
     extract_user,
     extract_unt_fedban,
     extract_user_fban,
 )
+from tg_bot.modules.helper_funcs.fanout import FanOut
 from tg_bot.modules.helper_funcs.string_handling import markdown_parser
 
 import tg_bot.modules.sql.feds_sql as sql
+from tg_bot.modules.sql import run_blocking
 
 from tg_bot.modules.helper_funcs.alternate import (
     send_message,
@@ -253,14 +257,13 @@ async def join_fed(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         get_fedlog = sql.get_fed_log(args[0])
         if get_fedlog:
-            if ast.literal_eval(get_fedlog):
-                await context.bot.send_message(
-                    get_fedlog,
-                    "Chat *{}* has joined the federation *{}*".format(
-                        chat.title, getfed["fname"]
-                    ),
-                    parse_mode="markdown",
-                )
+            await context.bot.send_message(
+                get_fedlog,
+                "Chat *{}* has joined the federation *{}*".format(
+                    chat.title, getfed["fname"]
+                ),
+                parse_mode="markdown",
+            )
 
         await message.reply_text("This chat has joined the federation: {}!".format(getfed["fname"]))
 
@@ -288,14 +291,13 @@ async def leave_fed(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if sql.chat_leave_fed(chat.id) is True:
             get_fedlog = sql.get_fed_log(fed_id)
             if get_fedlog:
-                if ast.literal_eval(get_fedlog):
-                    await context.bot.send_message(
-                        get_fedlog,
-                        "Chat *{}* has left the federation *{}*".format(
-                            chat.title, fed_info["fname"]
-                        ),
-                        parse_mode="markdown",
-                    )
+                await context.bot.send_message(
+                    get_fedlog,
+                    "Chat *{}* has left the federation *{}*".format(
+                        chat.title, fed_info["fname"]
+                    ),
+                    parse_mode="markdown",
+                )
             await send_message(
                 update.effective_message,
                 "This chat has left the federation {}!".format(fed_info["fname"]),
@@ -527,6 +529,61 @@ async def fed_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.effective_message.reply_text(text, parse_mode=ParseMode.HTML)
 
 
+async def _propagate(bot, fed_id, call, errors):
+    """
+    Runs call(chat_id) across every chat a ban in fed_id reaches, at most
+    once per chat, under the shared Bot API budget. An expected failure
+    (one of errors) skips the chat, and if the bot was kicked from it the
+    chat leaves the fed, or its fed is unsubscribed. User_id_invalid stops
+    the run.
+    """
+    targets = await run_blocking(sql.fed_ban_targets, fed_id)
+
+    async def apply(chat_id):
+        try:
+            return await call(chat_id)
+        except BadRequest as excp:
+            if excp.message not in errors:
+                raise
+        try:
+            await bot.get_chat(chat_id)
+        except Forbidden:
+            subscribed_to, chat_fed = targets[chat_id]
+            if subscribed_to is None:
+                await run_blocking(sql.chat_leave_fed, chat_id)
+                log.info("Chat {} has leave fed {} because I was kicked".format(chat_id, chat_fed))
+            else:
+                await run_blocking(sql.unsubs_fed, subscribed_to, chat_fed)
+                log.info("Fed {} has unsub fed {} because I was kicked".format(chat_fed, subscribed_to))
+        except BadRequest:
+            pass
+        return False
+
+    def on_error(chat_id, excp):
+        if isinstance(excp, BadRequest) and excp.message == "User_id_invalid":
+            return True
+        log.warning("Could not propagate fed action on {} because: {}".format(chat_id, excp.message))
+
+    return await FanOut(targets, apply, on_error=on_error).run()
+
+
+async def _report_propagation(log_msg, result):
+    """Adds the totals of a propagated ban or unban to its fed log message."""
+    if not log_msg:
+        return
+    skipped = result.done - result.affected - result.failed
+    try:
+        await log_msg.edit_text(
+            log_msg.text_html
+            + "\n<b>Chats affected:</b> <code>{}</code>"
+            "\n<b>Skipped:</b> <code>{}</code>"
+            "\n<b>Failed:</b> <code>{}</code>".format(result.affected, skipped, result.failed),
+            parse_mode=ParseMode.HTML,
+        )
+    except BadRequest as excp:
+        log.warning("Could not update the fed log with the totals: {}".format(excp.message))
+
+
 @typing_action
 @kigcmd(command=["fban", "fedban"], pass_args=True)
 @rate_limit(40, 60)
@@ -626,6 +683,10 @@ async def fed_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # source
     else:
         user_target = fban_user_name
 
+    async def ban(chat_id):
+        await context.bot.ban_chat_member(chat_id, fban_user_id)
+        return True
+
     if fban:
         fed_name = info["fname"]
         if reason == "":
@@ -648,9 +709,8 @@ async def fed_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # source
             await message.reply_text("Failed to ban from the federation!")
             return
 
-        fed_chats = sql.all_fed_chats(fed_id)
         # Will send to current chat
-        await context.bot.send_message(
+        notice = await context.bot.send_message(
             chat.id,
             "<b>New FederationBan</b>"
             "\n<b>Federation:</b> {}"
@@ -687,9 +747,10 @@ async def fed_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # source
                 parse_mode=ParseMode.HTML,
             )
         # If fedlog is set, then send message, except fedlog is current chat
+        log_msg = None
         get_fedlog = sql.get_fed_log(fed_id)
         if get_fedlog and int(get_fedlog) != int(chat.id):
-            await context.bot.send_message(
+            log_msg = await context.bot.send_message(
                 get_fedlog,
                 "<b>FedBan reason updated</b>"
                 "\n<b>Federation:</b> {}"
@@ -707,61 +768,11 @@ async def fed_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # source
                 ),
                 parse_mode=ParseMode.HTML,
             )
-        for fedschat in fed_chats:
-            try:
-                await context.bot.ban_chat_member(fedschat, fban_user_id)
-            except BadRequest as excp:
-                if excp.message in FBAN_ERRORS:
-                    try:
-                        await context.bot.get_chat(fedschat)
-                    except (Unauthorized, Forbidden):
-                        sql.chat_leave_fed(fedschat)
-                        log.info(
-                            "Chat {} has leave fed {} because I was kicked".format(
-                                fedschat, info["fname"]
-                            )
-                        )
-                        continue
-                elif excp.message == "User_id_invalid":
-                    break
-                else:
-                    log.warning(
-                        "Could not fban on {} because: {}".format(chat, excp.message)
-                    )
-            except TelegramError:
-                pass
-
-        # Fban for fed subscriber
-        subscriber = list(sql.get_subscriber(fed_id))
-        if len(subscriber) != 0:
-            for fedsid in subscriber:
-                all_fedschat = sql.all_fed_chats(fedsid)
-                for fedschat in all_fedschat:
-                    try:
-                        await context.bot.ban_chat_member(fedschat, fban_user_id)
-                    except BadRequest as excp:
-                        if excp.message in FBAN_ERRORS:
-                            try:
-                                await context.bot.get_chat(fedschat)
-                            except (Unauthorized, Forbidden):
-                                targetfed_id = sql.get_fed_id(fedschat)
-                                sql.unsubs_fed(fed_id, targetfed_id)
-                                log.info(
-                                    "Chat {} has unsub fed {} because I was kicked".format(
-                                        fedschat, info["fname"]
-                                    )
-                                )
-                                continue
-                        elif excp.message == "User_id_invalid":
-                            break
-                        else:
-                            log.warning(
-                                "Unable to fban on {} because: {}".format(
-                                    fedschat, excp.message
-                                )
-                            )
-                    except TelegramError:
-                        pass
+        elif get_fedlog:
+            # the fed log is this chat, so the notice above is its log message
+            log_msg = notice
+        result = await _propagate(context.bot, fed_id, ban, FBAN_ERRORS)
+        await _report_propagation(log_msg, result)
         return
 
     fed_name = info["fname"]
@@ -787,8 +798,7 @@ async def fed_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # source
         await message.reply_text("Failed to ban from the federation!")
         return
 
-    fed_chats = sql.all_fed_chats(fed_id)
-    await context.bot.send_message(
+    notice = await context.bot.send_message(
         chat.id,
         "<b>FedBan reason updated</b>"
         "\n<b>Federation:</b> {}"
@@ -823,9 +833,10 @@ async def fed_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # source
             ),
             parse_mode=ParseMode.HTML,
         )
+    log_msg = None
     get_fedlog = sql.get_fed_log(fed_id)
     if get_fedlog and int(get_fedlog) != int(chat.id):
-        await context.bot.send_message(
+        log_msg = await context.bot.send_message(
             get_fedlog,
             "<b>FedBan reason updated</b>"
             "\n<b>Federation:</b> {}"
@@ -843,60 +854,16 @@ async def fed_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):  # source
             ),
             parse_mode=ParseMode.HTML,
         )
-    chats_in_fed = 0
-    for fedschat in fed_chats:
-        chats_in_fed += 1
-        try:
-            await context.bot.ban_chat_member(fedschat, fban_user_id)
-        except BadRequest as excp:
-            if excp.message in FBAN_ERRORS:
-                pass
-            elif excp.message == "User_id_invalid":
-                break
-            else:
-                log.warning(
-                    "Could not fban on {} because: {}".format(chat, excp.message)
-                )
-        except TelegramError:
-            pass
-
-        subscriber = list(sql.get_subscriber(fed_id))
-        if len(subscriber) != 0:
-            for fedsid in subscriber:
-                all_fedschat = sql.all_fed_chats(fedsid)
-                for fedschat in all_fedschat:
-                    try:
-                        await context.bot.ban_chat_member(fedschat, fban_user_id)
-                    except BadRequest as excp:
-                        if excp.message in FBAN_ERRORS:
-                            try:
-                                await context.bot.get_chat(fedschat)
-                            except (Unauthorized, Forbidden):
-                                targetfed_id = sql.get_fed_id(fedschat)
-                                sql.unsubs_fed(fed_id, targetfed_id)
-                                log.info(
-                                    "Chat {} has unsub fed {} because I was kicked".format(
-                                        fedschat, info["fname"]
-                                    )
-                                )
-                                continue
-                        elif excp.message == "User_id_invalid":
-                            break
-                        else:
-                            log.warning(
-                                "Unable to fban on {} because: {}".format(
-                                    fedschat, excp.message
-                                )
-                            )
-                    except TelegramError:
-                        pass
-    if chats_in_fed == 0:
-        await send_message(update.effective_message, "Fedban affected 0 chats. ")
-    elif chats_in_fed > 0:
-        await send_message(
-            update.effective_message,
-            "Fedban affected {} chats. ".format(chats_in_fed),
-        )
+    elif get_fedlog:
+        # the fed log is this chat, so the notice above is its log message
+        log_msg = notice
+    result = await _propagate(context.bot, fed_id, ban, FBAN_ERRORS)
+    await _report_propagation(log_msg, result)
+
+    await send_message(
+        update.effective_message,
+        "Fedban affected {} chats. ".format(result.affected),
+    )
 
 
 @typing_action
@@ -973,8 +940,25 @@ async def unfban(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "I'll give {} another chance in this federation".format(user_chat.first_name)
     )
 
-    chat_list = sql.all_fed_chats(fed_id)
-    await context.bot.send_message(
+    try:
+        x = sql.un_fban_user(fed_id, fban_user_id)
+        if not x:
+            await send_message(
+                update.effective_message,
+                "Un-fban failed, this user may already be un-fedbanned!",
+            )
+            return
+    except Exception:
+        pass
+
+    async def unban(chat_id):
+        member = await context.bot.get_chat_member(chat_id, fban_user_id)
+        if isinstance(member, ChatMemberBanned):
+            await context.bot.unban_chat_member(chat_id, fban_user_id)
+            return True
+        return False
+
+    notice = await context.bot.send_message(
         chat.id,
         "<b>Un-FedBan</b>"
         "\n<b>Federation:</b> {}"
@@ -1005,9 +989,10 @@ async def unfban(update: Update, context: ContextTypes.DEFAULT_TYPE):
             ),
             parse_mode=ParseMode.HTML,
         )
+    log_msg = None
     get_fedlog = sql.get_fed_log(fed_id)
     if get_fedlog and int(get_fedlog) != int(chat.id):
-        await context.bot.send_message(
+        log_msg = await context.bot.send_message(
             get_fedlog,
             "<b>Un-FedBan</b>"
             "\n<b>Federation:</b> {}"
@@ -1023,77 +1008,16 @@ async def unfban(update: Update, context: ContextTypes.DEFAULT_TYPE):
             ),
             parse_mode=ParseMode.HTML,
         )
-    unfbanned_in_chats = 0
-    for fedchats in chat_list:
-        unfbanned_in_chats += 1
-        try:
-            member = await context.bot.get_chat_member(fedchats, user_id)
-            if str(member.status) == "kicked":
-                await context.bot.unban_chat_member(fedchats, user_id)
-        except BadRequest as excp:
-            if excp.message in UNFBAN_ERRORS:
-                pass
-            elif excp.message == "User_id_invalid":
-                break
-            else:
-                log.warning(
-                    "Could not fban on {} because: {}".format(chat, excp.message)
-                )
-        except TelegramError:
-            pass
-
-    try:
-        x = sql.un_fban_user(fed_id, user_id)
-        if not x:
-            await send_message(
-                update.effective_message,
-                "Un-fban failed, this user may already be un-fedbanned!",
-            )
-            return
-    except Exception:
-        pass
-
-    subscriber = list(sql.get_subscriber(fed_id))
-    if len(subscriber) != 0:
-        for fedsid in subscriber:
-            all_fedschat = sql.all_fed_chats(fedsid)
-            for fedschat in all_fedschat:
-                try:
-                    await context.bot.unban_chat_member(fedschat, user_id)
-                except BadRequest as excp:
-                    if excp.message in FBAN_ERRORS:
-                        try:
-                            await context.bot.get_chat(fedschat)
-                        except (Unauthorized, Forbidden):
-                            targetfed_id = sql.get_fed_id(fedschat)
-                            sql.unsubs_fed(fed_id, targetfed_id)
-                            log.info(
-                                "Chat {} has unsub fed {} because I was kicked".format(
-                                    fedschat, info["fname"]
-                                )
-                            )
-                            continue
-                    elif excp.message == "User_id_invalid":
-                        break
-                    else:
-                        log.warning(
-                            "Unable to fban on {} because: {}".format(
-                                fedschat, excp.message
-                            )
-                        )
-                except TelegramError:
-                    pass
-
-    if unfbanned_in_chats == 0:
-        await send_message(
-            update.effective_message,
-            "This person has been un-fbanned in 0 chats.",
-        )
-    if unfbanned_in_chats > 0:
-        await send_message(
-            update.effective_message,
-            "This person has been un-fbanned in {} chats.".format(unfbanned_in_chats),
-        )
+    elif get_fedlog:
+        # the fed log is this chat, so the notice above is its log message
+        log_msg = notice
+    result = await _propagate(context.bot, fed_id, unban, FBAN_ERRORS | UNFBAN_ERRORS)
+    await _report_propagation(log_msg, result)
+
+    await send_message(
+        update.effective_message,
+        "This person has been un-fbanned in {} chats.".format(result.affected),
+    )
 
 
 @typing_action
@@ -1139,7 +1063,7 @@ async def set_frules(update: Update, context: ContextTypes.DEFAULT_TYPE):
         rules = sql.get_fed_info(fed_id)["frules"]
         getfed = sql.get_fed_info(fed_id)
         get_fedlog = sql.get_fed_log(fed_id)
-        if get_fedlog and ast.literal_eval(get_fedlog):
+        if get_fedlog:
             await context.bot.send_message(
                 get_fedlog,
                 "*{}* has changed federation rules for fed *{}*".format(
@@ -1207,33 +1131,24 @@ async def fed_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception:
             broadcaster = user.first_name + " " + user.last_name
         text += "\n\n- {}".format(mention_markdown(user.id, broadcaster, version=1))
-        chat_list = sql.all_fed_chats(fed_id)
-        failed = 0
-        for chat_id in chat_list:
-            title = "*New broadcast from Fed {}*\n".format(fedinfo["fname"])
-            try:
-                await context.bot.send_message(chat_id, title + text, parse_mode="markdown")
-            except TelegramError:
-                try:
-                    await context.bot.get_chat(chat_id)
-                except (Unauthorized, Forbidden):
-                    failed += 1
-                    sql.chat_leave_fed(chat_id)
-                    log.info(
-                        "Chat {} has leave fed {} because I was kicked".format(
-                            chat_id, fedinfo["fname"]
-                        )
-                    )
-                    continue
-                failed += 1
-                log.warning("Couldn't send broadcast to {}".format(str(chat_id)))
-
-        send_text = "The federation broadcast is complete"
-        if failed >= 1:
-            send_text += "{} the group failed to receive the message, probably because it left the Federation.".format(
-                failed
-            )
-        await update.effective_message.reply_text(send_text)
+        title = "*New broadcast from Fed {}*\n".format(fedinfo["fname"])
+        status = await update.effective_message.reply_text("The federation broadcast has started.")
+        await start_broadcast(
+            context.application,
+            sql.all_fed_chats(fed_id),
+            title + text,
+            status=status,
+            prune="fed",
+            parse_mode="markdown",
+        )
+
+
+@broadcast_pruner("fed")
+def prune_broadcast_chat(chat_id):
+    if sql.chat_leave_fed(chat_id):
+        log.info("Chat {} has left its fed because I was kicked".format(chat_id))
+        return True
+    return False
 
 
 @send_action(ChatAction.UPLOAD_DOCUMENT)
@@ -1647,7 +1562,7 @@ async def fed_import_bans(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if failed >= 1:
                 text += " {} Failed to import.".format(failed)
             get_fedlog = sql.get_fed_log(fed_id)
-            if get_fedlog and ast.literal_eval(get_fedlog):
+            if get_fedlog:
                 teks = "Fed *{}* has successfully imported data. {} banned.".format(
                     getfed["fname"], success
                 )
@@ -1716,7 +1631,7 @@ async def fed_import_bans(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if failed >= 1:
                 text += " {} Failed to import.".format(failed)
             get_fedlog = sql.get_fed_log(fed_id)
-            if get_fedlog and ast.literal_eval(get_fedlog):
+            if get_fedlog:
                 teks = "Fed *{}* has successfully imported data. {} banned.".format(
                     getfed["fname"], success
                 )
@@ -2177,7 +2092,7 @@ async def welcome_fed(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user  # type: Optional[User]
 
     fed_id = sql.get_fed_id(chat.id)
-    fban, fbanreason, fbantime = sql.get_fban_user(fed_id, user.id)
+    fban, fbanreason, fbantime = await sql.get_fban_user_async(fed_id, user.id)
     if fban:
         await update.effective_message.reply_text(
             "This user is banned in current federation! I will remove him."
@@ -0,0 +1,112 @@
+import uuid
+from collections import Counter
+
+from telegram.error import BadRequest, Forbidden
+from telegram.ext import ContextTypes
+
+from tg_bot import log
+from tg_bot.modules.helper_funcs.fanout import FanOut
+from tg_bot.modules.sql import fanout_sql, run_blocking
+
+BROADCAST = "broadcast"
+# name -> function dropping a chat a broadcast can no longer reach and
+# returning whether it removed anything; a broadcast names its pruner so
+# a resumed job still finds it
+PRUNERS = {}
+
+
+def broadcast_pruner(name):
+    def decorator(func):
+        PRUNERS[name] = func
+        return func
+    return decorator
+
+
+def _unreachable(excp):
+    return isinstance(excp, Forbidden) or excp.message == "Chat not found"
+
+
+def _status_text(result):
+    head = "Broadcast complete." if result.done >= result.total else "Broadcasting..."
+    return (
+        f"{head}\nProgress: {result.done}/{result.total}"
+        f"\nSent: {result.affected}\nFailed: {result.failed}"
+        f"\nPruned: {result.counts['pruned']}"
+    )
+
+
+async def start_broadcast(application, targets, text, *, status, prune=None, **send_kwargs):
+    """
+    Persists a broadcast of text to targets and starts it in the background.
+    status is the message edited with its progress, prune the name of the
+    broadcast_pruner for chats that kicked or blocked the bot, and
+    send_kwargs go to every send_message. Returns the task.
+    """
+    payload = {
+        "targets": list(dict.fromkeys(targets)),
+        "text": text,
+        "send_kwargs": send_kwargs,
+        "prune": prune,
+        "status_chat": status.chat_id,
+        "status_msg": status.message_id,
+    }
+    job_id = f"{BROADCAST}:{uuid.uuid4().hex}"
+    await run_blocking(fanout_sql.start_job, job_id, BROADCAST, payload)
+    return application.create_task(run_broadcast(application.bot, job_id, payload))
+
+
+async def run_broadcast(bot, job_id, payload, start=0, affected=0, failed=0, counts=None):
+    """
+    Sends the broadcast from start on. The targets are stored with the job,
+    so a resumed run picks up exactly where the last checkpoint left it,
+    with the totals saved there.
+    """
+    pruner = PRUNERS.get(payload["prune"])
+    counts = Counter(counts or {})
+
+    async def send(chat_id):
+        try:
+            await bot.send_message(chat_id, payload["text"], **payload["send_kwargs"])
+            return True
+        except (BadRequest, Forbidden) as excp:
+            if not _unreachable(excp):
+                raise
+        if pruner and await run_blocking(pruner, chat_id):
+            counts["pruned"] += 1
+        return False
+
+    async def report(result):
+        await bot.edit_message_text(
+            _status_text(result),
+            chat_id=payload["status_chat"],
+            message_id=payload["status_msg"],
+        )
+
+    fanout = FanOut(
+        payload["targets"],
+        send,
+        on_progress=report,
+        job_id=job_id,
+        start=start,
+        affected=affected,
+        failed=failed,
+        counts=counts,
+    )
+    return await fanout.run()
+
+
+async def resume_broadcasts(context: ContextTypes.DEFAULT_TYPE):
+    """Restarts the broadcasts a restart interrupted, from their cursors."""
+    for job in await run_blocking(fanout_sql.get_jobs, BROADCAST):
+        log.info(f"[Broadcast] Resuming {job['job_id']} at {job['cursor']}")
+        context.application.create_task(
+            run_broadcast(
+                context.bot,
+                job["job_id"],
+                job["payload"],
+                job["cursor"],
+                job["affected"],
+                job["failed"],
+                job["counts"],
+            )
+        )
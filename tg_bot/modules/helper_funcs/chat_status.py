@@ -15,10 +15,15 @@ from tg_bot import (
     SARDEGNA_USERS,
     WHITELIST_USERS,
 )
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 
 # stores admin in memory for 10 min.
 ADMIN_CACHE = TTLCache(maxsize=512, ttl=60 * 10)
 
+# stores the bot's own ChatMember per chat; kept fresh by my_chat_member updates,
+# the ttl only guards against updates missed while the bot was offline.
+BOT_MEMBER_CACHE = TTLCache(maxsize=4096, ttl=60 * 60)
+
 
 async def is_anon(user: User, chat: Chat):
     member = await chat.get_member(user.id)
@@ -80,18 +85,44 @@ async def is_user_admin(update: Update, user_id: int, member: ChatMember = None)
     return _is_admin_status(member.status)
 
 
+async def get_bot_member(chat: Chat, bot_id: int) -> ChatMember:
+    try:
+        return BOT_MEMBER_CACHE[chat.id]
+    except KeyError:
+        bot_member = await chat.get_member(bot_id)
+        BOT_MEMBER_CACHE[chat.id] = bot_member
+        return bot_member
+
+
+def update_bot_member(chat_id: int, bot_member: ChatMember):
+    # our own rights changed, so the cached admin list is stale as well
+    ADMIN_CACHE.pop(chat_id, None)
+    if str(bot_member.status) in ("left", "kicked"):
+        BOT_MEMBER_CACHE.pop(chat_id, None)
+    else:
+        BOT_MEMBER_CACHE[chat_id] = bot_member
+
+
+async def bot_has_right(chat: Chat, bot_id: int, right: str) -> bool:
+    try:
+        bot_member = await get_bot_member(chat, bot_id)
+    except TelegramError:
+        return False
+    return bool(getattr(bot_member, right, False))
+
+
 async def is_bot_admin(chat: Chat, bot_id: int, bot_member: ChatMember = None) -> bool:
     if chat.type == "private" or getattr(chat, "all_members_are_administrators", False):
         return True
 
     if bot_member is None:
-        bot_member = await chat.get_member(bot_id)
+        bot_member = await get_bot_member(chat, bot_id)
 
     return _is_admin_status(bot_member.status)
 
 
 async def can_delete(chat: Chat, bot_id: int) -> bool:
-    member = await chat.get_member(bot_id)
+    member = await get_bot_member(chat, bot_id)
     return bool(getattr(member, "can_delete_messages", False))
 
 
@@ -266,7 +297,7 @@ def user_not_admin(func):
             return
         if message.sender_chat and message.sender_chat.type != "channel":
             return
-        elif user and not await is_user_admin(update, user.id):
+        elif user and not await get_moderation_context(update, context).is_admin():
             return await func(update, context, *args, **kwargs)
         elif not user:
             return
@@ -335,7 +366,7 @@ def can_pin(func):
                 f"Make sure I'm admin and can pin messages there. "
             )
 
-        member = await chat.get_member(bot.id)
+        member = await get_bot_member(chat, bot.id)
         if getattr(member, "can_pin_messages", False):
             return await func(update, context, *args, **kwargs)
         else:
@@ -360,7 +391,7 @@ def can_promote(func):
                 f"Make sure I'm admin there and can appoint new admins."
             )
 
-        member = await chat.get_member(bot.id)
+        member = await get_bot_member(chat, bot.id)
         if getattr(member, "can_promote_members", False):
             return await func(update, context, *args, **kwargs)
         else:
@@ -385,7 +416,7 @@ def can_restrict(func):
                 f"Make sure I'm admin there and can restrict users. "
             )
 
-        member = await chat.get_member(bot.id)
+        member = await get_bot_member(chat, bot.id)
         if getattr(member, "can_restrict_members", False):
             return await func(update, context, *args, **kwargs)
         else:
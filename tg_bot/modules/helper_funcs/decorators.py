@@ -1,6 +1,4 @@
 import logging
-import time
-import redis
 import inspect
 from functools import wraps
 from typing import Optional, List, Callable, Union
@@ -17,8 +15,9 @@ from telegram.ext import (
     filters as tg_filters,
 )
 
-from tg_bot import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, dispatcher
+from tg_bot import dispatcher
 from tg_bot.modules.helper_funcs.handlers import CustomCommandHandler
+from tg_bot.modules.helper_funcs.rate_limiter import RATE_LIMITER
 
 
 # If you have PTB20-compatible disable handlers, keep these imports.
@@ -34,68 +33,47 @@ except Exception:
     DisableAbleMessageHandler = None
     HAS_DISABLEABLE = False
 
-redis_client = redis.Redis(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    db=REDIS_DB,
-    password=REDIS_PASSWORD,
-)
+def _rate_limit_key(func, update: Update, per_chat: bool) -> str:
+    handler = f"{func.__module__}.{func.__qualname__}"
+    user, chat = update.effective_user, update.effective_chat
+    if per_chat or not user:
+        return f"{handler}:c{chat.id if chat else 0}"
+    return f"{handler}:u{user.id}"
 
 
-def rate_limit(messages_per_window: int, window_seconds: int):
+def rate_limit(messages_per_window: int, window_seconds: int, per_chat: bool = False):
     """
-    Async-safe Redis-backed rate limiter decorator.
-    Drops execution when the user exceeds messages_per_window within window_seconds.
+    Rate limiter decorator with one bucket per handler and user, or per
+    handler and chat with per_chat=True.
+    Drops execution once the bucket has let messages_per_window updates
+    through within window_seconds.
     """
     def decorator(func):
+        def limited(key, wait):
+            logging.info(
+                f"Rate limit exceeded for {key}, retry in {wait:.1f}s. "
+                f"Allowed {messages_per_window} updates in {window_seconds} seconds."
+            )
+
         if inspect.iscoroutinefunction(func):
             @wraps(func)
             async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-                user_id = update.effective_user.id if update.effective_user else 0
-                current_time = time.time()
-                key = f"rate_limit:{user_id}"
-
-                user_history = [float(t) for t in redis_client.lrange(key, 0, -1)]
-                user_history = [t for t in user_history if current_time - t <= window_seconds]
-
-                if len(user_history) >= messages_per_window:
-                    logging.info(
-                        f"Rate limit exceeded for user {user_id}. "
-                        f"Allowed {messages_per_window} updates in {window_seconds} seconds."
-                    )
+                key = _rate_limit_key(func, update, per_chat)
+                wait = await RATE_LIMITER.hit(key, messages_per_window, window_seconds)
+                if wait:
+                    limited(key, wait)
                     return
-
-                pipe = redis_client.pipeline()
-                pipe.lpush(key, current_time)
-                pipe.ltrim(key, 0, messages_per_window - 1)
-                pipe.expire(key, window_seconds)
-                pipe.execute()
-
                 return await func(update, context)
             return wrapper
         else:
             @wraps(func)
             def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-                user_id = update.effective_user.id if update.effective_user else 0
-                current_time = time.time()
-                key = f"rate_limit:{user_id}"
-
-                user_history = [float(t) for t in redis_client.lrange(key, 0, -1)]
-                user_history = [t for t in user_history if current_time - t <= window_seconds]
-
-                if len(user_history) >= messages_per_window:
-                    logging.info(
-                        f"Rate limit exceeded for user {user_id}. "
-                        f"Allowed {messages_per_window} updates in {window_seconds} seconds."
-                    )
+                # no event loop to await redis on; limit in-process
+                key = _rate_limit_key(func, update, per_chat)
+                wait = RATE_LIMITER.memory.hit(key, messages_per_window, window_seconds)
+                if wait:
+                    limited(key, wait)
                     return
-
-                pipe = redis_client.pipeline()
-                pipe.lpush(key, current_time)
-                pipe.ltrim(key, 0, messages_per_window - 1)
-                pipe.expire(key, window_seconds)
-                pipe.execute()
-
                 return func(update, context)
             return wrapper
     return decorator
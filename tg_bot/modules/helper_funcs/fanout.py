@@ -0,0 +1,231 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional, Sequence
+
+import httpx
+from telegram.error import NetworkError, RetryAfter, TelegramError, TimedOut
+
+from tg_bot import KInit, log
+from tg_bot.modules.sql import fanout_sql, run_blocking
+
+# successful calls between each step back up toward the configured rate
+RECOVER_EVERY = 50
+NETWORK_RETRIES = 3
+# httpx errors raised before the request left, so a retry cannot send twice
+UNSENT_ERRORS = (httpx.ConnectError,)
+# per-chat gaps tracked before the ones already past are dropped
+PRUNE_CHATS = 10000
+
+
+@dataclass
+class FanOutResult:
+    total: int
+    done: int = 0  # targets handled, failures included
+    affected: int = 0  # calls that reported a change
+    failed: int = 0
+    aborted: bool = False
+    error: Optional[TelegramError] = None
+    cursor: int = 0  # every target before this index has been handled
+    counts: Counter = field(default_factory=Counter)  # tallies kept by call itself
+
+
+def _unsent(error) -> bool:
+    return isinstance(error.__cause__, UNSENT_ERRORS)
+
+
+def _seconds(retry_after) -> float:
+    # PTB reports retry_after as an int or a timedelta depending on version
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+class Pacer:
+    """
+    Spaces calls at most `rate` per second overall and per_chat seconds
+    apart for the same chat. A RetryAfter pauses every worker for the
+    time Telegram asked and halves the rate, which then creeps back up
+    as calls succeed.
+    """
+
+    def __init__(self, rate, per_chat=1.0, min_rate=1.0):
+        self.max_rate = self.rate = float(rate)
+        self.min_rate = min(min_rate, self.rate)
+        self.per_chat = per_chat
+        self._next = 0.0
+        self._paused_until = 0.0
+        self._chat_next = {}
+        self._successes = 0
+
+    async def wait(self, chat_id):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if len(self._chat_next) > PRUNE_CHATS:
+            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+        at = max(now, self._next, self._paused_until, self._chat_next.get(chat_id, 0.0))
+        self._next = max(self._next, at) + 1 / self.rate
+        self._chat_next[chat_id] = at + self.per_chat
+        if at > now:
+            await asyncio.sleep(at - now)
+
+    def retry_after(self, seconds):
+        self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + seconds)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._successes = 0
+
+    def succeeded(self):
+        self._successes += 1
+        if self._successes >= RECOVER_EVERY and self.rate < self.max_rate:
+            self._successes = 0
+            self.rate = min(self.max_rate, self.rate * 1.25)
+
+
+# Bot API budget shared by every fan-out that is not given its own pacer
+BOT_PACER = Pacer(KInit.FANOUT_RATE)
+
+
+class FanOut:
+    """
+    Runs call(target) for every target with up to `concurrency` calls in
+    flight, paced by a Pacer, BOT_PACER unless one is given. call returns
+    whether it changed anything.
+
+    on_error(target, error) decides what a failed call means: return True
+    to abort the run, anything else counts the target as failed and moves
+    on. RetryAfter, and network errors raised before the request was sent,
+    are retried here and never reach it. A TimedOut is not retried, as the
+    call may already have gone through.
+
+    With a job_id the run checkpoints its cursor and totals into fanout_sql
+    every progress_every seconds and removes the job when it ends, so a run
+    interrupted by a restart can continue with start=cursor and the saved
+    affected, failed and counts. counts is kept as result.counts, so call
+    can tally into the Counter it passed in. on_progress,
+    if given, is awaited with the FanOutResult at the same interval and
+    once more at the end.
+    """
+
+    def __init__(
+        self,
+        targets: Sequence,
+        call: Callable[..., Awaitable[bool]],
+        *,
+        concurrency: int = None,
+        pacer: Pacer = None,
+        on_error: Callable[..., bool] = None,
+        on_progress: Callable[[FanOutResult], Awaitable] = None,
+        progress_every: float = 5.0,
+        job_id: str = None,
+        start: int = 0,
+        affected: int = 0,
+        failed: int = 0,
+        counts: Counter = None,
+    ):
+        self.targets = list(targets)
+        self.call = call
+        self.concurrency = concurrency or KInit.FANOUT_CONCURRENCY
+        self.pacer = pacer or BOT_PACER
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.progress_every = progress_every
+        self.job_id = job_id
+        self.result = FanOutResult(
+            total=len(self.targets),
+            done=start,
+            affected=affected,
+            failed=failed,
+            cursor=start,
+            counts=Counter() if counts is None else counts,
+        )
+        self._start = start
+        self._finished = set()
+
+    async def run(self) -> FanOutResult:
+        queue = asyncio.Queue()
+        for index in range(self._start, len(self.targets)):
+            queue.put_nowait(index)
+        workers = [
+            asyncio.create_task(self._worker(queue))
+            for _ in range(min(self.concurrency, queue.qsize()))
+        ]
+        reporter = asyncio.create_task(self._report())
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+        await self._progress()
+        if self.job_id:
+            await run_blocking(fanout_sql.finish_job, self.job_id)
+        return self.result
+
+    async def _worker(self, queue):
+        while not self.result.aborted:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._handle(self.targets[index])
+            self._mark_done(index)
+
+    async def _handle(self, target):
+        network_errors = 0
+        while not self.result.aborted:
+            await self.pacer.wait(target)
+            try:
+                if await self.call(target):
+                    self.result.affected += 1
+                self.pacer.succeeded()
+                return
+            except RetryAfter as e:
+                log.warning(f"[FanOut] Flood limited, pausing {_seconds(e.retry_after)}s")
+                self.pacer.retry_after(_seconds(e.retry_after))
+            except TimedOut as e:
+                self._failed(target, e)
+                return
+            except NetworkError as e:
+                network_errors += 1
+                if not _unsent(e) or network_errors > NETWORK_RETRIES:
+                    self._failed(target, e)
+                    return
+            except TelegramError as e:
+                self._failed(target, e)
+                return
+
+    def _failed(self, target, error):
+        self.result.failed += 1
+        if self.on_error and self.on_error(target, error) is True:
+            self.result.aborted = True
+            self.result.error = error
+
+    def _mark_done(self, index):
+        self.result.done += 1
+        self._finished.add(index)
+        while self.result.cursor in self._finished:
+            self._finished.discard(self.result.cursor)
+            self.result.cursor += 1
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.progress_every)
+            await self._progress()
+
+    async def _progress(self):
+        if self.job_id and not self.result.aborted:
+            try:
+                await run_blocking(
+                    fanout_sql.update_job,
+                    self.job_id,
+                    self.result.cursor,
+                    self.result.affected,
+                    self.result.failed,
+                    dict(self.result.counts),
+                )
+            except Exception:
+                log.exception(f"[FanOut] Checkpointing {self.job_id} failed")
+        if self.on_progress:
+            try:
+                await self.on_progress(self.result)
+            except TelegramError as e:
+                # e.g. "Message is not modified" when nothing moved
+                log.debug(f"[FanOut] Progress report failed: {e}")
@@ -0,0 +1,129 @@
+import asyncio
+from typing import Callable, Iterable, List, Tuple
+
+from tg_bot import KInit, log
+from tg_bot.modules.sql import BLOCKING_STATS, POOL_STATS, QUERY_CACHE
+
+# (name, type, help, [(labels, value)])
+Metric = Tuple[str, str, str, List[Tuple[dict, float]]]
+
+COLLECTORS: List[Callable[[], Iterable[Metric]]] = []
+
+
+def collector(func):
+    """Registers a function yielding Metric tuples for the /metrics page."""
+    COLLECTORS.append(func)
+    return func
+
+
+@collector
+def _pool_metrics():
+    snapshots = {name: stats.snapshot() for name, stats in POOL_STATS.items() if stats.pool}
+    for key, kind, doc in (
+        ("size", "gauge", "Persistent connections the pool keeps"),
+        ("checked_out", "gauge", "Connections currently checked out"),
+        ("overflow", "gauge", "Overflow connections currently open"),
+        ("peak_checked_out", "gauge", "Most connections checked out at once"),
+        ("checkouts", "counter", "Connection checkouts"),
+        ("timeouts", "counter", "Checkouts that hit pool_timeout"),
+        ("connects", "counter", "New DBAPI connections"),
+        ("recycles", "counter", "Connections replaced after pool_recycle"),
+        ("invalidations", "counter", "Connections invalidated, e.g. by a failed pre-ping"),
+    ):
+        yield (
+            f"tg_bot_db_pool_{key}",
+            kind,
+            doc,
+            [({"engine": name}, snap[key]) for name, snap in snapshots.items()],
+        )
+
+    samples = []
+    for name, snap in snapshots.items():
+        total = 0
+        for bound, count in snap["wait_buckets"]:
+            total += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            samples.append(({"engine": name, "le": le}, total, "_bucket"))
+        samples.append(({"engine": name}, snap["wait_sum"], "_sum"))
+        samples.append(({"engine": name}, total, "_count"))
+    yield (
+        "tg_bot_db_pool_wait_seconds",
+        "histogram",
+        "Time spent waiting for a pool connection",
+        samples,
+    )
+
+
+@collector
+def _sql_worker_metrics():
+    stats = BLOCKING_STATS.snapshot()
+    yield "tg_bot_sql_queued", "gauge", "Calls waiting for a SQL worker", [({}, stats["queued"])]
+    yield "tg_bot_sql_running", "gauge", "Calls running on SQL workers", [({}, stats["running"])]
+    yield "tg_bot_sql_completed", "counter", "Calls finished by SQL workers", [({}, stats["completed"])]
+    yield "tg_bot_sql_failed", "counter", "Calls that raised on SQL workers", [({}, stats["failed"])]
+
+
+@collector
+def _query_cache_metrics():
+    stats = QUERY_CACHE.stats()
+    yield "tg_bot_query_cache_entries", "gauge", "Cached query results", [({}, stats["entries"])]
+    yield "tg_bot_query_cache_bytes", "gauge", "Size of cached query results", [({}, stats["bytes"])]
+    yield "tg_bot_query_cache_hits", "counter", "Query cache hits", [({}, stats["hits"])]
+    yield "tg_bot_query_cache_misses", "counter", "Query cache misses", [({}, stats["misses"])]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def render() -> str:
+    """Prometheus text exposition of every registered collector."""
+    lines = []
+    for func in COLLECTORS:
+        try:
+            metrics = list(func())
+        except Exception:
+            log.exception(f"[Metrics] collector {func.__name__} failed")
+            continue
+        for name, kind, doc, samples in metrics:
+            lines.append(f"# HELP {name} {doc}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample in samples:
+                labels, value = sample[0], sample[1]
+                suffix = sample[2] if len(sample) > 2 else ""
+                lines.append(f"{name}{suffix}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass  # skip headers
+        parts = request.split()
+        if len(parts) > 1 and parts[1].split(b"?")[0] == b"/metrics":
+            status, body = b"200 OK", render().encode()
+        else:
+            status, body = b"404 Not Found", b"not found\n"
+        writer.write(
+            b"HTTP/1.1 " + status + b"\r\n"
+            b"Content-Type: text/plain; version=0.0.4\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+            b"Connection: close\r\n\r\n" + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server():
+    """Serves /metrics on METRICS_HOST:METRICS_PORT; off while the port is 0."""
+    if not KInit.METRICS_PORT:
+        return None
+    server = await asyncio.start_server(_serve, KInit.METRICS_HOST, KInit.METRICS_PORT)
+    log.info(f"[Metrics] Serving on {KInit.METRICS_HOST}:{KInit.METRICS_PORT}/metrics")
+    return server
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+
+from redis.exceptions import RedisError
+
+from tg_bot import log
+from tg_bot.modules.helper_funcs.redis_pool import get_async_redis
+
+# seconds to serve from the in-process limiter after redis fails
+REDIS_RETRY_AFTER = 30
+
+
+class MemoryRateLimiter:
+    """
+    GCRA token buckets kept in this process: `limit` calls may burst, after
+    which one more is allowed every window / limit seconds. Keys whose
+    bucket has refilled are evicted as new ones arrive.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tats = OrderedDict()  # key -> theoretical arrival time
+
+    def hit(self, key, limit, window, now=None):
+        """Seconds until key may pass again; 0 when this call passes."""
+        now = time.monotonic() if now is None else now
+        interval = window / limit
+        with self._lock:
+            self._evict(now)
+            tat = max(self._tats.pop(key, now), now)
+            new_tat = tat + interval
+            if new_tat - now > window:
+                self._tats[key] = tat
+                return new_tat - now - window
+            self._tats[key] = new_tat
+            return 0.0
+
+    def _evict(self, now):
+        while self._tats and next(iter(self._tats.values())) <= now:
+            self._tats.popitem(last=False)
+
+
+class RedisRateLimiter:
+    """
+    Same interface as MemoryRateLimiter, shared by every bot process. Each
+    check is a single script call; the bucket's key expires once it has
+    refilled, and the clock is redis' own so processes agree on it.
+    """
+
+    KEY_PREFIX = "rate_limit:"
+
+    _GCRA = """
+    local limit = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2]) * 1000
+    local interval = window / limit
+    local clock = redis.call('TIME')
+    local now = clock[1] * 1000 + clock[2] / 1000
+    local tat = tonumber(redis.call('GET', KEYS[1]))
+    if not tat or tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    if new_tat - now > window then
+        return math.ceil(new_tat - now - window)
+    end
+    redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+    return 0
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._gcra = client.register_script(self._GCRA)
+
+    async def hit(self, key, limit, window):
+        wait_ms = await self._gcra(keys=[self.KEY_PREFIX + key], args=[limit, window])
+        return wait_ms / 1000
+
+
+class RateLimiter:
+    """
+    Checks against redis, falling back to the in-process buckets for
+    REDIS_RETRY_AFTER seconds whenever redis errors or times out.
+    """
+
+    def __init__(self, redis_limiter, memory_limiter):
+        self.redis = redis_limiter
+        self.memory = memory_limiter
+        self._redis_down_until = 0.0
+
+    async def hit(self, key, limit, window):
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return await self.redis.hit(key, limit, window)
+            except (RedisError, OSError) as e:
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+                log.warning(f"[RateLimit] redis unavailable, limiting in-process: {e}")
+        return self.memory.hit(key, limit, window)
+
+
+RATE_LIMITER = RateLimiter(RedisRateLimiter(get_async_redis()), MemoryRateLimiter())
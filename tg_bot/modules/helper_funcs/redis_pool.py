@@ -0,0 +1,62 @@
+import redis
+import redis.asyncio as aioredis
+
+from tg_bot import KInit, log
+
+# (sync or async, decode_responses) -> shared connection pool
+_POOLS = {}
+
+
+def _connection_kwargs(decode_responses):
+    return {
+        "host": KInit.REDIS_HOST,
+        "port": KInit.REDIS_PORT,
+        "db": KInit.REDIS_DB,
+        "password": KInit.REDIS_PASSWORD,
+        "decode_responses": decode_responses,
+        "socket_timeout": KInit.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": KInit.REDIS_SOCKET_TIMEOUT,
+        "socket_keepalive": KInit.REDIS_SOCKET_KEEPALIVE,
+        "health_check_interval": KInit.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+def _client_cache_kwargs():
+    """RESP3 client-side caching for the sync pools, when enabled and supported."""
+    if not KInit.REDIS_CLIENT_CACHE:
+        return {}
+    try:
+        from redis.cache import CacheConfig
+    except ImportError:
+        log.warning("[Redis] This redis-py has no client-side caching, REDIS_CLIENT_CACHE ignored")
+        return {}
+    return {"protocol": 3, "cache_config": CacheConfig(max_size=KInit.REDIS_CLIENT_CACHE_SIZE)}
+
+
+def get_redis(decode_responses=False) -> redis.Redis:
+    """
+    A client on the process-wide sync pool. Clients are cheap; connections,
+    at most REDIS_MAX_CONNECTIONS per pool, are shared by all of them.
+    """
+    key = ("sync", decode_responses)
+    if key not in _POOLS:
+        _POOLS[key] = redis.BlockingConnectionPool(
+            max_connections=KInit.REDIS_MAX_CONNECTIONS,
+            timeout=KInit.REDIS_SOCKET_TIMEOUT,
+            **_connection_kwargs(decode_responses),
+            **_client_cache_kwargs(),
+        )
+    return redis.Redis(connection_pool=_POOLS[key])
+
+
+def get_async_redis(decode_responses=False) -> aioredis.Redis:
+    """Like get_redis, for code running on the event loop."""
+    key = ("async", decode_responses)
+    if key not in _POOLS:
+        _POOLS[key] = aioredis.BlockingConnectionPool(
+            max_connections=KInit.REDIS_MAX_CONNECTIONS,
+            timeout=KInit.REDIS_SOCKET_TIMEOUT,
+            **_connection_kwargs(decode_responses),
+        )
+    return aioredis.Redis(connection_pool=_POOLS[key])
+
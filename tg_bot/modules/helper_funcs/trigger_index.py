@@ -0,0 +1,76 @@
+import re
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+def trigger_order(trigger: str):
+    # longest trigger wins, ties broken alphabetically
+    return -len(trigger), trigger
+
+
+class TriggerIndex:
+    """Compiles each chat's trigger set into a single regex.
+
+    Triggers are matched case-insensitively on the same word boundaries as the
+    old per-trigger ``( |^|[^\\w])trigger( |$|[^\\w])`` search, and the winner
+    is the first trigger in ``trigger_order`` that occurs anywhere in the text.
+    With ``wildcard=True`` a ``*`` in a trigger matches any run of
+    non-whitespace characters; in a trigger made only of ``*`` the run
+    must be non-empty, so it cannot match every message.
+
+    Mutations only bump a per-chat version through ``invalidate``; the
+    matcher is rebuilt lazily on the next ``match`` for that chat.
+    """
+
+    def __init__(self, source: Callable[[str], Iterable[str]], wildcard: bool = False):
+        self._source = source
+        self._wildcard = wildcard
+        self._versions: Dict[int, int] = {}
+        self._compiled: Dict[int, Tuple[int, Tuple[str, ...], re.Pattern]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, chat_id):
+        chat_id = int(chat_id)
+        with self._lock:
+            self._versions[chat_id] = self._versions.get(chat_id, 0) + 1
+
+    def migrate(self, old_chat_id, new_chat_id):
+        self.invalidate(old_chat_id)
+        self.invalidate(new_chat_id)
+
+    def _escape(self, trigger: str) -> str:
+        escaped = re.escape(trigger)
+        if self._wildcard:
+            run = r"\S*" if trigger.strip("*") else r"\S+"
+            escaped = escaped.replace(r"\*", run)
+        return escaped
+
+    def _compile(self, triggers: Tuple[str, ...]) -> re.Pattern:
+        # Zero-width lookahead so every start position is tried; one group
+        # per trigger so match.lastindex tells which trigger fired.
+        alternation = "|".join("({})".format(self._escape(t)) for t in triggers)
+        return re.compile(r"(?=(?<!\w)(?:" + alternation + r")(?!\w))", re.IGNORECASE)
+
+    def _get(self, chat_id: int):
+        version = self._versions.get(chat_id, 0)
+        compiled = self._compiled.get(chat_id)
+        if compiled is not None and compiled[0] == version:
+            return compiled
+
+        triggers = tuple(sorted(set(self._source(chat_id) or ()), key=trigger_order))
+        compiled = (version, triggers, self._compile(triggers) if triggers else None)
+        self._compiled[chat_id] = compiled
+        return compiled
+
+    def match(self, chat_id, text: str) -> Optional[str]:
+        _, triggers, pattern = self._get(int(chat_id))
+        if pattern is None or not text:
+            return None
+
+        best = None
+        for found in pattern.finditer(text):
+            if best is None or found.lastindex < best:
+                best = found.lastindex
+                if best == 1:
+                    break
+        return triggers[best - 1] if best else None
@@ -0,0 +1,83 @@
+from typing import Any, Callable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes, TypeHandler
+
+from tg_bot import dispatcher
+from tg_bot.modules.sql import approve_sql
+
+# runs before every other handler group
+MODERATION_CONTEXT_GROUP = -100
+
+_UNSET = object()
+
+
+class ModerationContext:
+    """
+    Facts about one update that several moderation handlers need.
+    Built once per update and stored on the shared CallbackContext; each fact
+    is only computed the first time a handler asks for it.
+    """
+
+    __slots__ = ("update", "_text", "_approved", "_admin", "_settings")
+
+    def __init__(self, update: Update):
+        self.update = update
+        self._text = _UNSET
+        self._approved = _UNSET
+        self._admin = _UNSET
+        self._settings: Dict[str, Any] = {}
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._text is _UNSET:
+            from tg_bot.modules.helper_funcs.extraction import extract_text
+
+            message = self.update.effective_message
+            self._text = extract_text(message) if message else None
+        return self._text
+
+    @property
+    def is_approved(self) -> bool:
+        if self._approved is _UNSET:
+            chat = self.update.effective_chat
+            user = self.update.effective_user
+            self._approved = bool(
+                chat and user and approve_sql.is_approved(chat.id, user.id)
+            )
+        return self._approved
+
+    async def is_admin(self) -> bool:
+        if self._admin is _UNSET:
+            from tg_bot.modules.helper_funcs.chat_status import is_user_admin
+
+            user = self.update.effective_user
+            self._admin = bool(user and await is_user_admin(self.update, user.id))
+        return self._admin
+
+    def setting(self, name: str, loader: Callable[[Any], Any]) -> Any:
+        """Return loader(chat_id), memoized under name for this update."""
+        try:
+            return self._settings[name]
+        except KeyError:
+            value = self._settings[name] = loader(self.update.effective_chat.id)
+            return value
+
+
+def get_moderation_context(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> ModerationContext:
+    mod_ctx = getattr(context, "moderation", None)
+    if mod_ctx is None or mod_ctx.update is not update:
+        mod_ctx = ModerationContext(update)
+        context.moderation = mod_ctx
+    return mod_ctx
+
+
+async def attach_moderation_context(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.moderation = ModerationContext(update)
+
+
+dispatcher.add_handler(
+    TypeHandler(Update, attach_moderation_context), group=MODERATION_CONTEXT_GROUP
+)
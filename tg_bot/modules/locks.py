@@ -21,7 +21,7 @@ from tg_bot.modules.helper_funcs.chat_status import (
 )
 from tg_bot.modules.helper_funcs.decorators import kigcmd, kigmsg, rate_limit
 from tg_bot.modules.log_channel import loggable
-from tg_bot.modules.sql.approve_sql import is_approved
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 from ..modules.helper_funcs.anonymous import user_admin, AdminPerms
 
 ad = AlphabetDetector()
@@ -152,7 +152,7 @@ async def lock(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:  # so
     user = update.effective_user
 
     if (
-        can_delete(chat, context.bot.id)
+        await can_delete(chat, context.bot.id)
         or update.effective_message.chat.type == "private"
     ):
         if len(args) >= 1:
@@ -321,16 +321,23 @@ async def unlock(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:  #
 async def del_lockables(update: Update, context: ContextTypes.DEFAULT_TYPE):  # sourcery no-metrics
     chat: Optional[Chat] = update.effective_chat
     message: Optional[Message] = update.effective_message
-    user = update.effective_user
     if not chat or not message:
         return
 
-    if is_approved(chat.id, user.id):
+    # one dict lookup answers every lock for this chat
+    locks = sql.get_lock_mask(chat.id) & sql.PERM_MASK
+    if not locks:
+        return
+
+    if get_moderation_context(update, context).is_approved:
         return
 
     for lockable, filter_ in LOCK_TYPES.items():
+        if not locks & sql.PERM_BITS[lockable]:
+            continue
+
         if lockable == "rtl":
-            if sql.is_locked(chat.id, lockable) and can_delete(chat, context.bot.id):
+            if await can_delete(chat, context.bot.id):
                 if message.caption:
                     check = ad.detect_alphabet(u"{}".format(message.caption))
                     if "ARABIC" in check:
@@ -353,10 +360,9 @@ async def del_lockables(update: Update, context: ContextTypes.DEFAULT_TYPE):  #
 
         if lockable == "button":
             if (
-                sql.is_locked(chat.id, lockable)
-                and can_delete(chat, context.bot.id)
-                and message.reply_markup
+                message.reply_markup
                 and message.reply_markup.inline_keyboard
+                and await can_delete(chat, context.bot.id)
             ):
                 try:
                     await message.delete()
@@ -367,12 +373,7 @@ async def del_lockables(update: Update, context: ContextTypes.DEFAULT_TYPE):  #
             continue
 
         if lockable == "inline":
-            if (
-                sql.is_locked(chat.id, lockable)
-                and can_delete(chat, context.bot.id)
-                and message
-                and message.via_bot
-            ):
+            if message.via_bot and await can_delete(chat, context.bot.id):
                 try:
                     await message.delete()
                 except BadRequest as excp:
@@ -387,12 +388,12 @@ async def del_lockables(update: Update, context: ContextTypes.DEFAULT_TYPE):  #
         except Exception:
             matched = False
 
-        if matched and sql.is_locked(chat.id, lockable) and can_delete(chat, context.bot.id):
+        if matched and await can_delete(chat, context.bot.id):
             if lockable == "bots":
                 new_members = update.effective_message.new_chat_members
                 for new_mem in new_members:
                     if new_mem.is_bot:
-                        if not is_bot_admin(chat, context.bot.id):
+                        if not await is_bot_admin(chat, context.bot.id):
                             await send_message(
                                 update.effective_message,
                                 "I see a bot and I've been told to stop them from joining..."
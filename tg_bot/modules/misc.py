@@ -17,6 +17,7 @@ from telegram import __version__ as ptbver
 from psutil import cpu_percent, virtual_memory, disk_usage, boot_time
 
 from tg_bot import (
+    application,
     dispatcher,
     OWNER_ID,
     SUDO_USERS,
@@ -29,7 +30,8 @@ from tg_bot import (
 )
 # Avoid circular import: fetch STATS/USER_INFO lazily when needed
 
-from tg_bot.modules.sql import SESSION
+from tg_bot.modules.sql import SESSION, run_blocking
+from tg_bot.modules.sql import stats_sql
 from tg_bot.modules.helper_funcs.chat_status import user_admin, sudo_plus
 from tg_bot.modules.helper_funcs.extraction import extract_user
 import tg_bot.modules.sql.users_sql as sql
@@ -442,6 +444,23 @@ async def pingCallback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer(f'Pong! {ping_time}ms')
 
 
+async def refresh_stats(_: ContextTypes.DEFAULT_TYPE):
+    await run_blocking(stats_sql.refresh_counters)
+
+
+async def reconcile_stats(_: ContextTypes.DEFAULT_TYPE):
+    await run_blocking(stats_sql.refresh_counters, full=True)
+
+
+if application.job_queue:
+    application.job_queue.run_repeating(
+        refresh_stats, interval=stats_sql.REFRESH_INTERVAL, first=stats_sql.REFRESH_INTERVAL
+    )
+    application.job_queue.run_repeating(
+        reconcile_stats, interval=stats_sql.RECONCILE_INTERVAL, first=stats_sql.RECONCILE_INTERVAL
+    )
+
+
 def get_help(chat):
     return gs(chat, "misc_help")
 
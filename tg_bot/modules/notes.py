@@ -48,7 +48,7 @@ async def get(update: Update, context: ContextTypes.DEFAULT_TYPE, notename, show
     bot = context.bot
     chat_id = update.effective_message.chat.id
     note_chat_id = update.effective_chat.id
-    note = sql.get_note(note_chat_id, notename)
+    note = await sql.get_note_async(note_chat_id, notename)
     message: Optional[Message] = update.effective_message
 
     if note:
@@ -138,7 +138,7 @@ async def get(update: Update, context: ContextTypes.DEFAULT_TYPE, notename, show
 
             keyb = []
             parseMode = ParseMode.HTML
-            buttons = sql.get_buttons(note_chat_id, notename)
+            buttons = await sql.get_buttons_async(note_chat_id, notename)
             if no_format:
                 parseMode = None
                 text += revert_buttons(buttons)
@@ -381,11 +381,8 @@ async def clearall_btn(update: Update, context: ContextTypes.DEFAULT_TYPE):
     member = await chat.get_member(query.from_user.id)
     if query.data == "notes_rmall":
         if member.status == "creator" or query.from_user.id in SUDO_USERS:
-            note_list = sql.get_all_chat_notes(chat.id)
+            sql.rm_all_notes(chat.id)
             try:
-                for notename in note_list:
-                    note = notename.name.lower()
-                    sql.rm_note(chat.id, note)
                 await message.edit_text("Deleted all notes.")
             except BadRequest:
                 return
@@ -430,6 +427,11 @@ async def list_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def __import_data__(chat_id, data):  # sourcery no-metrics
     failures = []
+    pending = []
+
+    def add(note_name, note_data, msgtype, buttons=None, file=None):
+        pending.append((note_name, note_data, msgtype, buttons, file))
+
     for notename, notedata in data.get("extra", {}).items():
         match = FILE_MATCHER.match(notedata)
         matchsticker = STICKER_MATCHER.match(notedata)
@@ -445,82 +447,64 @@ async def __import_data__(chat_id, data):  # sourcery no-metrics
             failures.append(notename)
             notedata = notedata[match.end() :].strip()
             if notedata:
-                sql.add_note_to_db(chat_id, notename[1:], notedata, sql.Types.TEXT)
+                add(notename[1:], notedata, sql.Types.TEXT)
         elif matchsticker:
             content = notedata[matchsticker.end() :].strip()
             if content:
-                sql.add_note_to_db(
-                    chat_id, notename[1:], notedata, sql.Types.STICKER, file=content
-                )
+                add(notename[1:], notedata, sql.Types.STICKER, file=content)
         elif matchbtn:
             parse = notedata[matchbtn.end() :].strip()
             notedata = parse.split("<###button###>")[0]
             buttons = parse.split("<###button###>")[1]
             buttons = ast.literal_eval(buttons)
             if buttons:
-                sql.add_note_to_db(
-                    chat_id,
-                    notename[1:],
-                    notedata,
-                    sql.Types.BUTTON_TEXT,
-                    buttons=buttons,
-                )
+                add(notename[1:], notedata, sql.Types.BUTTON_TEXT, buttons=buttons)
         elif matchfile:
             file = notedata[matchfile.end() :].strip()
             file = file.split("<###TYPESPLIT###>")
             notedata = file[1]
             content = file[0]
             if content:
-                sql.add_note_to_db(
-                    chat_id, notename[1:], notedata, sql.Types.DOCUMENT, file=content
-                )
+                add(notename[1:], notedata, sql.Types.DOCUMENT, file=content)
         elif matchphoto:
             photo = notedata[matchphoto.end() :].strip()
             photo = photo.split("<###TYPESPLIT###>")
             notedata = photo[1]
             content = photo[0]
             if content:
-                sql.add_note_to_db(
-                    chat_id, notename[1:], notedata, sql.Types.PHOTO, file=content
-                )
+                add(notename[1:], notedata, sql.Types.PHOTO, file=content)
         elif matchaudio:
             audio = notedata[matchaudio.end() :].strip()
             audio = audio.split("<###TYPESPLIT###>")
             notedata = audio[1]
             content = audio[0]
             if content:
-                sql.add_note_to_db(
-                    chat_id, notename[1:], notedata, sql.Types.AUDIO, file=content
-                )
+                add(notename[1:], notedata, sql.Types.AUDIO, file=content)
         elif matchvoice:
             voice = notedata[matchvoice.end() :].strip()
             voice = voice.split("<###TYPESPLIT###>")
             notedata = voice[1]
             content = voice[0]
             if content:
-                sql.add_note_to_db(
-                    chat_id, notename[1:], notedata, sql.Types.VOICE, file=content
-                )
+                add(notename[1:], notedata, sql.Types.VOICE, file=content)
         elif matchvideo:
             video = notedata[matchvideo.end() :].strip()
             video = video.split("<###TYPESPLIT###>")
             notedata = video[1]
             content = video[0]
             if content:
-                sql.add_note_to_db(
-                    chat_id, notename[1:], notedata, sql.Types.VIDEO, file=content
-                )
+                add(notename[1:], notedata, sql.Types.VIDEO, file=content)
         elif matchvn:
             video_note = notedata[matchvn.end() :].strip()
             video_note = video_note.split("<###TYPESPLIT###>")
             notedata = video_note[1]
             content = video_note[0]
             if content:
-                sql.add_note_to_db(
-                    chat_id, notename[1:], notedata, sql.Types.VIDEO_NOTE, file=content
-                )
+                add(notename[1:], notedata, sql.Types.VIDEO_NOTE, file=content)
         else:
-            sql.add_note_to_db(chat_id, notename[1:], notedata, sql.Types.TEXT)
+            add(notename[1:], notedata, sql.Types.TEXT)
+
+    sql.add_notes_to_db(chat_id, pending)
 
     if failures:
         with BytesIO(str.encode("\n".join(failures))) as output:
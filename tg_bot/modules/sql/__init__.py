@@ -1,46 +1,138 @@
+import asyncio
+import threading
 import time
-from sqlalchemy import create_engine
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from sqlalchemy import BigInteger, Column, Integer, String, Table, create_engine, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, scoped_session, Query
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from tg_bot import DB_URI, KInit, log
+from tg_bot.modules.sql.pool_stats import (
+    InstrumentedAsyncPool,
+    InstrumentedQueuePool,
+    PoolStats,
+    instrument,
+    percentiles,
+)
+from tg_bot.modules.sql.query_cache import QueryCache, install as install_query_cache
+from tg_bot.modules.sql.replicas import (
+    USE_REPLICA,
+    RoutingSession,
+    chat_id_getter,
+    routes_to_replica,
+)
+
+QUERY_CACHE = QueryCache(
+    maxsize=KInit.QUERY_CACHE_SIZE,
+    ttl=KInit.QUERY_CACHE_TTL,
+    max_bytes=KInit.QUERY_CACHE_MB * 1024 * 1024,
+)
+install_query_cache(QUERY_CACHE)
+
+POOL_STATS = {"sync": PoolStats("sync"), "async": PoolStats("async")}
+# seconds between adapt_pool_size runs when POSTGRES_POOL_ADAPTIVE is set
+POOL_ADAPT_INTERVAL = 300
+
+def get_db_uri(uri=None):
+    uri = uri or DB_URI
+    if uri and uri.startswith("postgres://"):
+        return uri.replace("postgres://", "postgresql://", 1)
+    return uri
+
+def get_async_db_uri(uri=None):
+    uri = get_db_uri(uri)
+    if not uri or not uri.startswith("postgresql"):
+        return None
+    return "postgresql+asyncpg://" + uri.split("://", 1)[1]
+
+# Tables that exist in the database, and the (table, column) pairs among
+# them already stored as integers; filled in by start().
+EXISTING_TABLES = set()
+BIGINT_COLUMNS = set()
+
+
+class ChatId(TypeDecorator):
+    """
+    A Telegram chat id column.
+    Stored as String(14) on existing tables until chat_id_migration moves
+    them to BIGINT, and as BIGINT on new tables once BIGINT_CHAT_IDS is set.
+    Binds str or int to match the storage and always loads int, so the same
+    helpers and int-keyed caches work on either layout.
+    """
+
+    impl = String(14)
+    cache_ok = True
 
-class CachingQuery(Query):
-    def __init__(self, *args, cache=None, **kwargs):
-        super().__init__(*args, ** kwargs)
-        self.cache = cache or {}
+    def __init__(self, bigint=False):
+        super().__init__()
+        self.bigint = bigint
 
-    def __iter__(self):
-        cache_key = self.cache_key()
-        result = self.cache.get(cache_key)
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(BigInteger() if self.bigint else String(14))
 
-        if result is None:
-            result = list(super().__iter__())
-            self.cache[cache_key] = result
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(value) if self.bigint else str(value)
 
-        return iter(result)
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:  # legacy rows the migration's check would flag
+            return value
+
+
+@event.listens_for(Column, "after_parent_attach")
+def _resolve_chat_id_storage(column, table):
+    # Runs as each model's table is built, so every mapped ChatId column
+    # already matches what the database holds before the first query.
+    if not isinstance(column.type, ChatId) or not isinstance(table, Table):
+        return
+    if table.name in EXISTING_TABLES:
+        column.type = ChatId((table.name, column.name) in BIGINT_COLUMNS)
+    else:
+        column.type = ChatId(KInit.BIGINT_CHAT_IDS)
 
-    def cache_key(self):
-        stmt = self.with_labels().statement
-        compiled = stmt.compile()
-        params = compiled.params
-        return " ".join([str(compiled)] + [str(params[k]) for k in sorted(params)])
 
-def get_db_uri():
-    if DB_URI and DB_URI.startswith("postgres://"):
-        return DB_URI.replace("postgres://", "postgresql://", 1)
-    return DB_URI
+def _detect_chat_id_storage(engine):
+    inspector = inspect(engine)
+    EXISTING_TABLES.update(inspector.get_table_names())
+    for (_, table), columns in inspector.get_multi_columns().items():
+        for column in columns:
+            if isinstance(column["type"], Integer):
+                BIGINT_COLUMNS.add((table, column["name"]))
 
-def create_db_engine():
-    return create_engine(
-        get_db_uri(),
+
+def create_db_engine(uri=None, stats="sync"):
+    engine = create_engine(
+        get_db_uri(uri),
         client_encoding="utf8",
         echo=KInit.DEBUG,
+        poolclass=InstrumentedQueuePool,
         pool_size=KInit.POSTGRES_POOL_SIZE,
         max_overflow=KInit.POSTGRES_MAX_OVERFLOW,
         pool_timeout=KInit.POSTGRES_POOL_TIMEOUT,
-        pool_recycle=KInit.POSTGRES_POOL_RECYCLE
+        pool_recycle=KInit.POSTGRES_POOL_RECYCLE,
+        pool_pre_ping=KInit.POSTGRES_POOL_PRE_PING,
     )
+    instrument(engine, POOL_STATS.setdefault(stats, PoolStats(stats)))
+    return engine
+
+
+def create_replica_engines():
+    """One engine per SQLALCHEMY_REPLICA_URIS entry, for replica_read helpers."""
+    return [
+        create_db_engine(uri, stats=f"replica{i}")
+        for i, uri in enumerate(KInit.DB_REPLICA_URIS)
+    ]
+
 
 def start(max_retries=3, retry_delay=5):
     for attempt in range(max_retries):
@@ -48,9 +140,15 @@ def start(max_retries=3, retry_delay=5):
             engine = create_db_engine()
             log.info("[PostgreSQL] Connecting to database...")
             BASE.metadata.bind = engine
+            _detect_chat_id_storage(engine)
             BASE.metadata.create_all(engine)
+            replicas = create_replica_engines()
+            if replicas:
+                log.info(f"[PostgreSQL] Routing read-only helpers to {len(replicas)} replica(s)")
             return scoped_session(
-                sessionmaker(bind=engine, autoflush=False, query_cls=CachingQuery)
+                sessionmaker(
+                    bind=engine, class_=RoutingSession, replicas=replicas, autoflush=False
+                )
             )
         except SQLAlchemyError as e:
             log.warning(f"[PostgreSQL] Connection attempt {attempt + 1} failed: {e}")
@@ -61,6 +159,93 @@ def start(max_retries=3, retry_delay=5):
                 log.exception("[PostgreSQL] Failed to connect after maximum retries")
                 raise
 
+def start_async():
+    uri = get_async_db_uri()
+    if not uri:
+        return None
+    try:
+        engine = create_async_db_engine(uri, "async")
+        replicas = [
+            create_async_db_engine(get_async_db_uri(replica), f"async_replica{i}")
+            for i, replica in enumerate(KInit.DB_REPLICA_URIS)
+        ]
+    except ImportError as e:
+        log.warning(f"[PostgreSQL] asyncpg unavailable, async helpers fall back to the sync session: {e}")
+        return None
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        replicas=[replica.sync_engine for replica in replicas],
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+def create_async_db_engine(uri, stats):
+    engine = create_async_engine(
+        uri,
+        echo=KInit.DEBUG,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=KInit.POSTGRES_POOL_SIZE,
+        max_overflow=KInit.POSTGRES_MAX_OVERFLOW,
+        pool_timeout=KInit.POSTGRES_POOL_TIMEOUT,
+        pool_recycle=KInit.POSTGRES_POOL_RECYCLE,
+        pool_pre_ping=KInit.POSTGRES_POOL_PRE_PING,
+    )
+    instrument(engine.sync_engine, POOL_STATS.setdefault(stats, PoolStats(stats)))
+    return engine
+
+def async_query(fallback):
+    """
+    Marks an awaitable twin of a sync *_sql helper.
+    The decorated coroutine receives a fresh AsyncSession as its first argument;
+    without an async engine the sync fallback runs through run_blocking instead.
+    A twin of a replica_read helper reads from the replicas like its fallback.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if ASYNC_SESSION is None:
+                return await run_blocking(fallback, *args, **kwargs)
+            if routes_to_replica(fallback, args, kwargs):
+                try:
+                    async with ASYNC_SESSION(info={USE_REPLICA: True}) as session:
+                        return await func(session, *args, **kwargs)
+                except OperationalError as e:
+                    log.warning(f"[PostgreSQL] Replica read failed, using the primary: {e}")
+            async with ASYNC_SESSION() as session:
+                return await func(session, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def replica_read(func):
+    """
+    Marks a read-only *_sql helper whose queries may run on a read replica.
+    Calls for a chat written within DB_READ_YOUR_WRITES seconds stay on the
+    primary, as do calls whose replica fails.
+    """
+    get_chat_id = chat_id_getter(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not routes_to_replica(wrapper, args, kwargs):
+            return func(*args, **kwargs)
+        session = SESSION()
+        session.info[USE_REPLICA] = True
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as e:
+            log.warning(f"[PostgreSQL] Replica read failed, using the primary: {e}")
+            session.rollback()
+            session.info.pop(USE_REPLICA, None)
+            return func(*args, **kwargs)
+        finally:
+            session.info.pop(USE_REPLICA, None)
+
+    wrapper.__replica_read__ = True
+    wrapper.__replica_chat_id__ = get_chat_id
+    return wrapper
+
 BASE = declarative_base()
 
 try:
@@ -69,3 +254,221 @@ try:
 except Exception as e:
     log.exception(f"[PostgreSQL] Failed to start session: {e}")
     exit(1)
+
+# Handlers should prefer the *_async helpers built on this; the sync SESSION
+# stays for startup loaders and rarely used commands.
+ASYNC_SESSION: async_sessionmaker = start_async()
+
+
+class BlockingStats:
+    """Queue depth and latency of calls handed to run_blocking."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self._waits = deque(maxlen=window)
+        self._runs = deque(maxlen=window)
+
+    def submitted(self):
+        with self._lock:
+            self.queued += 1
+
+    def started(self, waited):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self._waits.append(waited)
+
+    def finished(self, ran, ok):
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+            self.failed += not ok
+            self._runs.append(ran)
+
+    _percentiles = staticmethod(percentiles)
+
+    def snapshot(self):
+        with self._lock:
+            waits, runs = list(self._waits), list(self._runs)
+            out = {
+                "workers": KInit.SQL_WORKERS,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+        out["wait_p50"], out["wait_p95"], out["wait_max"] = self._percentiles(waits)
+        out["run_p50"], out["run_p95"], out["run_max"] = self._percentiles(runs)
+        return out
+
+
+# Sized below the connection pool so queued calls wait here, not on the pool.
+SQL_EXECUTOR = ThreadPoolExecutor(max_workers=KInit.SQL_WORKERS, thread_name_prefix="sql")
+BLOCKING_STATS = BlockingStats()
+
+
+def _run_in_worker(func, submitted_at, *args, **kwargs):
+    started_at = time.perf_counter()
+    BLOCKING_STATS.started(started_at - submitted_at)
+    ok = False
+    try:
+        result = func(*args, **kwargs)
+        ok = True
+        return result
+    finally:
+        # SESSION is scoped per thread, so every worker already has its own
+        # session; drop it after each call so no connection or stale identity
+        # map outlives the job.
+        SESSION.remove()
+        BLOCKING_STATS.finished(time.perf_counter() - started_at, ok)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a sync *_sql helper on the SQL worker pool without blocking the event loop."""
+    BLOCKING_STATS.submitted()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        SQL_EXECUTOR, partial(_run_in_worker, func, time.perf_counter(), *args, **kwargs)
+    )
+
+
+def adapt_pool_size():
+    """
+    Moves the sync pool's persistent size toward recent demand, between
+    POSTGRES_POOL_SIZE and POSTGRES_POOL_SIZE + POSTGRES_MAX_OVERFLOW; the
+    total connection ceiling stays the same. Returns the new size, or None
+    when it is unchanged.
+    """
+    engine = SESSION.get_bind()
+    floor = KInit.POSTGRES_POOL_SIZE
+    size = POOL_STATS["sync"].suggested_size(floor, floor + KInit.POSTGRES_MAX_OVERFLOW)
+    if size is None or size == engine.pool.size():
+        return None
+    log.info(f"[PostgreSQL] Resizing pool from {engine.pool.size()} to {size}")
+    engine.pool.target_size = size
+    # checked-out connections finish on the old pool; idle ones are closed
+    engine.dispose()
+    return size
+
+
+class CacheLoader:
+    """One __load_* function of a *_sql module, run at most once."""
+
+    def __init__(self, group, func):
+        self.group = group
+        self.func = func
+        self.name = func.__name__.lstrip("_")
+        self.loaded = False
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            try:
+                self.func()
+            finally:
+                # each loader thread checks out its own connection
+                SESSION.remove()
+            self.seconds = time.perf_counter() - started
+            self.loaded = True
+
+
+# group name -> loaders, in registration order
+CACHE_LOADERS = {}
+# groups whose accessors call ensure_cache first, so they may start lazily
+LAZY_CAPABLE = set()
+_WARMED = False
+
+
+def startup_loader(group):
+    """
+    Registers an in-memory cache loader instead of running it at import time.
+    warm_caches() runs the groups concurrently at startup; loaders of one
+    group run in registration order, as later ones may read what earlier
+    ones built.
+    """
+    def decorator(func):
+        loader = CacheLoader(group, func)
+        CACHE_LOADERS.setdefault(group, []).append(loader)
+        if _WARMED and not _is_lazy(group):
+            loader.ensure()
+        return func
+    return decorator
+
+
+def _is_lazy(group):
+    return group in LAZY_CAPABLE and group in KInit.LAZY_LOADERS
+
+
+def ensure_cache(group):
+    for loader in CACHE_LOADERS.get(group, ()):
+        if not loader.loaded:
+            loader.ensure()
+
+
+def needs_cache(group):
+    """Loads group's caches before the first call of the decorated accessor."""
+    LAZY_CAPABLE.add(group)
+
+    def decorator(func):
+        loaders = CACHE_LOADERS.setdefault(group, [])
+
+        if asyncio.iscoroutinefunction(func):
+            # load off the event loop, inside the coroutine
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for loader in loaders:
+                    if not loader.loaded:
+                        await run_blocking(loader.ensure)
+                return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            for loader in loaders:
+                if not loader.loaded:
+                    loader.ensure()
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def warm_caches():
+    global _WARMED
+    groups = [loaders for group, loaders in CACHE_LOADERS.items() if not _is_lazy(group)]
+    workers = max(1, min(len(groups), KInit.POSTGRES_POOL_SIZE + KInit.POSTGRES_MAX_OVERFLOW))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as pool:
+        for results in pool.map(_load_group, groups):
+            for loader, error in results:
+                if error:
+                    log.error(f"[Cache] {loader.group}.{loader.name} failed: {error}")
+                else:
+                    log.info(f"[Cache] {loader.group}.{loader.name} loaded in {loader.seconds * 1000:.0f} ms")
+    _WARMED = True
+    lazy = sorted(group for group in CACHE_LOADERS if _is_lazy(group))
+    log.info(
+        f"[Cache] Warmed {sum(map(len, groups))} loaders on {workers} connections in "
+        f"{time.perf_counter() - started:.2f}s" + (f", lazy: {', '.join(lazy)}" if lazy else "")
+    )
+
+
+def _load_group(loaders):
+    results = []
+    for loader in list(loaders):
+        try:
+            loader.ensure()
+        except Exception as e:
+            results.append((loader, e))
+        else:
+            results.append((loader, None))
+    return results
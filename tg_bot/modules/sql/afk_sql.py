@@ -4,7 +4,7 @@ import typing
 
 from sqlalchemy import Boolean, Column, BigInteger, UnicodeText
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, SESSION, startup_loader, needs_cache
 
 
 class AFK(BASE):
@@ -31,6 +31,7 @@ INSERTION_LOCK = threading.RLock()
 AFK_USERS = {}
 
 
+@needs_cache("afk")
 def is_afk(user_id):
     return user_id in AFK_USERS
 
@@ -42,6 +43,7 @@ def check_afk_status(user_id) -> typing.Optional[AFK]:
         SESSION.close()
 
 
+@needs_cache("afk")
 def set_afk(user_id, reason=""):
     with INSERTION_LOCK:
         curr = SESSION.query(AFK).get(user_id)
@@ -56,6 +58,7 @@ def set_afk(user_id, reason=""):
         SESSION.commit()
 
 
+@needs_cache("afk")
 def rm_afk(user_id):
     with INSERTION_LOCK:
         if curr := SESSION.query(AFK).get(user_id):
@@ -83,13 +86,12 @@ def toggle_afk(user_id, reason=""):
         SESSION.commit()
 
 
+@startup_loader("afk")
 def __load_afk_users():
     global AFK_USERS
     try:
-        all_afk = SESSION.query(AFK).all()
-        AFK_USERS = {user.user_id: user.reason for user in all_afk if user.is_afk}
+        AFK_USERS = dict(
+            SESSION.query(AFK.user_id, AFK.reason).filter(AFK.is_afk.is_(True))
+        )
     finally:
         SESSION.close()
-
-
-__load_afk_users()
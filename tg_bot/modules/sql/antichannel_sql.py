@@ -1,20 +1,19 @@
 import threading
 
 from sqlalchemy import Boolean
-from sqlalchemy.sql.sqltypes import String
 from sqlalchemy import Column
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, ChatId, SESSION
 
 
 class AntiChannelSettings(BASE):
     __tablename__ = "anti_channel_settings"
 
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     setting = Column(Boolean, default=False, nullable=False)
 
     def __init__(self, chat_id: int, disabled: bool):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.setting = disabled
 
     def __repr__(self):
@@ -29,7 +28,7 @@ ANTICHANNEL_SETTING_LOCK = threading.RLock()
 
 def enable_antichannel(chat_id: int):
     with ANTICHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiChannelSettings).get(str(chat_id))
+        chat = SESSION.query(AntiChannelSettings).get(int(chat_id))
         if not chat:
             chat = AntiChannelSettings(chat_id, True)
 
@@ -40,7 +39,7 @@ def enable_antichannel(chat_id: int):
 
 def disable_antichannel(chat_id: int):
     with ANTICHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiChannelSettings).get(str(chat_id))
+        chat = SESSION.query(AntiChannelSettings).get(int(chat_id))
         if not chat:
             chat = AntiChannelSettings(chat_id, False)
 
@@ -51,7 +50,7 @@ def disable_antichannel(chat_id: int):
 
 def antichannel_status(chat_id: int) -> bool:
     with ANTICHANNEL_SETTING_LOCK:
-        d = SESSION.query(AntiChannelSettings).get(str(chat_id))
+        d = SESSION.query(AntiChannelSettings).get(int(chat_id))
         if not d:
             return False
         return d.setting
@@ -59,7 +58,7 @@ def antichannel_status(chat_id: int) -> bool:
 
 def migrate_chat(old_chat_id, new_chat_id):
     with ANTICHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiChannelSettings).get(str(old_chat_id))
+        chat = SESSION.query(AntiChannelSettings).get(int(old_chat_id))
         if chat:
             chat.chat_id = new_chat_id
             SESSION.add(chat)
@@ -1,36 +1,56 @@
 import threading
+import time
+from collections import OrderedDict, deque
 
-from sqlalchemy import String, Column, Integer, UnicodeText, BigInteger
+from sqlalchemy import Column, Integer, UnicodeText, BigInteger
 
-from tg_bot.modules.sql import SESSION, BASE
+from tg_bot import FLOOD_REDIS, redis_conn
+from tg_bot.modules.sql import SESSION, BASE, ChatId, startup_loader, replica_read
 
 DEF_COUNT = 0
 DEF_LIMIT = 0
-DEF_OBJ = (None, DEF_COUNT, DEF_LIMIT)
+DEF_WINDOW = 0  # 0 = consecutive messages, otherwise seconds
+DEF_OBJ = (DEF_LIMIT, DEF_WINDOW)
+
+# idle per-user counters are dropped after this many seconds
+FLOOD_TTL = 10 * 60
 
 
 class FloodControl(BASE):
     __tablename__ = "antiflood"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     user_id = Column(BigInteger)
     count = Column(Integer, default=DEF_COUNT)
     limit = Column(Integer, default=DEF_LIMIT)
 
     def __init__(self, chat_id):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
 
     def __repr__(self):
         return "<flood control for %s>" % self.chat_id
 
 
+class FloodWindow(BASE):
+    __tablename__ = "antiflood_window"
+    chat_id = Column(ChatId, primary_key=True)
+    seconds = Column(Integer, default=DEF_WINDOW)
+
+    def __init__(self, chat_id, seconds=DEF_WINDOW):
+        self.chat_id = int(chat_id)
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "<flood window of {}s for {}>".format(self.seconds, self.chat_id)
+
+
 class FloodSettings(BASE):
     __tablename__ = "antiflood_settings"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     flood_type = Column(Integer, default=1)
     value = Column(UnicodeText, default="0")
 
     def __init__(self, chat_id, flood_type=1, value="0"):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.flood_type = flood_type
         self.value = value
 
@@ -44,47 +64,192 @@ with SESSION() as _s:
 INSERTION_FLOOD_LOCK = threading.RLock()
 INSERTION_FLOOD_SETTINGS_LOCK = threading.RLock()
 
+# {chat_id: (limit, window)}
 CHAT_FLOOD = {}
 
 
-def set_flood(chat_id, amount):
+class MemoryFloodCounter:
+    """
+    Per-process flood counters.
+    Consecutive mode keeps (last_user, count) per chat; window mode keeps a
+    ring buffer of the last limit + 1 message timestamps per (chat, user), so
+    each message costs one append and one comparison. Both maps are kept in
+    last-used order, which lets idle entries be evicted from the front.
+    """
+
+    def __init__(self, ttl=FLOOD_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._streaks = OrderedDict()  # chat_id -> (user_id, count, last_seen)
+        self._windows = OrderedDict()  # (chat_id, user_id) -> deque of timestamps
+
+    def hit_consecutive(self, chat_id, user_id, limit, now):
+        with self._lock:
+            self._evict(now)
+            curr_user_id, count, _ = self._streaks.pop(chat_id, (None, DEF_COUNT, now))
+            if user_id is None or user_id != curr_user_id:  # other user
+                self._streaks[chat_id] = (user_id, DEF_COUNT, now)
+                return False
+
+            count += 1
+            if count > limit:  # too many msgs, kick
+                self._streaks[chat_id] = (None, DEF_COUNT, now)
+                return True
+
+            self._streaks[chat_id] = (user_id, count, now)
+            return False
+
+    def hit_window(self, chat_id, user_id, limit, window, now):
+        with self._lock:
+            self._evict(now)
+            key = (chat_id, user_id)
+            stamps = self._windows.pop(key, None)
+            if stamps is None or stamps.maxlen != limit + 1:
+                stamps = deque(stamps or (), maxlen=limit + 1)
+            stamps.append(now)
+            if len(stamps) > limit and now - stamps[0] <= window:
+                return True
+            self._windows[key] = stamps
+            return False
+
+    def reset_chat(self, chat_id):
+        with self._lock:
+            self._streaks.pop(chat_id, None)
+            for key in [key for key in self._windows if key[0] == chat_id]:
+                del self._windows[key]
+
+    def _evict(self, now):
+        cutoff = now - self.ttl
+        while self._streaks and next(iter(self._streaks.values()))[2] < cutoff:
+            self._streaks.popitem(last=False)
+        while self._windows and next(iter(self._windows.values()))[-1] < cutoff:
+            self._windows.popitem(last=False)
+
+
+class RedisFloodCounter:
+    """
+    Same interface as MemoryFloodCounter, backed by redis so several bot
+    processes share counters. Every check is one script call; keys carry
+    their own TTL so idle counters expire on their own.
+    """
+
+    KEY_PREFIX = "flood:"
+    # per-chat set of that chat's window keys, so a reset needs no SCAN
+    KEYS_PREFIX = "flood_keys:"
+
+    _CONSECUTIVE = """
+    local last = redis.call('HGET', KEYS[1], 'user')
+    local limit = tonumber(ARGV[2])
+    if ARGV[1] == '' or last ~= ARGV[1] then
+        redis.call('HSET', KEYS[1], 'user', ARGV[1], 'count', 0)
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return 0
+    end
+    local count = redis.call('HINCRBY', KEYS[1], 'count', 1)
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    if count > limit then
+        redis.call('DEL', KEYS[1])
+        return 1
+    end
+    return 0
+    """
+
+    _WINDOW = """
+    local limit = tonumber(ARGV[2])
+    redis.call('LPUSH', KEYS[1], ARGV[1])
+    redis.call('LTRIM', KEYS[1], 0, limit)
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    redis.call('SADD', KEYS[2], KEYS[1])
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+    if redis.call('LLEN', KEYS[1]) > limit then
+        local oldest = tonumber(redis.call('LINDEX', KEYS[1], -1))
+        if tonumber(ARGV[1]) - oldest <= tonumber(ARGV[3]) then
+            redis.call('DEL', KEYS[1])
+            return 1
+        end
+    end
+    return 0
+    """
+
+    _RESET = """
+    local keys = redis.call('SMEMBERS', KEYS[2])
+    for i = 1, #keys, 1000 do
+        redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+    end
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return #keys
+    """
+
+    def __init__(self, client, ttl=FLOOD_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._consecutive = client.register_script(self._CONSECUTIVE)
+        self._window = client.register_script(self._WINDOW)
+        self._reset = client.register_script(self._RESET)
+
+    def hit_consecutive(self, chat_id, user_id, limit, now):
+        key = "{}{}".format(self.KEY_PREFIX, chat_id)
+        user = "" if user_id is None else str(user_id)
+        return bool(self._consecutive(keys=[key], args=[user, limit, self.ttl]))
+
+    def hit_window(self, chat_id, user_id, limit, window, now):
+        key = "{}{}:{}".format(self.KEY_PREFIX, chat_id, user_id)
+        chat_keys = "{}{}".format(self.KEYS_PREFIX, chat_id)
+        ttl = max(self.ttl, window)
+        return bool(self._window(keys=[key, chat_keys], args=[now, limit, window, ttl]))
+
+    def reset_chat(self, chat_id):
+        key = "{}{}".format(self.KEY_PREFIX, chat_id)
+        chat_keys = "{}{}".format(self.KEYS_PREFIX, chat_id)
+        self._reset(keys=[key, chat_keys])
+
+
+FLOOD_COUNTER = RedisFloodCounter(redis_conn) if FLOOD_REDIS else MemoryFloodCounter()
+
+
+def set_flood(chat_id, amount, window=None):
     with INSERTION_FLOOD_LOCK:
-        flood = SESSION.query(FloodControl).get(str(chat_id))
+        flood = SESSION.query(FloodControl).get(int(chat_id))
         if not flood:
-            flood = FloodControl(str(chat_id))
+            flood = FloodControl(int(chat_id))
 
         flood.user_id = None
         flood.limit = amount
 
-        CHAT_FLOOD[str(chat_id)] = (None, DEF_COUNT, amount)
+        if window is None:
+            window = get_flood_window(chat_id)
+        flood_window = SESSION.query(FloodWindow).get(int(chat_id))
+        if flood_window:
+            flood_window.seconds = window
+        elif window:
+            SESSION.add(FloodWindow(chat_id, window))
+
+        CHAT_FLOOD[int(chat_id)] = (amount, window)
+        FLOOD_COUNTER.reset_chat(int(chat_id))
 
         SESSION.add(flood)
         SESSION.commit()
 
 
 def update_flood(chat_id: str, user_id) -> bool:
-    if str(chat_id) in CHAT_FLOOD:
-        curr_user_id, count, limit = CHAT_FLOOD.get(str(chat_id), DEF_OBJ)
-
-        if limit == 0:  # no antiflood
-            return False
-
-        if user_id != curr_user_id or user_id is None:  # other user
-            CHAT_FLOOD[str(chat_id)] = (user_id, DEF_COUNT, limit)
-            return False
-
-        count += 1
-        if count > limit:  # too many msgs, kick
-            CHAT_FLOOD[str(chat_id)] = (None, DEF_COUNT, limit)
-            return True
+    limit, window = CHAT_FLOOD.get(int(chat_id), DEF_OBJ)
+    if limit == 0:  # no antiflood
+        return False
 
-        # default -> update
-        CHAT_FLOOD[str(chat_id)] = (user_id, count, limit)
+    now = time.time()
+    if not window:
+        return FLOOD_COUNTER.hit_consecutive(int(chat_id), user_id, limit, now)
+    if user_id is None:  # admins and approved users don't count
         return False
+    return FLOOD_COUNTER.hit_window(int(chat_id), user_id, limit, window, now)
 
 
 def get_flood_limit(chat_id):
-    return CHAT_FLOOD.get(str(chat_id), DEF_OBJ)[2]
+    return CHAT_FLOOD.get(int(chat_id), DEF_OBJ)[0]
+
+
+def get_flood_window(chat_id):
+    return CHAT_FLOOD.get(int(chat_id), DEF_OBJ)[1]
 
 
 def set_flood_strength(chat_id, flood_type, value):
@@ -95,7 +260,7 @@ def set_flood_strength(chat_id, flood_type, value):
     # 4 = tban
     # 5 = tmute
     with INSERTION_FLOOD_SETTINGS_LOCK:
-        curr_setting = SESSION.query(FloodSettings).get(str(chat_id))
+        curr_setting = SESSION.query(FloodSettings).get(int(chat_id))
         if not curr_setting:
             curr_setting = FloodSettings(
                 chat_id, flood_type=int(flood_type), value=value
@@ -108,9 +273,10 @@ def set_flood_strength(chat_id, flood_type, value):
         SESSION.commit()
 
 
+@replica_read
 def get_flood_setting(chat_id):
     try:
-        setting = SESSION.query(FloodSettings).get(str(chat_id))
+        setting = SESSION.query(FloodSettings).get(int(chat_id))
         if setting:
             return setting.flood_type, setting.value
         else:
@@ -122,22 +288,28 @@ def get_flood_setting(chat_id):
 
 def migrate_chat(old_chat_id, new_chat_id):
     with INSERTION_FLOOD_LOCK:
-        flood = SESSION.query(FloodControl).get(str(old_chat_id))
+        flood = SESSION.query(FloodControl).get(int(old_chat_id))
         if flood:
-            CHAT_FLOOD[str(new_chat_id)] = CHAT_FLOOD.get(str(old_chat_id), DEF_OBJ)
-            flood.chat_id = str(new_chat_id)
-            SESSION.commit()
+            CHAT_FLOOD[int(new_chat_id)] = CHAT_FLOOD.pop(int(old_chat_id), DEF_OBJ)
+            flood.chat_id = int(new_chat_id)
+        flood_window = SESSION.query(FloodWindow).get(int(old_chat_id))
+        if flood_window:
+            flood_window.chat_id = int(new_chat_id)
+        FLOOD_COUNTER.reset_chat(int(old_chat_id))
+        SESSION.commit()
 
         SESSION.close()
 
 
+@startup_loader("antiflood")
 def __load_flood_settings():
     global CHAT_FLOOD
     try:
+        windows = dict(SESSION.query(FloodWindow.chat_id, FloodWindow.seconds).all())
         all_chats = SESSION.query(FloodControl).all()
-        CHAT_FLOOD = {chat.chat_id: (None, DEF_COUNT, chat.limit) for chat in all_chats}
+        CHAT_FLOOD = {
+            chat.chat_id: (chat.limit, windows.get(chat.chat_id, DEF_WINDOW))
+            for chat in all_chats
+        }
     finally:
         SESSION.close()
-
-
-__load_flood_settings()
@@ -1,20 +1,19 @@
 import threading
 
 from sqlalchemy import Boolean
-from sqlalchemy.sql.sqltypes import String
 from sqlalchemy import Column
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, ChatId, SESSION
 
 
 class AntiLinkedChannelSettings(BASE):
     __tablename__ = "anti_linked_channel_settings"
 
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     setting = Column(Boolean, default=False, nullable=False)
 
     def __init__(self, chat_id: int, disabled: bool):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.setting = disabled
 
     def __repr__(self):
@@ -23,11 +22,11 @@ class AntiLinkedChannelSettings(BASE):
 class AntiPinChannelSettings(BASE):
     __tablename__ = "anti_pin_channel_settings"
 
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     setting = Column(Boolean, default=False, nullable=False)
 
     def __init__(self, chat_id: int, disabled: bool):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.setting = disabled
 
     def __repr__(self):
@@ -42,7 +41,7 @@ ANTI_PIN_CHANNEL_SETTING_LOCK = threading.RLock()
 
 def enable_linked(chat_id: int):
     with ANTI_LINKED_CHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiLinkedChannelSettings).get(str(chat_id))
+        chat = SESSION.query(AntiLinkedChannelSettings).get(int(chat_id))
         if not chat:
             chat = AntiLinkedChannelSettings(chat_id, True)
 
@@ -52,7 +51,7 @@ def enable_linked(chat_id: int):
 
 def enable_pin(chat_id: int):
     with ANTI_PIN_CHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiPinChannelSettings).get(str(chat_id))
+        chat = SESSION.query(AntiPinChannelSettings).get(int(chat_id))
         if not chat:
             chat = AntiPinChannelSettings(chat_id, True)
 
@@ -63,7 +62,7 @@ def enable_pin(chat_id: int):
 
 def disable_linked(chat_id: int):
     with ANTI_LINKED_CHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiLinkedChannelSettings).get(str(chat_id))
+        chat = SESSION.query(AntiLinkedChannelSettings).get(int(chat_id))
         if not chat:
             chat = AntiLinkedChannelSettings(chat_id, False)
 
@@ -73,7 +72,7 @@ def disable_linked(chat_id: int):
 
 def disable_pin(chat_id: int):
     with ANTI_PIN_CHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiPinChannelSettings).get(str(chat_id))
+        chat = SESSION.query(AntiPinChannelSettings).get(int(chat_id))
         if not chat:
             chat = AntiPinChannelSettings(chat_id, False)
 
@@ -84,14 +83,14 @@ def disable_pin(chat_id: int):
 
 def status_linked(chat_id: int) -> bool:
     with ANTI_LINKED_CHANNEL_SETTING_LOCK:
-        d = SESSION.query(AntiLinkedChannelSettings).get(str(chat_id))
+        d = SESSION.query(AntiLinkedChannelSettings).get(int(chat_id))
         if not d:
             return False
         return d.setting
 
 def status_pin(chat_id: int) -> bool:
     with ANTI_PIN_CHANNEL_SETTING_LOCK:
-        d = SESSION.query(AntiPinChannelSettings).get(str(chat_id))
+        d = SESSION.query(AntiPinChannelSettings).get(int(chat_id))
         if not d:
             return False
         return d.setting
@@ -99,14 +98,14 @@ def status_pin(chat_id: int) -> bool:
 
 def migrate_chat(old_chat_id, new_chat_id):
     with ANTI_LINKED_CHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiLinkedChannelSettings).get(str(old_chat_id))
+        chat = SESSION.query(AntiLinkedChannelSettings).get(int(old_chat_id))
         if chat:
             chat.chat_id = new_chat_id
             SESSION.add(chat)
 
         SESSION.commit()
     with ANTI_PIN_CHANNEL_SETTING_LOCK:
-        chat = SESSION.query(AntiPinChannelSettings).get(str(old_chat_id))
+        chat = SESSION.query(AntiPinChannelSettings).get(int(old_chat_id))
         if chat:
             chat.chat_id = new_chat_id
             SESSION.add(chat)
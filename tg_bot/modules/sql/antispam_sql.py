@@ -1,9 +1,9 @@
 import threading
 
-from sqlalchemy import Column, UnicodeText, String, Boolean
+from sqlalchemy import Column, UnicodeText, Boolean
 from sqlalchemy.sql.sqltypes import BigInteger
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, ChatId, SESSION, startup_loader, needs_cache
 
 
 class GloballyBannedUsers(BASE):
@@ -26,11 +26,11 @@ class GloballyBannedUsers(BASE):
 
 class GbanSettings(BASE):
     __tablename__ = "gban_settings"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     setting = Column(Boolean, default=True, nullable=False)
 
     def __init__(self, chat_id, enabled):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.setting = enabled
 
     def __repr__(self):
@@ -44,6 +44,7 @@ GBANNED_LIST = set()
 GBANSTAT_LIST = set()
 
 
+@needs_cache("antispam")
 def gban_user(user_id, name, reason=None):
     with GBANNED_USERS_LOCK:
         user = SESSION.query(GloballyBannedUsers).get(user_id)
@@ -72,6 +73,7 @@ def update_gban_reason(user_id, name, reason=None):
         return old_reason
 
 
+@needs_cache("antispam")
 def ungban_user(user_id):
     with GBANNED_USERS_LOCK:
         user = SESSION.query(GloballyBannedUsers).get(user_id)
@@ -82,6 +84,7 @@ def ungban_user(user_id):
         __load_gbanned_userid_list()
 
 
+@needs_cache("antispam")
 def is_user_gbanned(user_id):
     return user_id in GBANNED_LIST
 
@@ -100,52 +103,70 @@ def get_gban_list():
         SESSION.close()
 
 
+@needs_cache("antispam")
 def enable_gbans(chat_id):
     with GBAN_SETTING_LOCK:
-        chat = SESSION.query(GbanSettings).get(str(chat_id))
+        chat = SESSION.query(GbanSettings).get(int(chat_id))
         if not chat:
             chat = GbanSettings(chat_id, True)
 
         chat.setting = True
         SESSION.add(chat)
         SESSION.commit()
-        if str(chat_id) in GBANSTAT_LIST:
-            GBANSTAT_LIST.remove(str(chat_id))
+        if int(chat_id) in GBANSTAT_LIST:
+            GBANSTAT_LIST.remove(int(chat_id))
 
 
+@needs_cache("antispam")
 def disable_gbans(chat_id):
     with GBAN_SETTING_LOCK:
-        chat = SESSION.query(GbanSettings).get(str(chat_id))
+        chat = SESSION.query(GbanSettings).get(int(chat_id))
         if not chat:
             chat = GbanSettings(chat_id, False)
 
         chat.setting = False
         SESSION.add(chat)
         SESSION.commit()
-        GBANSTAT_LIST.add(str(chat_id))
+        GBANSTAT_LIST.add(int(chat_id))
 
 
+@needs_cache("antispam")
 def does_chat_gban(chat_id):
-    return str(chat_id) not in GBANSTAT_LIST
+    return int(chat_id) not in GBANSTAT_LIST
 
 
+@needs_cache("antispam")
+def gban_enforcing_chats(chat_ids):
+    """The chats among chat_ids that have not turned gbans off."""
+    return [int(chat_id) for chat_id in chat_ids if int(chat_id) not in GBANSTAT_LIST]
+
+
+@needs_cache("antispam")
 def num_gbanned_users():
     return len(GBANNED_LIST)
 
 
+@startup_loader("antispam")
 def __load_gbanned_userid_list():
     global GBANNED_LIST
     try:
-        GBANNED_LIST = {x.user_id for x in SESSION.query(GloballyBannedUsers).all()}
+        GBANNED_LIST = {
+            user_id for (user_id,) in SESSION.query(GloballyBannedUsers.user_id)
+        }
     finally:
         SESSION.close()
 
 
+@startup_loader("antispam")
 def __load_gban_stat_list():
     global GBANSTAT_LIST
     try:
         GBANSTAT_LIST = {
-            x.chat_id for x in SESSION.query(GbanSettings).all() if not x.setting
+            chat_id
+            for chat_id, setting in SESSION.query(
+                GbanSettings.chat_id, GbanSettings.setting
+            )
+            if not setting
         }
     finally:
         SESSION.close()
@@ -153,7 +174,7 @@ def __load_gban_stat_list():
 
 def migrate_chat(old_chat_id, new_chat_id):
     with GBAN_SETTING_LOCK:
-        chat = SESSION.query(GbanSettings).get(str(old_chat_id))
+        chat = SESSION.query(GbanSettings).get(int(old_chat_id))
         if chat:
             chat.chat_id = new_chat_id
             SESSION.add(chat)
@@ -162,5 +183,3 @@ def migrate_chat(old_chat_id, new_chat_id):
 
 
 # Create in memory userid to avoid disk access
-__load_gbanned_userid_list()
-__load_gban_stat_list()
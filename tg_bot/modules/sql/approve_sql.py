@@ -1,18 +1,19 @@
 import threading
 
-from sqlalchemy import Column, String
+from sqlalchemy import Column, select
 from sqlalchemy.sql.sqltypes import BigInteger
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, ChatId, SESSION, startup_loader
+from tg_bot.modules.sql.index_audit import audit_query
 
 
 class Approvals(BASE):
     __tablename__ = "approval"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     user_id = Column(BigInteger, primary_key=True)
 
     def __init__(self, chat_id, user_id):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.user_id = user_id
 
     def __repr__(self):
@@ -22,39 +23,77 @@ class Approvals(BASE):
 with SESSION() as _s:
     BASE.metadata.create_all(bind=_s.get_bind())
 
+audit_query("approve.list_approved", select(Approvals.user_id).where(Approvals.chat_id == "0"))
+
 APPROVE_INSERTION_LOCK = threading.RLock()
 
+# chat_id -> set of approved user ids, so hot-path checks never hit the db
+CHAT_APPROVALS = {}
+
 
 def approve(chat_id, user_id):
     with APPROVE_INSERTION_LOCK:
-        approve_user = Approvals(str(chat_id), user_id)
+        approve_user = Approvals(int(chat_id), user_id)
         SESSION.add(approve_user)
         SESSION.commit()
+        CHAT_APPROVALS.setdefault(int(chat_id), set()).add(int(user_id))
 
 
 def is_approved(chat_id, user_id):
-    try:
-        return SESSION.query(Approvals).get((str(chat_id), user_id))
-    finally:
-        SESSION.close()
+    return int(user_id) in CHAT_APPROVALS.get(int(chat_id), ())
 
 
 def disapprove(chat_id, user_id):
     with APPROVE_INSERTION_LOCK:
-        disapprove_user = SESSION.query(Approvals).get((str(chat_id), user_id))
+        disapprove_user = SESSION.query(Approvals).get((int(chat_id), user_id))
         if disapprove_user:
             SESSION.delete(disapprove_user)
             SESSION.commit()
+            CHAT_APPROVALS.get(int(chat_id), set()).discard(int(user_id))
             return True
         else:
             SESSION.close()
             return False
 
 
+def disapprove_all(chat_id):
+    with APPROVE_INSERTION_LOCK:
+        removed = (
+            SESSION.query(Approvals)
+            .filter(Approvals.chat_id == int(chat_id))
+            .delete(synchronize_session=False)
+        )
+        SESSION.commit()
+        CHAT_APPROVALS.pop(int(chat_id), None)
+        return removed
+
+
 def list_approved(chat_id):
     try:
         return (SESSION.query(Approvals).filter(
-            Approvals.chat_id == str(chat_id)).order_by(
+            Approvals.chat_id == int(chat_id)).order_by(
                 Approvals.user_id.asc()).all())
     finally:
         SESSION.close()
+
+
+def migrate_chat(old_chat_id, new_chat_id):
+    with APPROVE_INSERTION_LOCK:
+        SESSION.query(Approvals).filter(
+            Approvals.chat_id == int(old_chat_id)
+        ).update({Approvals.chat_id: int(new_chat_id)}, synchronize_session=False)
+        SESSION.commit()
+        if int(old_chat_id) in CHAT_APPROVALS:
+            CHAT_APPROVALS[int(new_chat_id)] = CHAT_APPROVALS.pop(int(old_chat_id))
+
+
+@startup_loader("approve")
+def __load_approvals():
+    global CHAT_APPROVALS
+    try:
+        approvals = {}
+        for chat_id, user_id in SESSION.query(Approvals.chat_id, Approvals.user_id).all():
+            approvals.setdefault(chat_id, set()).add(user_id)
+        CHAT_APPROVALS = approvals
+    finally:
+        SESSION.close()
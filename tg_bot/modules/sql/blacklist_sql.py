@@ -1,17 +1,20 @@
 import threading
 
-from sqlalchemy import func, distinct, Column, String, UnicodeText, Integer
+from sqlalchemy import func, distinct, Column, UnicodeText, Integer
 
-from tg_bot.modules.sql import SESSION, BASE
+from tg_bot.modules.helper_funcs.trigger_index import TriggerIndex
+from tg_bot.modules.sql import SESSION, BASE, ChatId, startup_loader, needs_cache, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
+from tg_bot.modules.sql.bulk import UnitOfWork
 
 
 class BlackListFilters(BASE):
     __tablename__ = "blacklist"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     trigger = Column(UnicodeText, primary_key=True, nullable=False)
 
     def __init__(self, chat_id, trigger):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.trigger = trigger
 
     def __repr__(self):
@@ -27,12 +30,12 @@ class BlackListFilters(BASE):
 
 class BlacklistSettings(BASE):
     __tablename__ = "blacklist_settings"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     blacklist_type = Column(Integer, default=1)
     value = Column(UnicodeText, default="0")
 
     def __init__(self, chat_id, blacklist_type=1, value="0"):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.blacklist_type = blacklist_type
         self.value = value
 
@@ -52,25 +55,47 @@ CHAT_BLACKLISTS = {}
 CHAT_SETTINGS_BLACKLISTS = {}
 
 
+@needs_cache("blacklist")
 def add_to_blacklist(chat_id, trigger):
     with BLACKLIST_FILTER_INSERTION_LOCK:
-        blacklist_filt = BlackListFilters(str(chat_id), trigger)
+        blacklist_filt = BlackListFilters(int(chat_id), trigger)
 
         SESSION.merge(blacklist_filt)  # merge to avoid duplicate key issues
         SESSION.commit()
         global CHAT_BLACKLISTS
-        if CHAT_BLACKLISTS.get(str(chat_id), set()) == set():
-            CHAT_BLACKLISTS[str(chat_id)] = {trigger}
+        if CHAT_BLACKLISTS.get(int(chat_id), set()) == set():
+            CHAT_BLACKLISTS[int(chat_id)] = {trigger}
         else:
-            CHAT_BLACKLISTS.get(str(chat_id), set()).add(trigger)
+            CHAT_BLACKLISTS.get(int(chat_id), set()).add(trigger)
+        BLACKLIST_INDEX.invalidate(chat_id)
 
 
+@needs_cache("blacklist")
+def add_many_to_blacklist(chat_id, triggers):
+    triggers = set(triggers)
+    if not triggers:
+        return
+    with BLACKLIST_FILTER_INSERTION_LOCK:
+        uow = UnitOfWork()
+        for trigger in triggers:
+            uow.insert_ignore(BlackListFilters, chat_id=int(chat_id), trigger=trigger)
+
+        @uow.after_commit
+        def _cache():
+            CHAT_BLACKLISTS.setdefault(int(chat_id), set()).update(triggers)
+            BLACKLIST_INDEX.invalidate(chat_id)
+
+        uow.commit()
+
+
+@needs_cache("blacklist")
 def rm_from_blacklist(chat_id, trigger):
     with BLACKLIST_FILTER_INSERTION_LOCK:
-        blacklist_filt = SESSION.query(BlackListFilters).get((str(chat_id), trigger))
+        blacklist_filt = SESSION.query(BlackListFilters).get((int(chat_id), trigger))
         if blacklist_filt:
-            if trigger in CHAT_BLACKLISTS.get(str(chat_id), set()):  # sanity check
-                CHAT_BLACKLISTS.get(str(chat_id), set()).remove(trigger)
+            if trigger in CHAT_BLACKLISTS.get(int(chat_id), set()):  # sanity check
+                CHAT_BLACKLISTS.get(int(chat_id), set()).remove(trigger)
+                BLACKLIST_INDEX.invalidate(chat_id)
 
             SESSION.delete(blacklist_filt)
             SESSION.commit()
@@ -80,10 +105,20 @@ def rm_from_blacklist(chat_id, trigger):
         return False
 
 
+@needs_cache("blacklist")
 def get_chat_blacklist(chat_id):
-    return CHAT_BLACKLISTS.get(str(chat_id), set())
+    return CHAT_BLACKLISTS.get(int(chat_id), set())
+
+
+BLACKLIST_INDEX = TriggerIndex(get_chat_blacklist, wildcard=True)
 
 
+def match_blacklist(chat_id, text):
+    return BLACKLIST_INDEX.match(chat_id, text)
+
+
+@stat_counter("blacklist_filters", BlackListFilters, rows=True)
+@replica_read
 def num_blacklist_filters():
     try:
         return SESSION.query(BlackListFilters).count()
@@ -91,17 +126,20 @@ def num_blacklist_filters():
         SESSION.close()
 
 
+@replica_read
 def num_blacklist_chat_filters(chat_id):
     try:
         return (
             SESSION.query(BlackListFilters.chat_id)
-            .filter(BlackListFilters.chat_id == str(chat_id))
+            .filter(BlackListFilters.chat_id == int(chat_id))
             .count()
         )
     finally:
         SESSION.close()
 
 
+@stat_counter("blacklist_filter_chats", BlackListFilters)
+@replica_read
 def num_blacklist_filter_chats():
     try:
         return SESSION.query(func.count(distinct(BlackListFilters.chat_id))).scalar()
@@ -109,6 +147,7 @@ def num_blacklist_filter_chats():
         SESSION.close()
 
 
+@needs_cache("blacklist")
 def set_blacklist_strength(chat_id, blacklist_type, value):
     # for blacklist_type
     # 0 = nothing
@@ -121,7 +160,7 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
     # 7 = tmute
     with BLACKLIST_SETTINGS_INSERTION_LOCK:
         global CHAT_SETTINGS_BLACKLISTS
-        curr_setting = SESSION.query(BlacklistSettings).get(str(chat_id))
+        curr_setting = SESSION.query(BlacklistSettings).get(int(chat_id))
         if not curr_setting:
             curr_setting = BlacklistSettings(
                 chat_id, blacklist_type=int(blacklist_type), value=value
@@ -129,7 +168,7 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
 
         curr_setting.blacklist_type = int(blacklist_type)
         curr_setting.value = str(value)
-        CHAT_SETTINGS_BLACKLISTS[str(chat_id)] = {
+        CHAT_SETTINGS_BLACKLISTS[int(chat_id)] = {
             "blacklist_type": int(blacklist_type),
             "value": value,
         }
@@ -138,9 +177,10 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
         SESSION.commit()
 
 
+@needs_cache("blacklist")
 def get_blacklist_setting(chat_id):
     try:
-        setting = CHAT_SETTINGS_BLACKLISTS.get(str(chat_id))
+        setting = CHAT_SETTINGS_BLACKLISTS.get(int(chat_id))
         if setting:
             return setting["blacklist_type"], setting["value"]
         else:
@@ -150,48 +190,50 @@ def get_blacklist_setting(chat_id):
         SESSION.close()
 
 
+@startup_loader("blacklist")
 def __load_chat_blacklists():
     global CHAT_BLACKLISTS
     try:
-        chats = SESSION.query(BlackListFilters.chat_id).distinct().all()
-        for (chat_id,) in chats:  # remove tuple by ( ,)
-            CHAT_BLACKLISTS[chat_id] = []
-
-        all_filters = SESSION.query(BlackListFilters).all()
-        for x in all_filters:
-            CHAT_BLACKLISTS[x.chat_id] += [x.trigger]
-
-        CHAT_BLACKLISTS = {x: set(y) for x, y in CHAT_BLACKLISTS.items()}
+        blacklists = {}
+        for chat_id, trigger in SESSION.query(
+            BlackListFilters.chat_id, BlackListFilters.trigger
+        ):
+            blacklists.setdefault(chat_id, set()).add(trigger)
+        CHAT_BLACKLISTS = blacklists
 
     finally:
         SESSION.close()
 
 
+@startup_loader("blacklist")
 def __load_chat_settings_blacklists():
     global CHAT_SETTINGS_BLACKLISTS
     try:
-        chats_settings = SESSION.query(BlacklistSettings).all()
-        for x in chats_settings:  # remove tuple by ( ,)
-            CHAT_SETTINGS_BLACKLISTS[x.chat_id] = {
-                "blacklist_type": x.blacklist_type,
-                "value": x.value,
+        for chat_id, blacklist_type, value in SESSION.query(
+            BlacklistSettings.chat_id,
+            BlacklistSettings.blacklist_type,
+            BlacklistSettings.value,
+        ):
+            CHAT_SETTINGS_BLACKLISTS[chat_id] = {
+                "blacklist_type": blacklist_type,
+                "value": value,
             }
 
     finally:
         SESSION.close()
 
 
+@needs_cache("blacklist")
 def migrate_chat(old_chat_id, new_chat_id):
     with BLACKLIST_FILTER_INSERTION_LOCK:
         chat_filters = (
             SESSION.query(BlackListFilters)
-            .filter(BlackListFilters.chat_id == str(old_chat_id))
+            .filter(BlackListFilters.chat_id == int(old_chat_id))
             .all()
         )
         for filt in chat_filters:
-            filt.chat_id = str(new_chat_id)
+            filt.chat_id = int(new_chat_id)
         SESSION.commit()
-
-
-__load_chat_blacklists()
-__load_chat_settings_blacklists()
+        if int(old_chat_id) in CHAT_BLACKLISTS:
+            CHAT_BLACKLISTS[int(new_chat_id)] = CHAT_BLACKLISTS.pop(int(old_chat_id))
+        BLACKLIST_INDEX.migrate(old_chat_id, new_chat_id)
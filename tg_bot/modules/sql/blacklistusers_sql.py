@@ -2,7 +2,7 @@ import threading
 
 from sqlalchemy import Column, String, UnicodeText
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, SESSION, startup_loader
 
 
 class BlacklistUsers(BASE):
@@ -59,12 +59,10 @@ def is_user_blacklisted(user_id):
     return user_id in BLACKLIST_USERS
 
 
+@startup_loader("blacklistusers")
 def __load_blacklist_userid_list():
     global BLACKLIST_USERS
     try:
         BLACKLIST_USERS = {int(x.user_id) for x in SESSION.query(BlacklistUsers).all()}
     finally:
         SESSION.close()
-
-
-__load_blacklist_userid_list()
@@ -1,16 +1,18 @@
 import threading
 
-from tg_bot.modules.sql import BASE, SESSION
-from sqlalchemy import Column, Integer, String, UnicodeText, distinct, func
+from tg_bot.modules.sql import BASE, ChatId, SESSION, startup_loader, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
+from sqlalchemy import Column, Integer, UnicodeText, distinct, func
+from sqlalchemy.dialects.postgresql import insert
 
 
 class StickersFilters(BASE):
     __tablename__ = "blacklist_stickers"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     trigger = Column(UnicodeText, primary_key=True, nullable=False)
 
     def __init__(self, chat_id, trigger):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.trigger = trigger
 
     def __repr__(self):
@@ -26,12 +28,12 @@ class StickersFilters(BASE):
 
 class StickerSettings(BASE):
     __tablename__ = "blsticker_settings"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     blacklist_type = Column(Integer, default=1)
     value = Column(UnicodeText, default="0")
 
     def __init__(self, chat_id, blacklist_type=1, value="0"):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.blacklist_type = blacklist_type
         self.value = value
 
@@ -49,40 +51,101 @@ STICKSET_FILTER_INSERTION_LOCK = threading.RLock()
 
 CHAT_STICKERS = {}
 CHAT_BLSTICK_BLACKLISTS = {}
+# chat_id -> (frozenset of lowercased pack names, (blacklist_type, value)),
+# rebuilt on every write so enforcement is a single membership test.
+CHAT_STICKER_PACKS = {}
+
+
+def _refresh_packs(chat_id):
+    chat_id = int(chat_id)
+    packs = frozenset(t.lower() for t in CHAT_STICKERS.get(chat_id, ()))
+    if not packs:
+        CHAT_STICKER_PACKS.pop(chat_id, None)
+        return
+    setting = CHAT_BLSTICK_BLACKLISTS.get(chat_id)
+    mode = (setting["blacklist_type"], setting["value"]) if setting else (1, "0")
+    CHAT_STICKER_PACKS[chat_id] = (packs, mode)
 
 
 def add_to_stickers(chat_id, trigger):
     with STICKERS_FILTER_INSERTION_LOCK:
-        stickers_filt = StickersFilters(str(chat_id), trigger)
+        stickers_filt = StickersFilters(int(chat_id), trigger)
 
         SESSION.merge(stickers_filt)  # merge to avoid duplicate key issues
         SESSION.commit()
         global CHAT_STICKERS
-        if CHAT_STICKERS.get(str(chat_id), set()) == set():
-            CHAT_STICKERS[str(chat_id)] = {trigger}
+        if CHAT_STICKERS.get(int(chat_id), set()) == set():
+            CHAT_STICKERS[int(chat_id)] = {trigger}
         else:
-            CHAT_STICKERS.get(str(chat_id), set()).add(trigger)
+            CHAT_STICKERS.get(int(chat_id), set()).add(trigger)
+        _refresh_packs(chat_id)
 
 
 def rm_from_stickers(chat_id, trigger):
     with STICKERS_FILTER_INSERTION_LOCK:
-        stickers_filt = SESSION.query(StickersFilters).get((str(chat_id), trigger))
+        stickers_filt = SESSION.query(StickersFilters).get((int(chat_id), trigger))
         if stickers_filt:
-            if trigger in CHAT_STICKERS.get(str(chat_id), set()):  # sanity check
-                CHAT_STICKERS.get(str(chat_id), set()).remove(trigger)
+            if trigger in CHAT_STICKERS.get(int(chat_id), set()):  # sanity check
+                CHAT_STICKERS.get(int(chat_id), set()).remove(trigger)
 
             SESSION.delete(stickers_filt)
             SESSION.commit()
+            _refresh_packs(chat_id)
             return True
 
         SESSION.close()
         return False
 
 
+def add_many_to_stickers(chat_id, triggers):
+    triggers = {t for t in triggers if t}
+    if not triggers:
+        return 0
+    with STICKERS_FILTER_INSERTION_LOCK:
+        result = SESSION.execute(
+            insert(StickersFilters.__table__)
+            .values([{"chat_id": int(chat_id), "trigger": t} for t in triggers])
+            .on_conflict_do_nothing()
+        )
+        SESSION.commit()
+        CHAT_STICKERS.setdefault(int(chat_id), set()).update(triggers)
+        _refresh_packs(chat_id)
+        return result.rowcount
+
+
+def rm_many_from_stickers(chat_id, triggers):
+    triggers = {t for t in triggers if t}
+    if not triggers:
+        return 0
+    with STICKERS_FILTER_INSERTION_LOCK:
+        removed = (
+            SESSION.query(StickersFilters)
+            .filter(
+                StickersFilters.chat_id == int(chat_id),
+                StickersFilters.trigger.in_(triggers),
+            )
+            .delete(synchronize_session=False)
+        )
+        SESSION.commit()
+        CHAT_STICKERS.get(int(chat_id), set()).difference_update(triggers)
+        _refresh_packs(chat_id)
+        return removed
+
+
 def get_chat_stickers(chat_id):
-    return CHAT_STICKERS.get(str(chat_id), set())
+    return CHAT_STICKERS.get(int(chat_id), set())
+
+
+def get_sticker_blacklist_mode(chat_id, set_name):
+    """Return (blacklist_type, value) if set_name is blacklisted in chat_id, else None."""
+    entry = CHAT_STICKER_PACKS.get(int(chat_id))
+    if entry and set_name.lower() in entry[0]:
+        return entry[1]
+    return None
 
 
+@stat_counter("sticker_filters", StickersFilters, rows=True)
+@replica_read
 def num_stickers_filters():
     try:
         return SESSION.query(StickersFilters).count()
@@ -90,17 +153,20 @@ def num_stickers_filters():
         SESSION.close()
 
 
+@replica_read
 def num_stickers_chat_filters(chat_id):
     try:
         return (
             SESSION.query(StickersFilters.chat_id)
-            .filter(StickersFilters.chat_id == str(chat_id))
+            .filter(StickersFilters.chat_id == int(chat_id))
             .count()
         )
     finally:
         SESSION.close()
 
 
+@stat_counter("sticker_filter_chats", StickersFilters)
+@replica_read
 def num_stickers_filter_chats():
     try:
         return SESSION.query(func.count(distinct(StickersFilters.chat_id))).scalar()
@@ -120,7 +186,7 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
     # 7 = tmute
     with STICKSET_FILTER_INSERTION_LOCK:
         global CHAT_BLSTICK_BLACKLISTS
-        curr_setting = SESSION.query(StickerSettings).get(str(chat_id))
+        curr_setting = SESSION.query(StickerSettings).get(int(chat_id))
         if not curr_setting:
             curr_setting = StickerSettings(
                 chat_id, blacklist_type=int(blacklist_type), value=value,
@@ -128,10 +194,11 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
 
         curr_setting.blacklist_type = int(blacklist_type)
         curr_setting.value = str(value)
-        CHAT_BLSTICK_BLACKLISTS[str(chat_id)] = {
+        CHAT_BLSTICK_BLACKLISTS[int(chat_id)] = {
             "blacklist_type": int(blacklist_type),
             "value": value,
         }
+        _refresh_packs(chat_id)
 
         SESSION.add(curr_setting)
         SESSION.commit()
@@ -139,7 +206,7 @@ def set_blacklist_strength(chat_id, blacklist_type, value):
 
 def get_blacklist_setting(chat_id):
     try:
-        setting = CHAT_BLSTICK_BLACKLISTS.get(str(chat_id))
+        setting = CHAT_BLSTICK_BLACKLISTS.get(int(chat_id))
         if setting:
             return setting["blacklist_type"], setting["value"]
         else:
@@ -149,6 +216,7 @@ def get_blacklist_setting(chat_id):
         SESSION.close()
 
 
+@startup_loader("blsticker")
 def __load_CHAT_STICKERS():
     global CHAT_STICKERS
     try:
@@ -166,6 +234,7 @@ def __load_CHAT_STICKERS():
         SESSION.close()
 
 
+@startup_loader("blsticker")
 def __load_chat_stickerset_blacklists():
     global CHAT_BLSTICK_BLACKLISTS
     try:
@@ -184,13 +253,19 @@ def migrate_chat(old_chat_id, new_chat_id):
     with STICKERS_FILTER_INSERTION_LOCK:
         chat_filters = (
             SESSION.query(StickersFilters)
-            .filter(StickersFilters.chat_id == str(old_chat_id))
+            .filter(StickersFilters.chat_id == int(old_chat_id))
             .all()
         )
         for filt in chat_filters:
-            filt.chat_id = str(new_chat_id)
+            filt.chat_id = int(new_chat_id)
         SESSION.commit()
+        if int(old_chat_id) in CHAT_STICKERS:
+            CHAT_STICKERS[int(new_chat_id)] = CHAT_STICKERS.pop(int(old_chat_id))
+        _refresh_packs(old_chat_id)
+        _refresh_packs(new_chat_id)
 
 
-__load_CHAT_STICKERS()
-__load_chat_stickerset_blacklists()
+@startup_loader("blsticker")
+def __load_chat_sticker_packs():
+    for chat_id in CHAT_STICKERS:
+        _refresh_packs(chat_id)
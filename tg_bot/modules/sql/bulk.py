@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from tg_bot.modules.sql import SESSION
+
+
+class UnitOfWork:
+    """
+    Collects the rows of a bulk write and sends them in one transaction.
+    Deletes run first, in the order they were added; then every table's
+    inserts and upserts go out as a single executemany, which SQLAlchemy
+    batches into multi-row INSERTs. Functions passed to after_commit run
+    once the transaction has committed, so in-memory caches are updated a
+    single time and never for a rolled back batch.
+
+        with UnitOfWork() as uow:
+            uow.delete(Buttons, Buttons.chat_id == chat_id)
+            for row in rows:
+                uow.upsert(Notes, chat_id=chat_id, name=row.name, ...)
+            uow.after_commit(lambda: CACHE.pop(chat_id, None))
+    """
+
+    def __init__(self, session=SESSION):
+        self.session = session
+        self._deletes = []
+        # (table, mode) -> {primary key or running index: row}
+        self._rows = OrderedDict()
+        self._callbacks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def _add(self, model, mode, values):
+        table = model.__table__
+        rows = self._rows.setdefault((table, mode), OrderedDict())
+        if mode == "insert":
+            rows[len(rows)] = values
+        else:
+            # one row per key: a second row for the same key inside one
+            # ON CONFLICT statement is an error, so the last one wins
+            rows[tuple(values[c.name] for c in table.primary_key)] = values
+
+    def insert(self, model, **values):
+        self._add(model, "insert", values)
+
+    def insert_ignore(self, model, **values):
+        """Insert, skipping rows whose primary key already exists."""
+        self._add(model, "ignore", values)
+
+    def upsert(self, model, **values):
+        """Insert, or overwrite the existing row with the same primary key."""
+        self._add(model, "upsert", values)
+
+    def delete(self, model, *criteria):
+        self._deletes.append(delete(model.__table__).where(*criteria))
+
+    def after_commit(self, func):
+        self._callbacks.append(func)
+        return func
+
+    def __len__(self):
+        return sum(len(rows) for rows in self._rows.values())
+
+    def _statement(self, table, mode, rows):
+        if mode == "insert":
+            return insert(table)
+        stmt = pg_insert(table)
+        keys = [c.name for c in table.primary_key]
+        if mode == "ignore":
+            return stmt.on_conflict_do_nothing(index_elements=keys)
+        columns = {name for row in rows for name in row} - set(keys)
+        if not columns:
+            return stmt.on_conflict_do_nothing(index_elements=keys)
+        return stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: stmt.excluded[name] for name in columns},
+        )
+
+    def commit(self):
+        session = self.session
+        try:
+            for stmt in self._deletes:
+                session.execute(stmt)
+            for (table, mode), rows in self._rows.items():
+                rows = list(rows.values())
+                if rows:
+                    session.execute(self._statement(table, mode, rows), rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+            self._deletes, self._rows = [], OrderedDict()
+        callbacks, self._callbacks = self._callbacks, []
+        for func in callbacks:
+            func()
@@ -1,30 +1,70 @@
-import redis
 import json
+from collections import Counter
 from functools import wraps
 
-from tg_bot import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD
+from tg_bot.modules.helper_funcs.redis_pool import get_redis
 
-redis_client = redis.Redis(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    password=REDIS_PASSWORD,
-    db=REDIS_DB,
-    decode_responses=True,
+redis_client = get_redis(decode_responses=True)
+
+# Every cached key is also added to one tag set per entity it was computed
+# for (each scalar positional argument, e.g. a user or chat id), so that
+# entity can be invalidated without scanning the keyspace.
+TAG_PREFIX = "cache_tag:"
+# Tag sets are shared by entries of different ttls, so they live as long
+# as the longest-lived entry any cached function can write.
+_TAG_TTL = 0
+
+CACHE_HITS = Counter()
+CACHE_MISSES = Counter()
+
+# Deletes every key registered under a tag, then the tag set itself.
+_INVALIDATE_TAG = redis_client.register_script(
+    """
+    local keys = redis.call('SMEMBERS', KEYS[1])
+    for i = 1, #keys, 1000 do
+        redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+    end
+    redis.call('DEL', KEYS[1])
+    return #keys
+    """
 )
 
 
-def cached(ttl=300):
+def _tag_key(tag):
+    return f"{TAG_PREFIX}{tag}"
+
+
+def _entity_tags(args):
+    return [
+        _tag_key(arg)
+        for arg in args
+        if isinstance(arg, (int, str)) and not isinstance(arg, bool)
+    ]
+
+
+def cached(ttl=300, tags=()):
+    global _TAG_TTL
+    _TAG_TTL = max(_TAG_TTL, ttl)
+
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             key = f"{func.__name__}:{json.dumps(args)}:{json.dumps(kwargs)}"
 
             cached_result = redis_client.get(key)
-            if cached_result:
+            if cached_result is not None:
+                CACHE_HITS[func.__name__] += 1
                 return json.loads(cached_result)
 
+            CACHE_MISSES[func.__name__] += 1
             result = func(*args, **kwargs)
-            redis_client.setex(key, ttl, json.dumps(result))
+
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.setex(key, ttl, json.dumps(result))
+            for tag_key in _entity_tags(args) + [_tag_key(tag) for tag in tags]:
+                pipe.sadd(tag_key, key)
+                pipe.expire(tag_key, _TAG_TTL)
+            pipe.execute()
             return result
 
         return wrapper
@@ -32,10 +72,34 @@ def cached(ttl=300):
     return decorator
 
 
+def invalidate_cache_tags(*tags):
+    if not tags:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for tag in set(str(tag) for tag in tags):
+        _INVALIDATE_TAG(keys=[_tag_key(tag)], client=pipe)
+    pipe.execute()
+
+
+def get_cache_stats():
+    hits = sum(CACHE_HITS.values())
+    misses = sum(CACHE_MISSES.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "per_function": {
+            name: (CACHE_HITS[name], CACHE_MISSES[name])
+            for name in set(CACHE_HITS) | set(CACHE_MISSES)
+        },
+    }
+
+
 def clear_cache():
     redis_client.flushdb()
 
 
 def invalidate_cache_pattern(pattern):
+    # Slow path kept for ad-hoc maintenance; prefer invalidate_cache_tags.
     for key in redis_client.scan_iter(pattern):
         redis_client.delete(key)
@@ -0,0 +1,389 @@
+"""
+Online migration of ChatId columns from String(14) to BIGINT (PostgreSQL).
+
+    python3 -m tg_bot.modules.sql.chat_id_migration status
+    python3 -m tg_bot.modules.sql.chat_id_migration prepare [table ...]
+    python3 -m tg_bot.modules.sql.chat_id_migration backfill [table ...]
+    python3 -m tg_bot.modules.sql.chat_id_migration cutover [table ...]
+    python3 -m tg_bot.modules.sql.chat_id_migration cleanup [table ...]
+
+prepare adds a shadow BIGINT column next to every varchar chat id column and
+a trigger that fills it on each write. backfill converts the existing rows in
+small batches and builds the shadow indexes concurrently, so the bot keeps
+running meanwhile. cutover swaps the columns under one short lock; the old
+column is kept, renamed to <column>_varchar, until cleanup drops it.
+
+ChatId loads ints from either layout, so the bot reads both while tables are
+migrated one at a time. It picks each table's storage at startup, so restart
+the bot right after a cutover. Tables linked by foreign keys (chats and
+chat_members) are always cut over together. New installs can skip all this
+by setting BIGINT_CHAT_IDS before the tables are first created.
+"""
+import argparse
+import importlib
+import pkgutil
+import time
+
+from sqlalchemy import Integer, inspect, text
+
+from tg_bot import log
+from tg_bot.modules import sql
+from tg_bot.modules.sql import BASE, SESSION, ChatId
+
+BATCH_SIZE = 5000
+BATCH_PAUSE = 0.05  # seconds between backfill batches
+LOCK_TIMEOUT = "5s"
+
+NUMERIC = "'^-?[0-9]{1,18}$'"
+
+
+def _load_models():
+    for module in pkgutil.iter_modules(sql.__path__):
+        if module.name.endswith("_sql"):
+            importlib.import_module(f"tg_bot.modules.sql.{module.name}")
+
+
+def _engine():
+    engine = SESSION.get_bind()
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("chat id migration needs PostgreSQL")
+    return engine
+
+
+def _q(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _shadow(name):
+    return f"{name}_bigint"
+
+
+def _legacy(name):
+    return f"{name}_varchar"
+
+
+def _chat_id_columns(tables=None):
+    """{table name: [ChatId column names]} for the mapped tables."""
+    found = {}
+    for table in BASE.metadata.sorted_tables:
+        if tables and table.name not in tables:
+            continue
+        columns = [c.name for c in table.columns if isinstance(c.type, ChatId)]
+        if columns:
+            found[table.name] = columns
+    return found
+
+
+def _pending(inspector, targets):
+    """Narrows targets to the columns still stored as varchar."""
+    pending = {}
+    for table, columns in targets.items():
+        if not inspector.has_table(table):
+            continue
+        types = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+        left = [c for c in columns if c in types and not _is_bigint(types[c])]
+        if left:
+            pending[table] = left
+    return pending
+
+
+def _is_bigint(sql_type):
+    return isinstance(sql_type, Integer)
+
+
+def _fk_groups(inspector, pending):
+    """Groups pending tables that reference each other through a chat id."""
+    group_of = {table: {table} for table in pending}
+    for table in pending:
+        for fk in inspector.get_foreign_keys(table):
+            other = fk["referred_table"]
+            if other in pending and set(fk["constrained_columns"]) & set(pending[table]):
+                merged = group_of[table] | group_of[other]
+                for member in merged:
+                    group_of[member] = merged
+    groups = []
+    for group in group_of.values():
+        if group not in groups:
+            groups.append(group)
+    return [sorted(group) for group in groups]
+
+
+def _numeric_guard(column):
+    return f"CASE WHEN {column} ~ {NUMERIC} THEN {column}::bigint END"
+
+
+def status():
+    _load_models()
+    engine = _engine()
+    inspector = inspect(engine)
+    rows = []
+    with engine.connect() as conn:
+        for table, columns in _chat_id_columns().items():
+            if not inspector.has_table(table):
+                continue
+            existing = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+            for column in columns:
+                if column not in existing:
+                    continue
+                if _is_bigint(existing[column]):
+                    rows.append((table, column, "bigint", 0, 0))
+                    continue
+                t, c, s = _q(engine, table), _q(engine, column), _q(engine, _shadow(column))
+                invalid = conn.execute(
+                    text(f"SELECT count(*) FROM {t} WHERE {c} !~ {NUMERIC}")
+                ).scalar()
+                if _shadow(column) not in existing:
+                    rows.append((table, column, "varchar", None, invalid))
+                    continue
+                left = conn.execute(
+                    text(f"SELECT count(*) FROM {t} WHERE {s} IS NULL AND {c} ~ {NUMERIC}")
+                ).scalar()
+                rows.append((table, column, "shadowed", left, invalid))
+    return rows
+
+
+def prepare(tables=None):
+    _load_models()
+    engine = _engine()
+    pending = _pending(inspect(engine), _chat_id_columns(tables))
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        for table, columns in pending.items():
+            t = _q(engine, table)
+            func = _q(engine, f"{table}_chat_id_sync")
+            sets = []
+            for column in columns:
+                s = _q(engine, _shadow(column))
+                conn.execute(text(f"ALTER TABLE {t} ADD COLUMN IF NOT EXISTS {s} BIGINT"))
+                sets.append(f"NEW.{s} := {_numeric_guard('NEW.' + _q(engine, column))};")
+            conn.execute(text(
+                f"CREATE OR REPLACE FUNCTION {func}() RETURNS trigger LANGUAGE plpgsql AS $$ "
+                f"BEGIN {' '.join(sets)} RETURN NEW; END $$"
+            ))
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {func} ON {t}"))
+            conn.execute(text(
+                f"CREATE TRIGGER {func} BEFORE INSERT OR UPDATE ON {t} "
+                f"FOR EACH ROW EXECUTE FUNCTION {func}()"
+            ))
+            log.info(f"[ChatId] {table}: shadow columns and sync trigger in place")
+    return sorted(pending)
+
+
+def _backfill_column(conn, engine, table, column, batch_size, pause):
+    t, c, s = _q(engine, table), _q(engine, column), _q(engine, _shadow(column))
+    stmt = text(
+        f"UPDATE {t} SET {s} = {c}::bigint WHERE ctid = ANY(ARRAY("
+        f"SELECT ctid FROM {t} WHERE {s} IS NULL AND {c} ~ {NUMERIC} LIMIT :n))"
+    )
+    total = 0
+    while True:
+        done = conn.execute(stmt, {"n": batch_size}).rowcount
+        total += done
+        if done < batch_size:
+            return total
+        time.sleep(pause)
+
+
+def _shadow_index_sql(engine, table, index, columns, unique):
+    cols = ", ".join(_q(engine, _shadow(c) if c in columns else c) for c in index["column_names"])
+    include = index.get("include_columns") or index.get("dialect_options", {}).get(
+        "postgresql_include"
+    )
+    return (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS "
+        f"{_q(engine, _shadow(index['name'])[:63])} ON {_q(engine, table)} ({cols})"
+        + (f" INCLUDE ({', '.join(_q(engine, c) for c in include)})" if include else "")
+    )
+
+
+def _chat_id_indexes(inspector, table, columns):
+    """(index, unique, kind) for the PK, unique constraints and indexes on columns."""
+    found = []
+    pk = inspector.get_pk_constraint(table)
+    if pk.get("constrained_columns") and set(pk["constrained_columns"]) & set(columns):
+        found.append(({"name": pk["name"], "column_names": pk["constrained_columns"]}, True, "pk"))
+    constraint_names = set()
+    for uc in inspector.get_unique_constraints(table):
+        constraint_names.add(uc["name"])
+        if set(uc["column_names"]) & set(columns):
+            found.append((uc, True, "unique"))
+    for index in inspector.get_indexes(table):
+        if index["name"] in constraint_names or index.get("duplicates_constraint"):
+            continue
+        names = index["column_names"]
+        if None in names:
+            log.warning(f"[ChatId] {table}.{index['name']} is an expression index, rebuild it by hand")
+            continue
+        if set(names) & set(columns):
+            found.append((index, bool(index.get("unique")), "index"))
+    return found
+
+
+def backfill(tables=None, batch_size=BATCH_SIZE, pause=BATCH_PAUSE):
+    _load_models()
+    engine = _engine()
+    inspector = inspect(engine)
+    pending = _pending(inspector, _chat_id_columns(tables))
+    # one statement per transaction, so each batch commits on its own and
+    # CREATE INDEX CONCURRENTLY is allowed
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table, columns in pending.items():
+            for column in columns:
+                done = _backfill_column(conn, engine, table, column, batch_size, pause)
+                log.info(f"[ChatId] {table}.{column}: backfilled {done} rows")
+            for index, unique, _ in _chat_id_indexes(inspector, table, columns):
+                conn.execute(text(_shadow_index_sql(engine, table, index, columns, unique)))
+                log.info(f"[ChatId] {table}: built shadow of {index['name']}")
+    return sorted(pending)
+
+
+def _cutover_group(engine, inspector, pending, group):
+    fks = []
+    for table in inspector.get_table_names():
+        for fk in inspector.get_foreign_keys(table):
+            touched = (
+                table in group and set(fk["constrained_columns"]) & set(pending[table])
+            ) or (
+                fk["referred_table"] in group
+                and set(fk["referred_columns"]) & set(pending[fk["referred_table"]])
+            )
+            if touched:
+                fks.append((table, fk))
+
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        conn.execute(text(
+            f"LOCK TABLE {', '.join(_q(engine, t) for t in group)} IN ACCESS EXCLUSIVE MODE"
+        ))
+        for table in group:
+            t = _q(engine, table)
+            for column in pending[table]:
+                c, s = _q(engine, column), _q(engine, _shadow(column))
+                missed = conn.execute(
+                    text(f"SELECT count(*) FROM {t} WHERE {s} IS NULL AND {c} IS NOT NULL")
+                ).scalar()
+                if missed:
+                    raise RuntimeError(
+                        f"{table}.{column}: {missed} rows not backfilled or not numeric"
+                    )
+            func = _q(engine, f"{table}_chat_id_sync")
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {func} ON {t}"))
+            conn.execute(text(f"DROP FUNCTION IF EXISTS {func}()"))
+
+        for table, fk in fks:
+            conn.execute(text(
+                f"ALTER TABLE {_q(engine, table)} DROP CONSTRAINT {_q(engine, fk['name'])}"
+            ))
+
+        for table in group:
+            t = _q(engine, table)
+            columns = pending[table]
+            nullable = {c["name"]: c["nullable"] for c in inspector.get_columns(table)}
+            indexes = _chat_id_indexes(inspector, table, columns)
+            for index, _, kind in indexes:
+                if kind == "index":
+                    conn.execute(text(f"DROP INDEX {_q(engine, index['name'])}"))
+                else:
+                    conn.execute(text(f"ALTER TABLE {t} DROP CONSTRAINT {_q(engine, index['name'])}"))
+            for column in columns:
+                c, s, old = (
+                    _q(engine, column), _q(engine, _shadow(column)), _q(engine, _legacy(column))
+                )
+                conn.execute(text(f"ALTER TABLE {t} RENAME COLUMN {c} TO {old}"))
+                conn.execute(text(f"ALTER TABLE {t} ALTER COLUMN {old} DROP NOT NULL"))
+                conn.execute(text(f"ALTER TABLE {t} RENAME COLUMN {s} TO {c}"))
+                if not nullable.get(column, True):
+                    conn.execute(text(f"ALTER TABLE {t} ALTER COLUMN {c} SET NOT NULL"))
+            for index, _, kind in indexes:
+                name, shadow = _q(engine, index["name"]), _q(engine, _shadow(index["name"])[:63])
+                if kind == "pk":
+                    conn.execute(text(f"ALTER TABLE {t} ADD CONSTRAINT {name} PRIMARY KEY USING INDEX {shadow}"))
+                elif kind == "unique":
+                    conn.execute(text(f"ALTER TABLE {t} ADD CONSTRAINT {name} UNIQUE USING INDEX {shadow}"))
+                else:
+                    conn.execute(text(f"ALTER INDEX {shadow} RENAME TO {name}"))
+
+        for table, fk in fks:
+            options = fk.get("options") or {}
+            conn.execute(text(
+                f"ALTER TABLE {_q(engine, table)} ADD CONSTRAINT {_q(engine, fk['name'])} "
+                f"FOREIGN KEY ({', '.join(_q(engine, c) for c in fk['constrained_columns'])}) "
+                f"REFERENCES {_q(engine, fk['referred_table'])} "
+                f"({', '.join(_q(engine, c) for c in fk['referred_columns'])})"
+                + (f" ON DELETE {options['ondelete']}" if options.get("ondelete") else "")
+                + (f" ON UPDATE {options['onupdate']}" if options.get("onupdate") else "")
+                + " NOT VALID"
+            ))
+
+    # validating only takes a SHARE UPDATE EXCLUSIVE lock, writes go on
+    with engine.begin() as conn:
+        for table, fk in fks:
+            conn.execute(text(
+                f"ALTER TABLE {_q(engine, table)} VALIDATE CONSTRAINT {_q(engine, fk['name'])}"
+            ))
+
+
+def cutover(tables=None):
+    _load_models()
+    engine = _engine()
+    inspector = inspect(engine)
+    pending = _pending(inspector, _chat_id_columns())
+    wanted = set(tables or pending)
+    done = []
+    for group in _fk_groups(inspector, pending):
+        if not wanted & set(group):
+            continue
+        for table in group:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if any(_shadow(c) not in existing for c in pending[table]):
+                raise RuntimeError(f"{table} is not prepared, run prepare and backfill first")
+        _cutover_group(engine, inspector, pending, group)
+        log.info(f"[ChatId] Cut over {', '.join(group)}; restart the bot to use BIGINT binds")
+        done.extend(group)
+    return done
+
+
+def cleanup(tables=None):
+    _load_models()
+    engine = _engine()
+    inspector = inspect(engine)
+    dropped = []
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        for table, columns in _chat_id_columns(tables).items():
+            if not inspector.has_table(table):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            for column in columns:
+                if _legacy(column) in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE {_q(engine, table)} DROP COLUMN {_q(engine, _legacy(column))}"
+                    ))
+                    dropped.append(f"{table}.{_legacy(column)}")
+    return dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move chat id columns to BIGINT")
+    parser.add_argument("command", choices=["status", "prepare", "backfill", "cutover", "cleanup"])
+    parser.add_argument("tables", nargs="*")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for table, column, storage, left, invalid in status():
+            line = f"{table}.{column}: {storage}"
+            if left is not None and storage != "bigint":
+                line += f", {left} rows to backfill"
+            if invalid:
+                line += f", {invalid} non-numeric rows"
+            print(line)
+    elif args.command == "backfill":
+        print("\n".join(backfill(args.tables, batch_size=args.batch_size)) or "nothing to do")
+    else:
+        result = globals()[args.command](args.tables)
+        print("\n".join(result) or "nothing to do")
+
+
+if __name__ == "__main__":
+    main()
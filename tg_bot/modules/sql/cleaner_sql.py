@@ -2,16 +2,16 @@ import threading
 
 from sqlalchemy import Column, UnicodeText, Boolean
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, ChatId, SESSION, startup_loader, needs_cache
 
 
 class CleanerBlueTextChatSettings(BASE):
     __tablename__ = "cleaner_bluetext_chat_setting"
-    chat_id = Column(UnicodeText, primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     is_enable = Column(Boolean, default=False)
 
     def __init__(self, chat_id, is_enable):
-        self.chat_id = chat_id
+        self.chat_id = int(chat_id)
         self.is_enable = is_enable
 
     def __repr__(self):
@@ -20,11 +20,11 @@ class CleanerBlueTextChatSettings(BASE):
 
 class CleanerBlueTextChat(BASE):
     __tablename__ = "cleaner_bluetext_chat_ignore_commands"
-    chat_id = Column(UnicodeText, primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     command = Column(UnicodeText, primary_key=True)
 
     def __init__(self, chat_id, command):
-        self.chat_id = chat_id
+        self.chat_id = int(chat_id)
         self.command = command
 
 
@@ -48,31 +48,32 @@ GLOBAL_IGNORE_COMMANDS = set()
 
 def set_cleanbt(chat_id, is_enable):
     with CLEANER_CHAT_SETTINGS:
-        curr = SESSION.query(CleanerBlueTextChatSettings).get(str(chat_id))
+        curr = SESSION.query(CleanerBlueTextChatSettings).get(int(chat_id))
         if curr:
             SESSION.delete(curr)
 
-        newcurr = CleanerBlueTextChatSettings(str(chat_id), is_enable)
+        newcurr = CleanerBlueTextChatSettings(int(chat_id), is_enable)
 
         SESSION.add(newcurr)
         SESSION.commit()
 
 
+@needs_cache("cleaner")
 def chat_ignore_command(chat_id, ignore):
     ignore = ignore.lower()
     with CLEANER_CHAT_LOCK:
-        ignored = SESSION.query(CleanerBlueTextChat).get((str(chat_id), ignore))
+        ignored = SESSION.query(CleanerBlueTextChat).get((int(chat_id), ignore))
 
         if not ignored:
 
-            if str(chat_id) not in CLEANER_CHATS:
+            if int(chat_id) not in CLEANER_CHATS:
                 CLEANER_CHATS.setdefault(
-                    str(chat_id), {"setting": False, "commands": set()}
+                    int(chat_id), {"setting": False, "commands": set()}
                 )
 
-            CLEANER_CHATS[str(chat_id)]["commands"].add(ignore)
+            CLEANER_CHATS[int(chat_id)]["commands"].add(ignore)
 
-            ignored = CleanerBlueTextChat(str(chat_id), ignore)
+            ignored = CleanerBlueTextChat(int(chat_id), ignore)
             SESSION.add(ignored)
             SESSION.commit()
             return True
@@ -80,19 +81,20 @@ def chat_ignore_command(chat_id, ignore):
         return False
 
 
+@needs_cache("cleaner")
 def chat_unignore_command(chat_id, unignore):
     unignore = unignore.lower()
     with CLEANER_CHAT_LOCK:
-        unignored = SESSION.query(CleanerBlueTextChat).get((str(chat_id), unignore))
+        unignored = SESSION.query(CleanerBlueTextChat).get((int(chat_id), unignore))
 
         if unignored:
 
-            if str(chat_id) not in CLEANER_CHATS:
+            if int(chat_id) not in CLEANER_CHATS:
                 CLEANER_CHATS.setdefault(
-                    str(chat_id), {"setting": False, "commands": set()}
+                    int(chat_id), {"setting": False, "commands": set()}
                 )
-            if unignore in CLEANER_CHATS.get(str(chat_id)).get("commands"):
-                CLEANER_CHATS[str(chat_id)]["commands"].remove(unignore)
+            if unignore in CLEANER_CHATS.get(int(chat_id)).get("commands"):
+                CLEANER_CHATS[int(chat_id)]["commands"].remove(unignore)
 
             SESSION.delete(unignored)
             SESSION.commit()
@@ -102,6 +104,7 @@ def chat_unignore_command(chat_id, unignore):
         return False
 
 
+@needs_cache("cleaner")
 def global_ignore_command(command):
     command = command.lower()
     with CLEANER_GLOBAL_LOCK:
@@ -119,6 +122,7 @@ def global_ignore_command(command):
         return False
 
 
+@needs_cache("cleaner")
 def global_unignore_command(command):
     command = command.lower()
     with CLEANER_GLOBAL_LOCK:
@@ -136,12 +140,13 @@ def global_unignore_command(command):
         return False
 
 
+@needs_cache("cleaner")
 def is_command_ignored(chat_id, command):
     if command.lower() in GLOBAL_IGNORE_COMMANDS:
         return True
 
-    if str(chat_id) in CLEANER_CHATS and command.lower() in CLEANER_CHATS.get(
-        str(chat_id)
+    if int(chat_id) in CLEANER_CHATS and command.lower() in CLEANER_CHATS.get(
+        int(chat_id)
     ).get("commands"):
         return True
 
@@ -150,7 +155,7 @@ def is_command_ignored(chat_id, command):
 
 def is_enabled(chat_id):
     try:
-        resultcurr = SESSION.query(CleanerBlueTextChatSettings).get(str(chat_id))
+        resultcurr = SESSION.query(CleanerBlueTextChatSettings).get(int(chat_id))
         if resultcurr:
             return resultcurr.is_enable
         return False #default
@@ -158,39 +163,36 @@ def is_enabled(chat_id):
         SESSION.close()
 
 
+@needs_cache("cleaner")
 def get_all_ignored(chat_id):
-    if str(chat_id) in CLEANER_CHATS:
-        LOCAL_IGNORE_COMMANDS = CLEANER_CHATS.get(str(chat_id)).get("commands")
+    if int(chat_id) in CLEANER_CHATS:
+        LOCAL_IGNORE_COMMANDS = CLEANER_CHATS.get(int(chat_id)).get("commands")
     else:
         LOCAL_IGNORE_COMMANDS = set()
 
     return GLOBAL_IGNORE_COMMANDS, LOCAL_IGNORE_COMMANDS
 
 
+@startup_loader("cleaner")
 def __load_cleaner_list():
     global GLOBAL_IGNORE_COMMANDS
     global CLEANER_CHATS
 
     try:
         GLOBAL_IGNORE_COMMANDS = {
-            x.command for x in SESSION.query(CleanerBlueTextGlobal).all()
+            command for (command,) in SESSION.query(CleanerBlueTextGlobal.command)
         }
-    finally:
-        SESSION.close()
 
-    try:
-        for x in SESSION.query(CleanerBlueTextChatSettings).all():
-            CLEANER_CHATS.setdefault(x.chat_id, {"setting": False, "commands": set()})
-            CLEANER_CHATS[x.chat_id]["setting"] = x.is_enable
+        for chat_id, is_enable in SESSION.query(
+            CleanerBlueTextChatSettings.chat_id, CleanerBlueTextChatSettings.is_enable
+        ):
+            CLEANER_CHATS.setdefault(chat_id, {"setting": False, "commands": set()})
+            CLEANER_CHATS[chat_id]["setting"] = is_enable
+
+        for chat_id, command in SESSION.query(
+            CleanerBlueTextChat.chat_id, CleanerBlueTextChat.command
+        ):
+            CLEANER_CHATS.setdefault(chat_id, {"setting": False, "commands": set()})
+            CLEANER_CHATS[chat_id]["commands"].add(command)
     finally:
         SESSION.close()
-
-    try:
-        for x in SESSION.query(CleanerBlueTextChat).all():
-            CLEANER_CHATS.setdefault(x.chat_id, {"setting": False, "commands": set()})
-            CLEANER_CHATS[x.chat_id]["commands"].add(x.command)
-    finally:
-        SESSION.close()
-
-
-__load_cleaner_list()
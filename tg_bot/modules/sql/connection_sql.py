@@ -2,18 +2,18 @@ import threading
 import time
 from typing import Union
 
-from sqlalchemy import Column, String, Boolean, UnicodeText, Integer, BigInteger
+from sqlalchemy import Column, Boolean, UnicodeText, Integer, BigInteger
 
-from tg_bot.modules.sql import SESSION, BASE
+from tg_bot.modules.sql import SESSION, BASE, ChatId, startup_loader
 
 
 class ChatAccessConnectionSettings(BASE):
     __tablename__ = "access_connection"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     allow_connect_to_chat = Column(Boolean, default=True)
 
     def __init__(self, chat_id, allow_connect_to_chat):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.allow_connect_to_chat = str(allow_connect_to_chat)
 
     def __repr__(self):
@@ -25,23 +25,23 @@ class ChatAccessConnectionSettings(BASE):
 class Connection(BASE):
     __tablename__ = "connection"
     user_id = Column(BigInteger, primary_key=True)
-    chat_id = Column(String(14))
+    chat_id = Column(ChatId)
 
     def __init__(self, user_id, chat_id):
         self.user_id = user_id
-        self.chat_id = str(chat_id)  # Ensure String
+        self.chat_id = int(chat_id)
 
 
 class ConnectionHistory(BASE):
     __tablename__ = "connection_history"
     user_id = Column(BigInteger, primary_key=True)
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     chat_name = Column(UnicodeText)
     conn_time = Column(Integer)
 
     def __init__(self, user_id, chat_id, chat_name, conn_time):
         self.user_id = user_id
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.chat_name = str(chat_name)
         self.conn_time = int(conn_time)
 
@@ -61,7 +61,7 @@ HISTORY_CONNECT = {}
 
 def allow_connect_to_chat(chat_id: Union[str, int]) -> bool:
     try:
-        chat_setting = SESSION.query(ChatAccessConnectionSettings).get(str(chat_id))
+        chat_setting = SESSION.query(ChatAccessConnectionSettings).get(int(chat_id))
         if chat_setting:
             return chat_setting.allow_connect_to_chat
         return False
@@ -71,7 +71,7 @@ def allow_connect_to_chat(chat_id: Union[str, int]) -> bool:
 
 def set_allow_connect_to_chat(chat_id: Union[int, str], setting: bool):
     with CHAT_ACCESS_LOCK:
-        chat_setting = SESSION.query(ChatAccessConnectionSettings).get(str(chat_id))
+        chat_setting = SESSION.query(ChatAccessConnectionSettings).get(int(chat_id))
         if not chat_setting:
             chat_setting = ChatAccessConnectionSettings(chat_id, setting)
 
@@ -100,7 +100,7 @@ def get_connected_chat(user_id):
 
 def curr_connection(chat_id):
     try:
-        return SESSION.query(Connection).get((str(chat_id)))
+        return SESSION.query(Connection).get((int(chat_id)))
     finally:
         SESSION.close()
 
@@ -130,10 +130,10 @@ def add_history_conn(user_id, chat_id, chat_name):
             getchat_id = {}
             for x in HISTORY_CONNECT[int(user_id)]:
                 getchat_id[HISTORY_CONNECT[int(user_id)][x]["chat_id"]] = x
-            if chat_id in getchat_id:
-                todeltime = getchat_id[str(chat_id)]
+            if int(chat_id) in getchat_id:
+                todeltime = getchat_id[int(chat_id)]
                 delold = SESSION.query(ConnectionHistory).get(
-                    (int(user_id), str(chat_id))
+                    (int(user_id), int(chat_id))
                 )
                 if delold:
                     SESSION.delete(delold)
@@ -145,22 +145,22 @@ def add_history_conn(user_id, chat_id, chat_name):
                 for x in todel:
                     chat_old = HISTORY_CONNECT[int(user_id)][x]["chat_id"]
                     delold = SESSION.query(ConnectionHistory).get(
-                        (int(user_id), str(chat_old))
+                        (int(user_id), int(chat_old))
                     )
                     if delold:
                         SESSION.delete(delold)
                         HISTORY_CONNECT[int(user_id)].pop(x)
         else:
             HISTORY_CONNECT[int(user_id)] = {}
-        delold = SESSION.query(ConnectionHistory).get((int(user_id), str(chat_id)))
+        delold = SESSION.query(ConnectionHistory).get((int(user_id), int(chat_id)))
         if delold:
             SESSION.delete(delold)
-        history = ConnectionHistory(int(user_id), str(chat_id), chat_name, conn_time)
+        history = ConnectionHistory(int(user_id), int(chat_id), chat_name, conn_time)
         SESSION.add(history)
         SESSION.commit()
         HISTORY_CONNECT[int(user_id)][conn_time] = {
             "chat_name": chat_name,
-            "chat_id": str(chat_id),
+            "chat_id": int(chat_id),
         }
 
 
@@ -175,7 +175,7 @@ def clear_history_conn(user_id):
     todel = list(HISTORY_CONNECT[int(user_id)])
     for x in todel:
         chat_old = HISTORY_CONNECT[int(user_id)][x]["chat_id"]
-        delold = SESSION.query(ConnectionHistory).get((int(user_id), str(chat_old)))
+        delold = SESSION.query(ConnectionHistory).get((int(user_id), int(chat_old)))
         if delold:
             SESSION.delete(delold)
             HISTORY_CONNECT[int(user_id)].pop(x)
@@ -183,6 +183,7 @@ def clear_history_conn(user_id):
     return True
 
 
+@startup_loader("connection")
 def __load_user_history():
     global HISTORY_CONNECT
     try:
@@ -198,6 +199,3 @@ def __load_user_history():
             }
     finally:
         SESSION.close()
-
-
-__load_user_history()
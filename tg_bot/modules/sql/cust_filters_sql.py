@@ -1,14 +1,18 @@
 import threading
 
-from sqlalchemy import Column, String, UnicodeText, Boolean, Integer, distinct, func
+from sqlalchemy import Column, Index, UnicodeText, Boolean, Integer, distinct, func, select
 
 from tg_bot.modules.helper_funcs.msg_types import Types
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.helper_funcs.trigger_index import TriggerIndex
+from tg_bot.modules.sql import BASE, ChatId, SESSION, async_query, startup_loader, needs_cache, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
+from tg_bot.modules.sql.bulk import UnitOfWork
+from tg_bot.modules.sql.index_audit import audit_query
 
 
 class CustomFilters(BASE):
     __tablename__ = "cust_filters"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     keyword = Column(UnicodeText, primary_key=True, nullable=False)
     reply = Column(UnicodeText, nullable=False)
     is_sticker = Column(Boolean, nullable=False, default=False)
@@ -46,7 +50,7 @@ class CustomFilters(BASE):
         file_type=1,
         file_id=None,
     ):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.keyword = keyword
         self.reply = reply
         self.is_sticker = is_sticker
@@ -75,14 +79,14 @@ class CustomFilters(BASE):
 
 class NewCustomFilters(BASE):
     __tablename__ = "cust_filters_new"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     keyword = Column(UnicodeText, primary_key=True, nullable=False)
     text = Column(UnicodeText)
     file_type = Column(Integer, nullable=False, default=1)
     file_id = Column(UnicodeText, default=None)
 
     def __init__(self, chat_id, keyword, text, file_type, file_id):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.keyword = keyword
         self.text = text
         self.file_type = file_type
@@ -102,14 +106,23 @@ class NewCustomFilters(BASE):
 class Buttons(BASE):
     __tablename__ = "cust_filter_urls"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     keyword = Column(UnicodeText, primary_key=True)
     name = Column(UnicodeText, nullable=False)
     url = Column(UnicodeText, nullable=False)
     same_line = Column(Boolean, default=False)
+    # the primary key leads with id, so get_buttons could not use it
+    __table_args__ = (
+        Index(
+            "ix_cust_filter_urls_chat_keyword",
+            "chat_id",
+            "keyword",
+            "id",
+        ),
+    )
 
     def __init__(self, chat_id, keyword, name, url, same_line=False):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.keyword = keyword
         self.name = name
         self.url = url
@@ -119,6 +132,13 @@ class Buttons(BASE):
 with SESSION() as _s:
     BASE.metadata.create_all(bind=_s.get_bind())
 
+audit_query(
+    "cust_filters.get_buttons",
+    select(Buttons)
+    .where(Buttons.chat_id == "0", Buttons.keyword == "")
+    .order_by(Buttons.id),
+)
+
 CUST_FILT_LOCK = threading.RLock()
 BUTTON_LOCK = threading.RLock()
 CHAT_FILTERS = {}
@@ -131,6 +151,7 @@ def get_all_filters():
         SESSION.close()
 
 
+@needs_cache("cust_filters")
 def add_filter(
     chat_id,
     keyword,
@@ -149,12 +170,12 @@ def add_filter(
         buttons = []
 
     with CUST_FILT_LOCK:
-        prev = SESSION.query(CustomFilters).get((str(chat_id), keyword))
+        prev = SESSION.query(CustomFilters).get((int(chat_id), keyword))
         if prev:
             with BUTTON_LOCK:
                 prev_buttons = (
                     SESSION.query(Buttons)
-                    .filter(Buttons.chat_id == str(chat_id), Buttons.keyword == keyword)
+                    .filter(Buttons.chat_id == int(chat_id), Buttons.keyword == keyword)
                     .all()
                 )
                 for btn in prev_buttons:
@@ -162,7 +183,7 @@ def add_filter(
             SESSION.delete(prev)
 
         filt = CustomFilters(
-            str(chat_id),
+            int(chat_id),
             keyword,
             reply,
             is_sticker,
@@ -174,11 +195,12 @@ def add_filter(
             bool(buttons),
         )
 
-        if keyword not in CHAT_FILTERS.get(str(chat_id), []):
-            CHAT_FILTERS[str(chat_id)] = sorted(
-                CHAT_FILTERS.get(str(chat_id), []) + [keyword],
+        if keyword not in CHAT_FILTERS.get(int(chat_id), []):
+            CHAT_FILTERS[int(chat_id)] = sorted(
+                CHAT_FILTERS.get(int(chat_id), []) + [keyword],
                 key=lambda x: (-len(x), x),
             )
+            FILTER_INDEX.invalidate(chat_id)
 
         SESSION.add(filt)
         SESSION.commit()
@@ -187,6 +209,7 @@ def add_filter(
         add_note_button_to_db(chat_id, keyword, b_name, url, same_line)
 
 
+@needs_cache("cust_filters")
 def new_add_filter(chat_id, keyword, reply_text, file_type, file_id, buttons):
     global CHAT_FILTERS
 
@@ -194,12 +217,12 @@ def new_add_filter(chat_id, keyword, reply_text, file_type, file_id, buttons):
         buttons = []
 
     with CUST_FILT_LOCK:
-        prev = SESSION.query(CustomFilters).get((str(chat_id), keyword))
+        prev = SESSION.query(CustomFilters).get((int(chat_id), keyword))
         if prev:
             with BUTTON_LOCK:
                 prev_buttons = (
                     SESSION.query(Buttons)
-                    .filter(Buttons.chat_id == str(chat_id), Buttons.keyword == keyword)
+                    .filter(Buttons.chat_id == int(chat_id), Buttons.keyword == keyword)
                     .all()
                 )
                 for btn in prev_buttons:
@@ -207,7 +230,7 @@ def new_add_filter(chat_id, keyword, reply_text, file_type, file_id, buttons):
             SESSION.delete(prev)
 
         filt = CustomFilters(
-            str(chat_id),
+            int(chat_id),
             keyword,
             reply="there is should be a new reply",
             is_sticker=False,
@@ -222,11 +245,12 @@ def new_add_filter(chat_id, keyword, reply_text, file_type, file_id, buttons):
             file_id=file_id,
         )
 
-        if keyword not in CHAT_FILTERS.get(str(chat_id), []):
-            CHAT_FILTERS[str(chat_id)] = sorted(
-                CHAT_FILTERS.get(str(chat_id), []) + [keyword],
+        if keyword not in CHAT_FILTERS.get(int(chat_id), []):
+            CHAT_FILTERS[int(chat_id)] = sorted(
+                CHAT_FILTERS.get(int(chat_id), []) + [keyword],
                 key=lambda x: (-len(x), x),
             )
+            FILTER_INDEX.invalidate(chat_id)
 
         SESSION.add(filt)
         SESSION.commit()
@@ -235,18 +259,20 @@ def new_add_filter(chat_id, keyword, reply_text, file_type, file_id, buttons):
         add_note_button_to_db(chat_id, keyword, b_name, url, same_line)
 
 
+@needs_cache("cust_filters")
 def remove_filter(chat_id, keyword):
     global CHAT_FILTERS
     with CUST_FILT_LOCK:
-        filt = SESSION.query(CustomFilters).get((str(chat_id), keyword))
+        filt = SESSION.query(CustomFilters).get((int(chat_id), keyword))
         if filt:
-            if keyword in CHAT_FILTERS.get(str(chat_id), []):  # Sanity check
-                CHAT_FILTERS.get(str(chat_id), []).remove(keyword)
+            if keyword in CHAT_FILTERS.get(int(chat_id), []):  # Sanity check
+                CHAT_FILTERS.get(int(chat_id), []).remove(keyword)
+                FILTER_INDEX.invalidate(chat_id)
 
             with BUTTON_LOCK:
                 prev_buttons = (
                     SESSION.query(Buttons)
-                    .filter(Buttons.chat_id == str(chat_id), Buttons.keyword == keyword)
+                    .filter(Buttons.chat_id == int(chat_id), Buttons.keyword == keyword)
                     .all()
                 )
                 for btn in prev_buttons:
@@ -260,15 +286,41 @@ def remove_filter(chat_id, keyword):
         return False
 
 
+@needs_cache("cust_filters")
+def remove_all_filters(chat_id):
+    """Removes every filter of a chat in one transaction; returns how many."""
+    with CUST_FILT_LOCK, BUTTON_LOCK:
+        count = len(CHAT_FILTERS.get(int(chat_id), []))
+        uow = UnitOfWork()
+        uow.delete(Buttons, Buttons.chat_id == int(chat_id))
+        uow.delete(CustomFilters, CustomFilters.chat_id == int(chat_id))
+
+        @uow.after_commit
+        def _uncache():
+            CHAT_FILTERS.pop(int(chat_id), None)
+            FILTER_INDEX.invalidate(chat_id)
+
+        uow.commit()
+        return count
+
+
+@needs_cache("cust_filters")
 def get_chat_triggers(chat_id):
-    return CHAT_FILTERS.get(str(chat_id), set())
+    return CHAT_FILTERS.get(int(chat_id), set())
+
+
+FILTER_INDEX = TriggerIndex(get_chat_triggers)
+
+
+def match_chat_trigger(chat_id, text):
+    return FILTER_INDEX.match(chat_id, text)
 
 
 def get_chat_filters(chat_id):
     try:
         return (
             SESSION.query(CustomFilters)
-            .filter(CustomFilters.chat_id == str(chat_id))
+            .filter(CustomFilters.chat_id == int(chat_id))
             .order_by(func.length(CustomFilters.keyword).desc())
             .order_by(CustomFilters.keyword.asc())
             .all()
@@ -279,11 +331,16 @@ def get_chat_filters(chat_id):
 
 def get_filter(chat_id, keyword):
     try:
-        return SESSION.query(CustomFilters).get((str(chat_id), keyword))
+        return SESSION.query(CustomFilters).get((int(chat_id), keyword))
     finally:
         SESSION.close()
 
 
+@async_query(get_filter)
+async def get_filter_async(session, chat_id, keyword):
+    return await session.get(CustomFilters, (int(chat_id), keyword))
+
+
 def add_note_button_to_db(chat_id, keyword, b_name, url, same_line):
     with BUTTON_LOCK:
         button = Buttons(chat_id, keyword, b_name, url, same_line)
@@ -295,7 +352,7 @@ def get_buttons(chat_id, keyword):
     try:
         return (
             SESSION.query(Buttons)
-            .filter(Buttons.chat_id == str(chat_id), Buttons.keyword == keyword)
+            .filter(Buttons.chat_id == int(chat_id), Buttons.keyword == keyword)
             .order_by(Buttons.id)
             .all()
         )
@@ -303,6 +360,18 @@ def get_buttons(chat_id, keyword):
         SESSION.close()
 
 
+@async_query(get_buttons)
+async def get_buttons_async(session, chat_id, keyword):
+    result = await session.scalars(
+        select(Buttons)
+        .where(Buttons.chat_id == int(chat_id), Buttons.keyword == keyword)
+        .order_by(Buttons.id)
+    )
+    return result.all()
+
+
+@stat_counter("filters", CustomFilters, rows=True)
+@replica_read
 def num_filters():
     try:
         return SESSION.query(CustomFilters).count()
@@ -310,6 +379,8 @@ def num_filters():
         SESSION.close()
 
 
+@stat_counter("filter_chats", CustomFilters)
+@replica_read
 def num_chats():
     try:
         return SESSION.query(func.count(distinct(CustomFilters.chat_id))).scalar()
@@ -317,16 +388,12 @@ def num_chats():
         SESSION.close()
 
 
+@startup_loader("cust_filters")
 def __load_chat_filters():
     global CHAT_FILTERS
     try:
-        chats = SESSION.query(CustomFilters.chat_id).distinct().all()
-        for (chat_id,) in chats:  # remove tuple by ( ,)
-            CHAT_FILTERS[chat_id] = []
-
-        all_filters = SESSION.query(CustomFilters).all()
-        for x in all_filters:
-            CHAT_FILTERS[x.chat_id] += [x.keyword]
+        for chat_id, keyword in SESSION.query(CustomFilters.chat_id, CustomFilters.keyword):
+            CHAT_FILTERS.setdefault(chat_id, []).append(keyword)
 
         CHAT_FILTERS = {
             x: sorted(set(y), key=lambda i: (-len(i), i))
@@ -374,29 +441,28 @@ def __migrate_filters():
         SESSION.close()
 
 
+@needs_cache("cust_filters")
 def migrate_chat(old_chat_id, new_chat_id):
     with CUST_FILT_LOCK:
         chat_filters = (
             SESSION.query(CustomFilters)
-            .filter(CustomFilters.chat_id == str(old_chat_id))
+            .filter(CustomFilters.chat_id == int(old_chat_id))
             .all()
         )
         for filt in chat_filters:
-            filt.chat_id = str(new_chat_id)
+            filt.chat_id = int(new_chat_id)
         SESSION.commit()
         try:
-            CHAT_FILTERS[str(new_chat_id)] = CHAT_FILTERS[str(old_chat_id)]
+            CHAT_FILTERS[int(new_chat_id)] = CHAT_FILTERS[int(old_chat_id)]
         except KeyError:
             pass
-        del CHAT_FILTERS[str(old_chat_id)]
+        del CHAT_FILTERS[int(old_chat_id)]
+        FILTER_INDEX.migrate(old_chat_id, new_chat_id)
 
         with BUTTON_LOCK:
             chat_buttons = (
-                SESSION.query(Buttons).filter(Buttons.chat_id == str(old_chat_id)).all()
+                SESSION.query(Buttons).filter(Buttons.chat_id == int(old_chat_id)).all()
             )
             for btn in chat_buttons:
-                btn.chat_id = str(new_chat_id)
+                btn.chat_id = int(new_chat_id)
             SESSION.commit()
-
-
-__load_chat_filters()
@@ -1,13 +1,14 @@
 import threading
 
-from sqlalchemy import Column, String, UnicodeText, func, distinct
+from sqlalchemy import Column, UnicodeText, func, distinct
 
-from tg_bot.modules.sql import SESSION, BASE
+from tg_bot.modules.sql import SESSION, BASE, ChatId, startup_loader, needs_cache, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
 
 
 class Disable(BASE):
     __tablename__ = "disabled_commands"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     command = Column(UnicodeText, primary_key=True)
 
     def __init__(self, chat_id, command):
@@ -26,14 +27,15 @@ DISABLE_INSERTION_LOCK = threading.RLock()
 DISABLED = {}
 
 
+@needs_cache("disable")
 def disable_command(chat_id, disable):
     with DISABLE_INSERTION_LOCK:
-        disabled = SESSION.query(Disable).get((str(chat_id), disable))
+        disabled = SESSION.query(Disable).get((int(chat_id), disable))
 
         if not disabled:
-            DISABLED.setdefault(str(chat_id), set()).add(disable)
+            DISABLED.setdefault(int(chat_id), set()).add(disable)
 
-            disabled = Disable(str(chat_id), disable)
+            disabled = Disable(int(chat_id), disable)
             SESSION.add(disabled)
             SESSION.commit()
             return True
@@ -42,13 +44,14 @@ def disable_command(chat_id, disable):
         return False
 
 
+@needs_cache("disable")
 def enable_command(chat_id, enable):
     with DISABLE_INSERTION_LOCK:
-        disabled = SESSION.query(Disable).get((str(chat_id), enable))
+        disabled = SESSION.query(Disable).get((int(chat_id), enable))
 
         if disabled:
-            if enable in DISABLED.get(str(chat_id)):  # sanity check
-                DISABLED.setdefault(str(chat_id), set()).remove(enable)
+            if enable in DISABLED.get(int(chat_id)):  # sanity check
+                DISABLED.setdefault(int(chat_id), set()).remove(enable)
 
             SESSION.delete(disabled)
             SESSION.commit()
@@ -58,14 +61,18 @@ def enable_command(chat_id, enable):
         return False
 
 
+@needs_cache("disable")
 def is_command_disabled(chat_id, cmd):
-    return str(cmd).lower() in DISABLED.get(str(chat_id), set())
+    return str(cmd).lower() in DISABLED.get(int(chat_id), set())
 
 
+@needs_cache("disable")
 def get_all_disabled(chat_id):
-    return DISABLED.get(str(chat_id), set())
+    return DISABLED.get(int(chat_id), set())
 
 
+@stat_counter("disabled_chats", Disable)
+@replica_read
 def num_chats():
     try:
         return SESSION.query(func.count(distinct(Disable.chat_id))).scalar()
@@ -73,6 +80,8 @@ def num_chats():
         SESSION.close()
 
 
+@stat_counter("disabled", Disable, rows=True)
+@replica_read
 def num_disabled():
     try:
         return SESSION.query(Disable).count()
@@ -80,28 +89,26 @@ def num_disabled():
         SESSION.close()
 
 
+@needs_cache("disable")
 def migrate_chat(old_chat_id, new_chat_id):
     with DISABLE_INSERTION_LOCK:
-        chats = SESSION.query(Disable).filter(Disable.chat_id == str(old_chat_id)).all()
+        chats = SESSION.query(Disable).filter(Disable.chat_id == int(old_chat_id)).all()
         for chat in chats:
-            chat.chat_id = str(new_chat_id)
+            chat.chat_id = int(new_chat_id)
             SESSION.add(chat)
 
-        if str(old_chat_id) in DISABLED:
-            DISABLED[str(new_chat_id)] = DISABLED.get(str(old_chat_id), set())
+        if int(old_chat_id) in DISABLED:
+            DISABLED[int(new_chat_id)] = DISABLED.get(int(old_chat_id), set())
 
         SESSION.commit()
 
 
+@startup_loader("disable")
 def __load_disabled_commands():
     global DISABLED
     try:
-        all_chats = SESSION.query(Disable).all()
-        for chat in all_chats:
-            DISABLED.setdefault(chat.chat_id, set()).add(chat.command)
+        for chat_id, command in SESSION.query(Disable.chat_id, Disable.command):
+            DISABLED.setdefault(chat_id, set()).add(command)
 
     finally:
         SESSION.close()
-
-
-__load_disabled_commands()
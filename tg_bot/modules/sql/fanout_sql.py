@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+
+from sqlalchemy import Column, Integer, UnicodeText
+
+from tg_bot.modules.sql import BASE, SESSION
+
+
+class FanOutJobs(BASE):
+    __tablename__ = "fanout_jobs"
+    job_id = Column(UnicodeText, primary_key=True)
+    kind = Column(UnicodeText, nullable=False)
+    payload = Column(UnicodeText, nullable=False, default="{}")
+    # every target before this index has been handled
+    cursor = Column(Integer, nullable=False, default=0)
+    affected = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    # json tallies kept by the job's call itself, e.g. chats pruned
+    counts = Column(UnicodeText, nullable=False, default="{}")
+    started = Column(Integer, nullable=False, default=0)
+
+    def __init__(self, job_id, kind, payload):
+        self.job_id = job_id
+        self.kind = kind
+        self.payload = json.dumps(payload)
+        self.cursor = 0
+        self.affected = 0
+        self.failed = 0
+        self.counts = "{}"
+        self.started = int(time.time())
+
+    def __repr__(self):
+        return "<Fan-out job %s (%s) at %s>" % (self.job_id, self.kind, self.cursor)
+
+
+with SESSION() as _s:
+    BASE.metadata.create_all(bind=_s.get_bind())
+
+FANOUT_LOCK = threading.RLock()
+
+
+def start_job(job_id, kind, payload):
+    with FANOUT_LOCK:
+        SESSION.merge(FanOutJobs(job_id, kind, payload))
+        SESSION.commit()
+
+
+def update_job(job_id, cursor, affected, failed=0, counts=None):
+    with FANOUT_LOCK:
+        job = SESSION.query(FanOutJobs).get(job_id)
+        if job:
+            job.cursor = cursor
+            job.affected = affected
+            job.failed = failed
+            job.counts = json.dumps(counts or {})
+            SESSION.commit()
+        else:
+            SESSION.close()
+
+
+def finish_job(job_id):
+    with FANOUT_LOCK:
+        SESSION.query(FanOutJobs).filter(FanOutJobs.job_id == job_id).delete()
+        SESSION.commit()
+
+
+def get_jobs(*kinds):
+    """Unfinished jobs of the given kinds, oldest first, with payloads decoded."""
+    try:
+        return [
+            {
+                "job_id": job.job_id,
+                "kind": job.kind,
+                "payload": json.loads(job.payload),
+                "cursor": job.cursor,
+                "affected": job.affected,
+                "failed": job.failed,
+                "counts": json.loads(job.counts),
+            }
+            for job in SESSION.query(FanOutJobs)
+            .filter(FanOutJobs.kind.in_(kinds))
+            .order_by(FanOutJobs.started)
+        ]
+    finally:
+        SESSION.close()
@@ -1,11 +1,14 @@
 import threading
 import ast
-from sqlalchemy import Column, String, UnicodeText, Integer, Boolean
+from collections import deque
+from sqlalchemy import Column, String, UnicodeText, Integer, Boolean, select
 from sqlalchemy.sql.sqltypes import BigInteger
 from telegram.error import BadRequest
 
 from tg_bot import dispatcher
-from tg_bot.modules.sql import SESSION, BASE
+from tg_bot.modules.sql import SESSION, BASE, ChatId, async_query, startup_loader, needs_cache
+from tg_bot.modules.sql.bulk import UnitOfWork
+from tg_bot.modules.sql.index_audit import audit_query
 
 
 class Federations(BASE):
@@ -22,13 +25,13 @@ class Federations(BASE):
         self.fed_name = fed_name
         self.fed_id = fed_id
         self.fed_rules = fed_rules
-        self.fed_log = fed_log
+        self.fed_log = None if fed_log is None else str(fed_log)
         self.fed_users = fed_users
 
 
 class ChatF(BASE):
     __tablename__ = "chat_feds"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     chat_name = Column(UnicodeText)
     fed_id = Column(UnicodeText)
 
@@ -92,6 +95,11 @@ class FedSubs(BASE):
 with SESSION() as _s:
     BASE.metadata.create_all(bind=_s.get_bind())
 
+audit_query(
+    "feds.get_fban_user",
+    select(BansF.reason, BansF.time).where(BansF.fed_id == "", BansF.user_id == "0"),
+)
+
 FEDS_LOCK = threading.RLock()
 CHAT_FEDS_LOCK = threading.RLock()
 FEDS_SETTINGS_LOCK = threading.RLock()
@@ -113,6 +121,7 @@ FEDS_SUBSCRIBER = {}
 MYFEDS_SUBSCRIBER = {}
 
 
+@needs_cache("feds")
 def get_fed_info(fed_id):
     get = FEDERATION_BYFEDID.get(str(fed_id))
     if get == None:
@@ -120,22 +129,25 @@ def get_fed_info(fed_id):
     return get
 
 
+@needs_cache("feds")
 def get_fed_id(chat_id):
-    get = FEDERATION_CHATS.get(str(chat_id))
+    get = FEDERATION_CHATS.get(int(chat_id))
     if get == None:
         return False
     else:
         return get["fid"]
 
 
+@needs_cache("feds")
 def get_fed_name(chat_id):
-    get = FEDERATION_CHATS.get(str(chat_id))
+    get = FEDERATION_CHATS.get(int(chat_id))
     if get == None:
         return False
     else:
         return get["chat_name"]
 
 
+@needs_cache("feds")
 def get_user_fban(fed_id, user_id):
     if not FEDERATION_BANNED_FULL.get(fed_id):
         return False, False, False
@@ -145,6 +157,7 @@ def get_user_fban(fed_id, user_id):
     return user_info["first_name"], user_info["reason"], user_info["time"]
 
 
+@needs_cache("feds")
 def get_user_admin_fed_name(user_id):
     user_feds = []
     for f in FEDERATION_BYFEDID:
@@ -153,6 +166,7 @@ def get_user_admin_fed_name(user_id):
     return user_feds
 
 
+@needs_cache("feds")
 def get_user_owner_fed_name(user_id):
     user_feds = []
     for f in FEDERATION_BYFEDID:
@@ -161,6 +175,7 @@ def get_user_owner_fed_name(user_id):
     return user_feds
 
 
+@needs_cache("feds")
 def get_user_admin_fed_full(user_id):
     user_feds = []
     for f in FEDERATION_BYFEDID:
@@ -169,6 +184,7 @@ def get_user_admin_fed_full(user_id):
     return user_feds
 
 
+@needs_cache("feds")
 def get_user_owner_fed_full(user_id):
     user_feds = []
     for f in FEDERATION_BYFEDID:
@@ -177,6 +193,7 @@ def get_user_owner_fed_full(user_id):
     return user_feds
 
 
+@needs_cache("feds")
 def get_user_fbanlist(user_id):
     banlist = FEDERATION_BANNED_FULL
     user_name = ""
@@ -189,6 +206,7 @@ def get_user_fbanlist(user_id):
     return user_name, fedname
 
 
+@needs_cache("feds")
 def new_fed(owner_id, fed_name, fed_id):
     with FEDS_LOCK:
         global FEDERATION_BYOWNER, FEDERATION_BYFEDID, FEDERATION_BYNAME
@@ -226,6 +244,7 @@ def new_fed(owner_id, fed_name, fed_id):
         return fed
 
 
+@needs_cache("feds")
 def del_fed(fed_id):
     with FEDS_LOCK:
         global FEDERATION_BYOWNER, FEDERATION_BYFEDID, FEDERATION_BYNAME, FEDERATION_CHATS, FEDERATION_CHATS_BYID, FEDERATION_BANNED_USERID, FEDERATION_BANNED_FULL
@@ -242,7 +261,7 @@ def del_fed(fed_id):
         FEDERATION_BYNAME.pop(fed_name)
         if FEDERATION_CHATS_BYID.get(fed_id):
             for x in FEDERATION_CHATS_BYID[fed_id]:
-                delchats = SESSION.query(ChatF).get(str(x))
+                delchats = SESSION.query(ChatF).get(x)
                 if delchats:
                     SESSION.delete(delchats)
                     SESSION.commit()
@@ -280,23 +299,25 @@ def del_fed(fed_id):
         return True
 
 
+@needs_cache("feds")
 def chat_join_fed(fed_id, chat_name, chat_id):
     with FEDS_LOCK:
         global FEDERATION_CHATS, FEDERATION_CHATS_BYID
         r = ChatF(chat_id, chat_name, fed_id)
         SESSION.add(r)
-        FEDERATION_CHATS[str(chat_id)] = {
+        FEDERATION_CHATS[int(chat_id)] = {
             "chat_name": chat_name,
             "fid": fed_id,
         }
         checkid = FEDERATION_CHATS_BYID.get(fed_id)
         if checkid == None:
             FEDERATION_CHATS_BYID[fed_id] = []
-        FEDERATION_CHATS_BYID[fed_id].append(str(chat_id))
+        FEDERATION_CHATS_BYID[fed_id].append(int(chat_id))
         SESSION.commit()
         return r
 
 
+@needs_cache("feds")
 def search_fed_by_name(fed_name):
     allfed = FEDERATION_BYNAME.get(fed_name)
     if allfed == None:
@@ -304,6 +325,7 @@ def search_fed_by_name(fed_name):
     return allfed
 
 
+@needs_cache("feds")
 def search_user_in_fed(fed_id, user_id):
     getfed = FEDERATION_BYFEDID.get(fed_id)
     if getfed == None:
@@ -315,6 +337,7 @@ def search_user_in_fed(fed_id, user_id):
         return False
 
 
+@needs_cache("feds")
 def user_demote_fed(fed_id, user_id):
     with FEDS_LOCK:
         global FEDERATION_BYOWNER, FEDERATION_BYFEDID, FEDERATION_BYNAME
@@ -366,6 +389,7 @@ def user_demote_fed(fed_id, user_id):
         return result
 
 
+@needs_cache("feds")
 def user_join_fed(fed_id, user_id):
     with FEDS_LOCK:
         global FEDERATION_BYOWNER, FEDERATION_BYFEDID, FEDERATION_BYNAME
@@ -403,17 +427,18 @@ def user_join_fed(fed_id, user_id):
         return True
 
 
+@needs_cache("feds")
 def chat_leave_fed(chat_id):
     with FEDS_LOCK:
         global FEDERATION_CHATS, FEDERATION_CHATS_BYID
         # Set variables
-        fed_info = FEDERATION_CHATS.get(str(chat_id))
+        fed_info = FEDERATION_CHATS.get(int(chat_id))
         if fed_info == None:
             return False
         fed_id = fed_info["fid"]
         # Delete from cache
-        FEDERATION_CHATS.pop(str(chat_id))
-        FEDERATION_CHATS_BYID[str(fed_id)].remove(str(chat_id))
+        FEDERATION_CHATS.pop(int(chat_id))
+        FEDERATION_CHATS_BYID[str(fed_id)].remove(int(chat_id))
         # Delete from db
         curr = SESSION.query(ChatF).all()
         for U in curr:
@@ -423,6 +448,7 @@ def chat_leave_fed(chat_id):
         return True
 
 
+@needs_cache("feds")
 def all_fed_chats(fed_id):
     with FEDS_LOCK:
         getfed = FEDERATION_CHATS_BYID.get(fed_id)
@@ -432,6 +458,7 @@ def all_fed_chats(fed_id):
             return getfed
 
 
+@needs_cache("feds")
 def all_fed_users(fed_id):
     with FEDS_LOCK:
         getfed = FEDERATION_BYFEDID.get(str(fed_id))
@@ -443,6 +470,7 @@ def all_fed_users(fed_id):
         return fed_admins
 
 
+@needs_cache("feds")
 def all_fed_members(fed_id):
     with FEDS_LOCK:
         getfed = FEDERATION_BYFEDID.get(str(fed_id))
@@ -450,6 +478,7 @@ def all_fed_members(fed_id):
         return fed_admins
 
 
+@needs_cache("feds")
 def set_frules(fed_id, rules):
     with FEDS_LOCK:
         global FEDERATION_BYOWNER, FEDERATION_BYFEDID, FEDERATION_BYNAME
@@ -478,12 +507,14 @@ def set_frules(fed_id, rules):
         return True
 
 
+@needs_cache("feds")
 def get_frules(fed_id):
     with FEDS_LOCK:
         rules = FEDERATION_BYFEDID[str(fed_id)]["frules"]
         return rules
 
 
+@needs_cache("feds")
 def fban_user(fed_id, user_id, first_name, last_name, user_name, reason, time):
     with FEDS_LOCK:
         r = SESSION.query(BansF).all()
@@ -514,6 +545,7 @@ def fban_user(fed_id, user_id, first_name, last_name, user_name, reason, time):
         return r
 
 
+@needs_cache("feds")
 def multi_fban_user(
     multi_fed_id,
     multi_user_id,
@@ -522,51 +554,53 @@ def multi_fban_user(
     multi_user_name,
     multi_reason,
 ):
-    if True:  # with FEDS_LOCK:
-        counter = 0
-        time = 0
-        for x in range(len(multi_fed_id)):
-            fed_id = multi_fed_id[x]
-            user_id = multi_user_id[x]
-            first_name = multi_first_name[x]
-            last_name = multi_last_name[x]
-            user_name = multi_user_name[x]
-            reason = multi_reason[x]
-            r = SESSION.query(BansF).all()
-            for I in r:
-                if I.fed_id == fed_id:
-                    if int(I.user_id) == int(user_id):
-                        SESSION.delete(I)
-
-            r = BansF(
-                str(fed_id),
-                str(user_id),
-                first_name,
-                last_name,
-                user_name,
-                reason,
-                time,
-            )
-
-            SESSION.add(r)
-            counter += 1
-            if str(str(counter)[-2:]) == "00":
-                print(user_id)
-                print(first_name)
-                print(reason)
-                print(counter)
+    rows = [
+        {
+            "fed_id": str(fed_id),
+            "user_id": str(user_id),
+            "first_name": first_name,
+            "last_name": last_name,
+            "user_name": user_name,
+            "reason": reason,
+            "time": 0,
+        }
+        for fed_id, user_id, first_name, last_name, user_name, reason in zip(
+            multi_fed_id,
+            multi_user_id,
+            multi_first_name,
+            multi_last_name,
+            multi_user_name,
+            multi_reason,
+        )
+    ]
+    with FEDS_LOCK:
+        uow = UnitOfWork()
+        for row in rows:
+            uow.upsert(BansF, **row)
+        uow.after_commit(lambda: __cache_fbans(rows))
         try:
-            SESSION.commit()
-        except:
-            SESSION.rollback()
+            uow.commit()
+        except Exception:
             return False
-        finally:
-            SESSION.commit()
-        __load_all_feds_banned()
-        print("Done")
-        return counter
+        return len(rows)
+
+
+def __cache_fbans(rows):
+    """Adds freshly committed bans to the caches without a full reload."""
+    banned = {}
+    for row in rows:
+        fed_id = row["fed_id"]
+        if fed_id not in banned:
+            banned[fed_id] = set(FEDERATION_BANNED_USERID.setdefault(fed_id, []))
+        if int(row["user_id"]) not in banned[fed_id]:
+            banned[fed_id].add(int(row["user_id"]))
+            FEDERATION_BANNED_USERID[fed_id].append(int(row["user_id"]))
+        FEDERATION_BANNED_FULL.setdefault(fed_id, {})[row["user_id"]] = {
+            key: row[key] for key in ("first_name", "last_name", "user_name", "reason", "time")
+        }
 
 
+@needs_cache("feds")
 def un_fban_user(fed_id, user_id):
     with FEDS_LOCK:
         r = SESSION.query(BansF).all()
@@ -585,6 +619,7 @@ def un_fban_user(fed_id, user_id):
         return I
 
 
+@needs_cache("feds")
 def get_fban_user(fed_id, user_id):
     list_fbanned = FEDERATION_BANNED_USERID.get(fed_id)
     if list_fbanned == None:
@@ -602,6 +637,25 @@ def get_fban_user(fed_id, user_id):
         return False, None, None
 
 
+@async_query(get_fban_user)
+@needs_cache("feds")
+async def get_fban_user_async(session, fed_id, user_id):
+    # the in-memory list answers the common "not banned" case without a query
+    if user_id not in FEDERATION_BANNED_USERID.get(fed_id, ()):
+        return False, None, None
+    ban = (
+        await session.execute(
+            select(BansF.reason, BansF.time).where(
+                BansF.fed_id == fed_id, BansF.user_id == str(user_id)
+            )
+        )
+    ).first()
+    if ban is None:
+        return True, None, None
+    return True, ban.reason, ban.time
+
+
+@needs_cache("feds")
 def get_all_fban_users(fed_id):
     list_fbanned = FEDERATION_BANNED_USERID.get(fed_id)
     if list_fbanned == None:
@@ -609,6 +663,7 @@ def get_all_fban_users(fed_id):
     return FEDERATION_BANNED_USERID[fed_id]
 
 
+@needs_cache("feds")
 def get_all_fban_users_target(fed_id, user_id):
     list_fbanned = FEDERATION_BANNED_FULL.get(fed_id)
     if list_fbanned == None:
@@ -618,6 +673,7 @@ def get_all_fban_users_target(fed_id, user_id):
     return getuser
 
 
+@needs_cache("feds")
 def get_all_fban_users_global():
     list_fbanned = FEDERATION_BANNED_USERID
     total = []
@@ -627,6 +683,7 @@ def get_all_fban_users_global():
     return total
 
 
+@needs_cache("feds")
 def get_all_feds_users_global():
     list_fed = FEDERATION_BYFEDID
     total = []
@@ -635,6 +692,7 @@ def get_all_feds_users_global():
     return total
 
 
+@needs_cache("feds")
 def search_fed_by_id(fed_id):
     get = FEDERATION_BYFEDID.get(fed_id)
     if get == None:
@@ -649,6 +707,7 @@ def search_fed_by_id(fed_id):
     return result
 
 
+@needs_cache("feds")
 def user_feds_report(user_id: int) -> bool:
     user_setting = FEDERATION_NOTIFICATION.get(str(user_id))
     if user_setting == None:
@@ -656,6 +715,7 @@ def user_feds_report(user_id: int) -> bool:
     return user_setting
 
 
+@needs_cache("feds")
 def set_feds_setting(user_id: int, setting: bool):
     with FEDS_SETTINGS_LOCK:
         global FEDERATION_NOTIFICATION
@@ -669,6 +729,7 @@ def set_feds_setting(user_id: int, setting: bool):
         SESSION.commit()
 
 
+@needs_cache("feds")
 def get_fed_log(fed_id):
     fed_setting = FEDERATION_BYFEDID.get(str(fed_id))
     if fed_setting == None:
@@ -690,6 +751,7 @@ def get_fed_log(fed_id):
         return False
 
 
+@needs_cache("feds")
 def set_fed_log(fed_id, chat_id):
     with FEDS_LOCK:
         global FEDERATION_BYOWNER, FEDERATION_BYFEDID, FEDERATION_BYNAME
@@ -699,7 +761,7 @@ def set_fed_log(fed_id, chat_id):
         fed_name = getfed["fname"]
         fed_members = getfed["fusers"]
         fed_rules = getfed["frules"]
-        fed_log = str(chat_id)
+        fed_log = None if chat_id is None else int(chat_id)
         # Set user
         FEDERATION_BYOWNER[str(owner_id)]["flog"] = fed_log
         FEDERATION_BYFEDID[str(fed_id)]["flog"] = fed_log
@@ -719,6 +781,7 @@ def set_fed_log(fed_id, chat_id):
         return True
 
 
+@needs_cache("feds")
 def subs_fed(fed_id, my_fed):
     check = get_spec_subs(fed_id, my_fed)
     if check:
@@ -736,6 +799,7 @@ def subs_fed(fed_id, my_fed):
         return True
 
 
+@needs_cache("feds")
 def unsubs_fed(fed_id, my_fed):
     with FEDS_SUBSCRIBER_LOCK:
         getsubs = SESSION.query(FedSubs).get((fed_id, my_fed))
@@ -751,10 +815,12 @@ def unsubs_fed(fed_id, my_fed):
         return False
 
 
+@needs_cache("feds")
 def get_all_subs(fed_id):
     return FEDS_SUBSCRIBER.get(fed_id, set())
 
 
+@needs_cache("feds")
 def get_spec_subs(fed_id, fed_target):
     if FEDS_SUBSCRIBER.get(fed_id, set()) == set():
         return {}
@@ -762,147 +828,177 @@ def get_spec_subs(fed_id, fed_target):
         return FEDS_SUBSCRIBER.get(fed_id, fed_target)
 
 
+@needs_cache("feds")
 def get_mysubs(my_fed):
     if MYFEDS_SUBSCRIBER.get(my_fed) is None:
         return None
     return list(MYFEDS_SUBSCRIBER.get(my_fed))
 
 
+@needs_cache("feds")
 def get_subscriber(fed_id):
     return FEDS_SUBSCRIBER.get(fed_id, set())
 
 
+@needs_cache("feds")
+def fed_ban_targets(fed_id):
+    """
+    Every chat a ban in fed_id reaches, once each: the fed's own chats, then
+    those of the feds subscribed to it, directly or through another
+    subscriber. Maps chat_id -> (subscribed_to, chat_fed_id), where
+    subscribed_to is None for fed_id's own chats.
+    """
+    targets = {}
+    seen = {fed_id}
+    queue = deque([(None, fed_id)])
+    with FEDS_LOCK, FEDS_SUBSCRIBER_LOCK:
+        while queue:
+            parent, fed = queue.popleft()
+            for chat_id in FEDERATION_CHATS_BYID.get(fed, ()):
+                targets.setdefault(int(chat_id), (parent, fed))
+            for sub_fed in FEDS_SUBSCRIBER.get(fed, ()):
+                if sub_fed not in seen:
+                    seen.add(sub_fed)
+                    queue.append((fed, sub_fed))
+    return targets
+
+
+def _log_chat_id(fed_log):
+    # fed_log is free text; clearing it used to store the string "None"
+    try:
+        return int(fed_log)
+    except (TypeError, ValueError):
+        return None
+
+
+@startup_loader("feds")
 def __load_all_feds():
     global FEDERATION_BYOWNER, FEDERATION_BYFEDID, FEDERATION_BYNAME
     try:
-        feds = SESSION.query(Federations).all()
-        for x in feds:  # remove tuple by ( ,)
+        feds = SESSION.query(
+            Federations.owner_id,
+            Federations.fed_name,
+            Federations.fed_id,
+            Federations.fed_rules,
+            Federations.fed_log,
+            Federations.fed_users,
+        )
+        for x in feds:
             # Fed by Owner
-            check = FEDERATION_BYOWNER.get(x.owner_id)
-            if check == None:
-                FEDERATION_BYOWNER[x.owner_id] = []
             FEDERATION_BYOWNER[str(x.owner_id)] = {
                 "fid": str(x.fed_id),
                 "fname": x.fed_name,
                 "frules": x.fed_rules,
-                "flog": x.fed_log,
+                "flog": _log_chat_id(x.fed_log),
                 "fusers": str(x.fed_users),
             }
             # Fed By FedId
-            check = FEDERATION_BYFEDID.get(x.fed_id)
-            if check == None:
-                FEDERATION_BYFEDID[x.fed_id] = []
             FEDERATION_BYFEDID[str(x.fed_id)] = {
                 "owner": str(x.owner_id),
                 "fname": x.fed_name,
                 "frules": x.fed_rules,
-                "flog": x.fed_log,
+                "flog": _log_chat_id(x.fed_log),
                 "fusers": str(x.fed_users),
             }
             # Fed By Name
-            check = FEDERATION_BYNAME.get(x.fed_name)
-            if check == None:
-                FEDERATION_BYNAME[x.fed_name] = []
             FEDERATION_BYNAME[x.fed_name] = {
                 "fid": str(x.fed_id),
                 "owner": str(x.owner_id),
                 "frules": x.fed_rules,
-                "flog": x.fed_log,
+                "flog": _log_chat_id(x.fed_log),
                 "fusers": str(x.fed_users),
             }
     finally:
         SESSION.close()
 
 
+@startup_loader("feds")
 def __load_all_feds_chats():
     global FEDERATION_CHATS, FEDERATION_CHATS_BYID
     try:
-        qall = SESSION.query(ChatF).all()
+        qall = SESSION.query(ChatF.chat_id, ChatF.chat_name, ChatF.fed_id)
         FEDERATION_CHATS = {}
         FEDERATION_CHATS_BYID = {}
-        for x in qall:
+        for chat_id, chat_name, fed_id in qall:
             # Federation Chats
-            check = FEDERATION_CHATS.get(x.chat_id)
-            if check == None:
-                FEDERATION_CHATS[x.chat_id] = {}
-            FEDERATION_CHATS[x.chat_id] = {
-                "chat_name": x.chat_name,
-                "fid": x.fed_id,
+            FEDERATION_CHATS[chat_id] = {
+                "chat_name": chat_name,
+                "fid": fed_id,
             }
             # Federation Chats By ID
-            check = FEDERATION_CHATS_BYID.get(x.fed_id)
-            if check == None:
-                FEDERATION_CHATS_BYID[x.fed_id] = []
-            FEDERATION_CHATS_BYID[x.fed_id].append(x.chat_id)
+            FEDERATION_CHATS_BYID.setdefault(fed_id, []).append(chat_id)
     finally:
         SESSION.close()
 
 
+@startup_loader("feds")
 def __load_all_feds_banned():
     global FEDERATION_BANNED_USERID, FEDERATION_BANNED_FULL
     try:
-        FEDERATION_BANNED_USERID = {}
+        banned_userid = {}
         FEDERATION_BANNED_FULL = {}
-        qall = SESSION.query(BansF).all()
+        qall = SESSION.query(
+            BansF.fed_id,
+            BansF.user_id,
+            BansF.first_name,
+            BansF.last_name,
+            BansF.user_name,
+            BansF.reason,
+            BansF.time,
+        )
         for x in qall:
-            check = FEDERATION_BANNED_USERID.get(x.fed_id)
-            if check == None:
-                FEDERATION_BANNED_USERID[x.fed_id] = []
-            if int(x.user_id) not in FEDERATION_BANNED_USERID[x.fed_id]:
-                FEDERATION_BANNED_USERID[x.fed_id].append(int(x.user_id))
-            check = FEDERATION_BANNED_FULL.get(x.fed_id)
-            if check == None:
-                FEDERATION_BANNED_FULL[x.fed_id] = {}
-            FEDERATION_BANNED_FULL[x.fed_id][x.user_id] = {
+            banned_userid.setdefault(x.fed_id, {})[int(x.user_id)] = None
+            FEDERATION_BANNED_FULL.setdefault(x.fed_id, {})[x.user_id] = {
                 "first_name": x.first_name,
                 "last_name": x.last_name,
                 "user_name": x.user_name,
                 "reason": x.reason,
                 "time": x.time,
             }
+        # dict keys dedupe in insertion order without the old O(n) list scan
+        FEDERATION_BANNED_USERID = {
+            fed_id: list(users) for fed_id, users in banned_userid.items()
+        }
     finally:
         SESSION.close()
 
 
+@startup_loader("feds")
 def __load_all_feds_settings():
     global FEDERATION_NOTIFICATION
     try:
-        getuser = SESSION.query(FedsUserSettings).all()
-        for x in getuser:
-            FEDERATION_NOTIFICATION[str(x.user_id)] = x.should_report
+        getuser = SESSION.query(FedsUserSettings.user_id, FedsUserSettings.should_report)
+        for user_id, should_report in getuser:
+            FEDERATION_NOTIFICATION[str(user_id)] = should_report
     finally:
         SESSION.close()
 
 
+@startup_loader("feds")
 def __load_feds_subscriber():
     global FEDS_SUBSCRIBER
     global MYFEDS_SUBSCRIBER
     try:
-        feds = SESSION.query(FedSubs.fed_id).distinct().all()
-        for (fed_id,) in feds:  # remove tuple by ( ,)
-            FEDS_SUBSCRIBER[fed_id] = []
-            MYFEDS_SUBSCRIBER[fed_id] = []
-
-        all_fedsubs = SESSION.query(FedSubs).all()
-        for x in all_fedsubs:
-            FEDS_SUBSCRIBER[x.fed_id] += [x.fed_subs]
-            try:
-                MYFEDS_SUBSCRIBER[x.fed_subs] += [x.fed_id]
-            except KeyError:
-                getsubs = SESSION.query(FedSubs).get((x.fed_id, x.fed_subs))
-                if getsubs:
-                    SESSION.delete(getsubs)
-                    SESSION.commit()
+        all_fedsubs = SESSION.query(FedSubs.fed_id, FedSubs.fed_subs).all()
+        for fed_id, _ in all_fedsubs:
+            FEDS_SUBSCRIBER.setdefault(fed_id, [])
+            MYFEDS_SUBSCRIBER.setdefault(fed_id, [])
+
+        stale = False
+        for fed_id, fed_subs in all_fedsubs:
+            FEDS_SUBSCRIBER[fed_id] += [fed_subs]
+            if fed_subs in MYFEDS_SUBSCRIBER:
+                MYFEDS_SUBSCRIBER[fed_subs] += [fed_id]
+            else:
+                SESSION.query(FedSubs).filter(
+                    FedSubs.fed_id == fed_id, FedSubs.fed_subs == fed_subs
+                ).delete()
+                stale = True
+        if stale:
+            SESSION.commit()
 
         FEDS_SUBSCRIBER = {x: set(y) for x, y in FEDS_SUBSCRIBER.items()}
         MYFEDS_SUBSCRIBER = {x: set(y) for x, y in MYFEDS_SUBSCRIBER.items()}
 
     finally:
         SESSION.close()
-
-
-__load_all_feds()
-__load_all_feds_chats()
-__load_all_feds_banned()
-__load_all_feds_settings()
-__load_feds_subscriber()
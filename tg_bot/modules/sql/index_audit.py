@@ -0,0 +1,95 @@
+import json
+
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from tg_bot import log
+from tg_bot.modules.sql import BASE, SESSION
+
+# (label, statement) pairs for the query shapes the *_sql modules issue on
+# their hot paths; registered next to the models they touch.
+AUDIT_QUERIES = []
+
+
+def audit_query(label, statement):
+    AUDIT_QUERIES.append((label, statement))
+
+
+def _declared_indexes():
+    for table in BASE.metadata.sorted_tables:
+        for index in table.indexes:
+            yield table, index
+
+
+def missing_indexes(bind):
+    inspector = inspect(bind)
+    existing = {}
+    missing = []
+    for table, index in _declared_indexes():
+        if table.name not in existing:
+            existing[table.name] = {i["name"] for i in inspector.get_indexes(table.name)}
+        if index.name not in existing[table.name]:
+            missing.append(index)
+    return missing
+
+
+def ensure_indexes():
+    """
+    Creates declared indexes that are missing on existing tables;
+    create_all only builds indexes for tables it creates itself.
+    """
+    engine = SESSION.get_bind()
+    missing = missing_indexes(engine)
+    if not missing:
+        return
+    concurrently = engine.dialect.name == "postgresql"
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index in missing:
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            if concurrently:
+                ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+            log.info(f"[PostgreSQL] Creating index {index.name} on {index.table.name}")
+            conn.exec_driver_sql(ddl)
+
+
+def _seq_scans(plan):
+    node = plan.get("Plan", plan)
+    found = []
+    if node.get("Node Type") == "Seq Scan":
+        found.append(node.get("Relation Name"))
+    for child in node.get("Plans", ()):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def audit_indexes():
+    """
+    Returns (missing declared indexes, [(label, tables still seq scanned)]).
+    Each audited query is EXPLAINed with enable_seqscan off, so a Seq Scan
+    left in the plan means no index can serve it, whatever the table size.
+    """
+    engine = SESSION.get_bind()
+    missing = [f"{index.table.name}.{index.name}" for index in missing_indexes(engine)]
+    unindexed = []
+    if engine.dialect.name != "postgresql":
+        return missing, unindexed
+
+    with engine.connect() as conn:
+        for label, statement in AUDIT_QUERIES:
+            sql = str(
+                statement.compile(
+                    dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+                )
+            )
+            with conn.begin() as trans:
+                conn.execute(text("SET LOCAL enable_seqscan = off"))
+                plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+                trans.rollback()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            tables = _seq_scans(plan[0])
+            if tables:
+                unindexed.append((label, tables))
+    return missing, unindexed
@@ -1,16 +1,16 @@
 import threading
 
-from sqlalchemy import Column, String, UnicodeText
-from tg_bot.modules.sql import SESSION, BASE
+from sqlalchemy import Column, UnicodeText
+from tg_bot.modules.sql import SESSION, BASE, ChatId, startup_loader, needs_cache
 
 
 class ChatLangs(BASE):
     __tablename__ = "chatlangs"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     language = Column(UnicodeText)
 
     def __init__(self, chat_id, language):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.language = language
 
     def __repr__(self):
@@ -22,34 +22,33 @@ LANG_LOCK = threading.RLock()
 with SESSION() as _s:
     BASE.metadata.create_all(bind=_s.get_bind())
 
+@needs_cache("language")
 def set_lang(chat_id: str, lang: str) -> None:
     with LANG_LOCK:
-        curr = SESSION.query(ChatLangs).get(str(chat_id))
+        curr = SESSION.query(ChatLangs).get(int(chat_id))
         if not curr:
-            curr = ChatLangs(str(chat_id), lang)
+            curr = ChatLangs(int(chat_id), lang)
             SESSION.add(curr)
             SESSION.flush()
         else:
             curr.language = lang
 
-        CHAT_LANG[str(chat_id)] = lang
+        CHAT_LANG[int(chat_id)] = lang
         SESSION.commit()
 
 
+@needs_cache("language")
 def get_chat_lang(chat_id: str) -> str:
-    lang = CHAT_LANG.get(str(chat_id))
+    lang = CHAT_LANG.get(int(chat_id))
     if lang is None:
         lang = "en"
     return lang
 
 
+@startup_loader("language")
 def __load_chat_language() -> None:
     global CHAT_LANG
     try:
-        allchats = SESSION.query(ChatLangs).all()
-        CHAT_LANG = {x.chat_id: x.language for x in allchats}
+        CHAT_LANG = dict(SESSION.query(ChatLangs.chat_id, ChatLangs.language))
     finally:
         SESSION.close()
-
-
-__load_chat_language()
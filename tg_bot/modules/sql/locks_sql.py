@@ -1,14 +1,14 @@
 # New chat added -> setup permissions
 import threading
 
-from sqlalchemy import Column, String, Boolean
+from sqlalchemy import Column, Boolean
 
-from tg_bot.modules.sql import SESSION, BASE
+from tg_bot.modules.sql import SESSION, BASE, ChatId, startup_loader
 
 
 class Permissions(BASE):
     __tablename__ = "permissions"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     # Booleans are for "is this locked", _NOT_ "is this allowed"
     audio = Column(Boolean, default=False)
     voice = Column(Boolean, default=False)
@@ -29,7 +29,7 @@ class Permissions(BASE):
     inline = Column(Boolean, default=False)
 
     def __init__(self, chat_id):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.audio = False
         self.voice = False
         self.contact = False
@@ -54,7 +54,7 @@ class Permissions(BASE):
 
 class Restrictions(BASE):
     __tablename__ = "restrictions"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     # Booleans are for "is this restricted", _NOT_ "is this allowed"
     messages = Column(Boolean, default=False)
     media = Column(Boolean, default=False)
@@ -62,7 +62,7 @@ class Restrictions(BASE):
     preview = Column(Boolean, default=False)
 
     def __init__(self, chat_id):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.messages = False
         self.media = False
         self.other = False
@@ -81,187 +81,182 @@ with SESSION() as _s:
 PERM_LOCK = threading.RLock()
 RESTR_LOCK = threading.RLock()
 
+# Lock state is kept in memory as one bitmask per chat: the low bits hold the
+# Permissions columns, the high bits the Restrictions columns.
+PERM_TYPES = (
+    "audio",
+    "voice",
+    "contact",
+    "video",
+    "document",
+    "photo",
+    "sticker",
+    "gif",
+    "url",
+    "bots",
+    "forward",
+    "game",
+    "location",
+    "rtl",
+    "button",
+    "egame",
+    "inline",
+)
+RESTR_TYPES = ("messages", "media", "other", "preview")
+
+PERM_BITS = {ptype: 1 << i for i, ptype in enumerate(PERM_TYPES)}
+RESTR_BITS = {
+    rtype: 1 << (len(PERM_TYPES) + i) for i, rtype in enumerate(RESTR_TYPES)
+}
+RESTR_BITS["previews"] = RESTR_BITS["preview"]
+
+PERM_MASK = sum(PERM_BITS[ptype] for ptype in PERM_TYPES)
+RESTR_MASK = sum(RESTR_BITS[rtype] for rtype in RESTR_TYPES)
+
+CHAT_LOCKS = {}
+
+
+def _perm_bits(perm):
+    if not perm:
+        return 0
+    return sum(PERM_BITS[ptype] for ptype in PERM_TYPES if getattr(perm, ptype))
+
+
+def _restr_bits(restr):
+    if not restr:
+        return 0
+    return sum(RESTR_BITS[rtype] for rtype in RESTR_TYPES if getattr(restr, rtype))
+
+
+def _cache_perm(chat_id, perm):
+    mask = (CHAT_LOCKS.get(int(chat_id), 0) & ~PERM_MASK) | _perm_bits(perm)
+    if mask:
+        CHAT_LOCKS[int(chat_id)] = mask
+    else:
+        CHAT_LOCKS.pop(int(chat_id), None)
+
+
+def _cache_restr(chat_id, restr):
+    mask = (CHAT_LOCKS.get(int(chat_id), 0) & ~RESTR_MASK) | _restr_bits(restr)
+    if mask:
+        CHAT_LOCKS[int(chat_id)] = mask
+    else:
+        CHAT_LOCKS.pop(int(chat_id), None)
+
 
 def init_permissions(chat_id, reset=False):
-    curr_perm = SESSION.query(Permissions).get(str(chat_id))
+    curr_perm = SESSION.query(Permissions).get(int(chat_id))
     if reset:
         SESSION.delete(curr_perm)
         SESSION.flush()
-    perm = Permissions(str(chat_id))
+    perm = Permissions(int(chat_id))
     SESSION.add(perm)
     SESSION.commit()
+    _cache_perm(chat_id, perm)
     return perm
 
 
 def init_restrictions(chat_id, reset=False):
-    curr_restr = SESSION.query(Restrictions).get(str(chat_id))
+    curr_restr = SESSION.query(Restrictions).get(int(chat_id))
     if reset:
         SESSION.delete(curr_restr)
         SESSION.flush()
-    restr = Restrictions(str(chat_id))
+    restr = Restrictions(int(chat_id))
     SESSION.add(restr)
     SESSION.commit()
+    _cache_restr(chat_id, restr)
     return restr
 
 
 def update_lock(chat_id, lock_type, locked):
     with PERM_LOCK:
-        curr_perm = SESSION.query(Permissions).get(str(chat_id))
+        curr_perm = SESSION.query(Permissions).get(int(chat_id))
         if not curr_perm:
             curr_perm = init_permissions(chat_id)
 
-        if lock_type == "audio":
-            curr_perm.audio = locked
-        elif lock_type == "voice":
-            curr_perm.voice = locked
-        elif lock_type == "contact":
-            curr_perm.contact = locked
-        elif lock_type == "video":
-            curr_perm.video = locked
-        elif lock_type == "document":
-            curr_perm.document = locked
-        elif lock_type == "photo":
-            curr_perm.photo = locked
-        elif lock_type == "sticker":
-            curr_perm.sticker = locked
-        elif lock_type == "gif":
-            curr_perm.gif = locked
-        elif lock_type == "url":
-            curr_perm.url = locked
-        elif lock_type == "bots":
-            curr_perm.bots = locked
-        elif lock_type == "forward":
-            curr_perm.forward = locked
-        elif lock_type == "game":
-            curr_perm.game = locked
-        elif lock_type == "location":
-            curr_perm.location = locked
-        elif lock_type == "rtl":
-            curr_perm.rtl = locked
-        elif lock_type == "button":
-            curr_perm.button = locked
-        elif lock_type == "egame":
-            curr_perm.egame = locked
-        elif lock_type == "inline":
-            curr_perm.inline = locked
+        if lock_type in PERM_BITS:
+            setattr(curr_perm, lock_type, locked)
 
         SESSION.add(curr_perm)
         SESSION.commit()
+        _cache_perm(chat_id, curr_perm)
 
 
 def update_restriction(chat_id, restr_type, locked):
     with RESTR_LOCK:
-        curr_restr = SESSION.query(Restrictions).get(str(chat_id))
+        curr_restr = SESSION.query(Restrictions).get(int(chat_id))
         if not curr_restr:
             curr_restr = init_restrictions(chat_id)
 
-        if restr_type == "messages":
-            curr_restr.messages = locked
-        elif restr_type == "media":
-            curr_restr.media = locked
-        elif restr_type == "other":
-            curr_restr.other = locked
+        if restr_type == "all":
+            for rtype in RESTR_TYPES:
+                setattr(curr_restr, rtype, locked)
         elif restr_type == "previews":
             curr_restr.preview = locked
-        elif restr_type == "all":
-            curr_restr.messages = locked
-            curr_restr.media = locked
-            curr_restr.other = locked
-            curr_restr.preview = locked
+        elif restr_type in RESTR_TYPES:
+            setattr(curr_restr, restr_type, locked)
+
         SESSION.add(curr_restr)
         SESSION.commit()
+        _cache_restr(chat_id, curr_restr)
+
+
+def get_lock_mask(chat_id):
+    return CHAT_LOCKS.get(int(chat_id), 0)
 
 
 def is_locked(chat_id, lock_type):
-    curr_perm = SESSION.query(Permissions).get(str(chat_id))
-    SESSION.close()
-
-    if not curr_perm:
-        return False
-
-    elif lock_type == "sticker":
-        return curr_perm.sticker
-    elif lock_type == "photo":
-        return curr_perm.photo
-    elif lock_type == "audio":
-        return curr_perm.audio
-    elif lock_type == "voice":
-        return curr_perm.voice
-    elif lock_type == "contact":
-        return curr_perm.contact
-    elif lock_type == "video":
-        return curr_perm.video
-    elif lock_type == "document":
-        return curr_perm.document
-    elif lock_type == "gif":
-        return curr_perm.gif
-    elif lock_type == "url":
-        return curr_perm.url
-    elif lock_type == "bots":
-        return curr_perm.bots
-    elif lock_type == "forward":
-        return curr_perm.forward
-    elif lock_type == "game":
-        return curr_perm.game
-    elif lock_type == "location":
-        return curr_perm.location
-    elif lock_type == "rtl":
-        return curr_perm.rtl
-    elif lock_type == "button":
-        return curr_perm.button
-    elif lock_type == "egame":
-        return curr_perm.egame
-    elif lock_type == "inline":
-        return curr_perm.inline
+    return bool(CHAT_LOCKS.get(int(chat_id), 0) & PERM_BITS.get(lock_type, 0))
 
 
 def is_restr_locked(chat_id, lock_type):
-    curr_restr = SESSION.query(Restrictions).get(str(chat_id))
-    SESSION.close()
-
-    if not curr_restr:
-        return False
-
-    if lock_type == "messages":
-        return curr_restr.messages
-    elif lock_type == "media":
-        return curr_restr.media
-    elif lock_type == "other":
-        return curr_restr.other
-    elif lock_type == "previews":
-        return curr_restr.preview
-    elif lock_type == "all":
-        return (
-            curr_restr.messages
-            and curr_restr.media
-            and curr_restr.other
-            and curr_restr.preview
-        )
+    mask = CHAT_LOCKS.get(int(chat_id), 0)
+    if lock_type == "all":
+        return mask & RESTR_MASK == RESTR_MASK
+    return bool(mask & RESTR_BITS.get(lock_type, 0))
 
 
 def get_locks(chat_id):
     try:
-        return SESSION.query(Permissions).get(str(chat_id))
+        return SESSION.query(Permissions).get(int(chat_id))
     finally:
         SESSION.close()
 
 
 def get_restr(chat_id):
     try:
-        return SESSION.query(Restrictions).get(str(chat_id))
+        return SESSION.query(Restrictions).get(int(chat_id))
     finally:
         SESSION.close()
 
 
 def migrate_chat(old_chat_id, new_chat_id):
     with PERM_LOCK:
-        perms = SESSION.query(Permissions).get(str(old_chat_id))
+        perms = SESSION.query(Permissions).get(int(old_chat_id))
         if perms:
-            perms.chat_id = str(new_chat_id)
+            perms.chat_id = int(new_chat_id)
         SESSION.commit()
 
     with RESTR_LOCK:
-        rest = SESSION.query(Restrictions).get(str(old_chat_id))
+        rest = SESSION.query(Restrictions).get(int(old_chat_id))
         if rest:
-            rest.chat_id = str(new_chat_id)
+            rest.chat_id = int(new_chat_id)
         SESSION.commit()
+
+    mask = CHAT_LOCKS.pop(int(old_chat_id), 0)
+    if mask:
+        CHAT_LOCKS[int(new_chat_id)] = mask
+
+
+@startup_loader("locks")
+def __load_chat_locks():
+    global CHAT_LOCKS
+    try:
+        locks = {}
+        for perm in SESSION.query(Permissions).all():
+            locks[perm.chat_id] = _perm_bits(perm)
+        for restr in SESSION.query(Restrictions).all():
+            locks[restr.chat_id] = locks.get(restr.chat_id, 0) | _restr_bits(restr)
+        CHAT_LOCKS = {chat_id: mask for chat_id, mask in locks.items() if mask}
+    finally:
+        SESSION.close()
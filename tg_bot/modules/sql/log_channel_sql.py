@@ -3,16 +3,17 @@ import typing
 
 from sqlalchemy import Column, String, func, distinct, BigInteger, Boolean, select
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, ChatId, SESSION, startup_loader, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
 
 
 class GroupLogs(BASE):
     __tablename__ = "log_channels"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     log_channel = Column(String(14), nullable=False)
 
     def __init__(self, chat_id, log_channel):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.log_channel = str(log_channel)
 
 
@@ -90,27 +91,27 @@ def set_chat_setting(setting: LogChannelSettings):
 
 def set_chat_log_channel(chat_id, log_channel):
     with LOGS_INSERTION_LOCK:
-        res = SESSION.query(GroupLogs).get(str(chat_id))
+        res = SESSION.query(GroupLogs).get(int(chat_id))
         if res:
             res.log_channel = log_channel
         else:
             res = GroupLogs(chat_id, log_channel)
             SESSION.add(res)
 
-        CHANNELS[str(chat_id)] = log_channel
+        CHANNELS[int(chat_id)] = log_channel
         SESSION.commit()
 
 
 def get_chat_log_channel(chat_id):
-    return CHANNELS.get(str(chat_id))
+    return CHANNELS.get(int(chat_id))
 
 
 def stop_chat_logging(chat_id):
     with LOGS_INSERTION_LOCK:
-        res = SESSION.query(GroupLogs).get(str(chat_id))
+        res = SESSION.query(GroupLogs).get(int(chat_id))
         if res:
-            if str(chat_id) in CHANNELS:
-                del CHANNELS[str(chat_id)]
+            if int(chat_id) in CHANNELS:
+                del CHANNELS[int(chat_id)]
 
             log_channel = res.log_channel
             SESSION.delete(res)
@@ -118,6 +119,8 @@ def stop_chat_logging(chat_id):
             return log_channel
 
 
+@stat_counter("log_channels", GroupLogs)
+@replica_read
 def num_logchannels():
     try:
         return SESSION.query(func.count(distinct(GroupLogs.chat_id))).scalar()
@@ -127,16 +130,17 @@ def num_logchannels():
 
 def migrate_chat(old_chat_id, new_chat_id):
     with LOGS_INSERTION_LOCK:
-        chat = SESSION.query(GroupLogs).get(str(old_chat_id))
+        chat = SESSION.query(GroupLogs).get(int(old_chat_id))
         if chat:
-            chat.chat_id = str(new_chat_id)
+            chat.chat_id = int(new_chat_id)
             SESSION.add(chat)
-            if str(old_chat_id) in CHANNELS:
-                CHANNELS[str(new_chat_id)] = CHANNELS.get(str(old_chat_id))
+            if int(old_chat_id) in CHANNELS:
+                CHANNELS[int(new_chat_id)] = CHANNELS.get(int(old_chat_id))
 
         SESSION.commit()
 
 
+@startup_loader("log_channel")
 def __load_log_channels():
     global CHANNELS
     try:
@@ -144,6 +148,3 @@ def __load_log_channels():
         CHANNELS = {chat.chat_id: chat.log_channel for chat in all_chats}
     finally:
         SESSION.close()
-
-
-__load_log_channels()
@@ -1,16 +1,16 @@
 import threading
 
-from sqlalchemy import Column, String, Boolean
+from sqlalchemy import Column, Boolean
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot.modules.sql import BASE, ChatId, SESSION
 
 class LoggerSettings(BASE):
     __tablename__ = "chat_log_settings"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     setting = Column(Boolean, default=False, nullable=False)
 
     def __init__(self, chat_id, disabled):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.setting = disabled
 
     def __repr__(self):
@@ -23,7 +23,7 @@ LOG_SETTING_LOCK = threading.RLock()
 
 def enable_chat_log(chat_id):
     with LOG_SETTING_LOCK:
-        chat = SESSION.query(LoggerSettings).get(str(chat_id))
+        chat = SESSION.query(LoggerSettings).get(int(chat_id))
         if not chat:
             chat = LoggerSettings(chat_id, True)
         chat.setting = True
@@ -32,7 +32,7 @@ def enable_chat_log(chat_id):
 
 def disable_chat_log(chat_id):
     with LOG_SETTING_LOCK:
-        chat = SESSION.query(LoggerSettings).get(str(chat_id))
+        chat = SESSION.query(LoggerSettings).get(int(chat_id))
         if not chat:
             chat = LoggerSettings(chat_id, False)
 
@@ -42,7 +42,7 @@ def disable_chat_log(chat_id):
 
 def does_chat_log(chat_id):
     with LOG_SETTING_LOCK:
-        d = SESSION.query(LoggerSettings).get(str(chat_id))
+        d = SESSION.query(LoggerSettings).get(int(chat_id))
         if not d:
             return False
         return d.setting
@@ -50,7 +50,7 @@ def does_chat_log(chat_id):
 
 def migrate_chat(old_chat_id, new_chat_id):
     with LOG_SETTING_LOCK:
-        chat = SESSION.query(LoggerSettings).get(str(old_chat_id))
+        chat = SESSION.query(LoggerSettings).get(int(old_chat_id))
         if chat:
             chat.chat_id = new_chat_id
             SESSION.add(chat)
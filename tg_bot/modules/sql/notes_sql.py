@@ -2,13 +2,16 @@
 import threading
 
 from tg_bot.modules.helper_funcs.msg_types import Types
-from tg_bot.modules.sql import BASE, SESSION
-from sqlalchemy import Boolean, Column, Integer, String, UnicodeText, distinct, func
+from tg_bot.modules.sql import BASE, ChatId, SESSION, async_query, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
+from tg_bot.modules.sql.bulk import UnitOfWork
+from tg_bot.modules.sql.index_audit import audit_query
+from sqlalchemy import Boolean, Column, Index, Integer, UnicodeText, distinct, func, select
 
 
 class Notes(BASE):
     __tablename__ = "notes"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     name = Column(UnicodeText, primary_key=True)
     value = Column(UnicodeText, nullable=False)
     file = Column(UnicodeText)
@@ -17,7 +20,7 @@ class Notes(BASE):
     msgtype = Column(Integer, default=Types.BUTTON_TEXT.value)
 
     def __init__(self, chat_id, name, value, msgtype, file=None):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.name = name
         self.value = value
         self.msgtype = msgtype
@@ -30,14 +33,23 @@ class Notes(BASE):
 class Buttons(BASE):
     __tablename__ = "note_urls"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     note_name = Column(UnicodeText, primary_key=True)
     name = Column(UnicodeText, nullable=False)
     url = Column(UnicodeText, nullable=False)
     same_line = Column(Boolean, default=False)
+    # the primary key leads with id, so get_buttons could not use it
+    __table_args__ = (
+        Index(
+            "ix_note_urls_chat_note",
+            "chat_id",
+            "note_name",
+            "id",
+        ),
+    )
 
     def __init__(self, chat_id, note_name, name, url, same_line=False):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.note_name = note_name
         self.name = name
         self.url = url
@@ -47,6 +59,13 @@ class Buttons(BASE):
 with SESSION() as _s:
     BASE.metadata.create_all(bind=_s.get_bind())
 
+audit_query(
+    "notes.get_buttons",
+    select(Buttons)
+    .where(Buttons.chat_id == "0", Buttons.note_name == "")
+    .order_by(Buttons.id),
+)
+
 NOTES_INSERTION_LOCK = threading.RLock()
 BUTTONS_INSERTION_LOCK = threading.RLock()
 
@@ -56,13 +75,13 @@ def add_note_to_db(chat_id, note_name, note_data, msgtype, buttons=None, file=No
         buttons = []
 
     with NOTES_INSERTION_LOCK:
-        prev = SESSION.query(Notes).get((str(chat_id), note_name))
+        prev = SESSION.query(Notes).get((int(chat_id), note_name))
         if prev:
             with BUTTONS_INSERTION_LOCK:
                 prev_buttons = (
                     SESSION.query(Buttons)
                     .filter(
-                        Buttons.chat_id == str(chat_id), Buttons.note_name == note_name
+                        Buttons.chat_id == int(chat_id), Buttons.note_name == note_name
                     )
                     .all()
                 )
@@ -70,7 +89,7 @@ def add_note_to_db(chat_id, note_name, note_data, msgtype, buttons=None, file=No
                     SESSION.delete(btn)
             SESSION.delete(prev)
         note = Notes(
-            str(chat_id), note_name, note_data or "", msgtype=msgtype.value, file=file
+            int(chat_id), note_name, note_data or "", msgtype=msgtype.value, file=file
         )
         SESSION.add(note)
         SESSION.commit()
@@ -79,22 +98,70 @@ def add_note_to_db(chat_id, note_name, note_data, msgtype, buttons=None, file=No
         add_note_button_to_db(chat_id, note_name, b_name, url, same_line)
 
 
+def add_notes_to_db(chat_id, notes):
+    """
+    add_note_to_db for many notes in one transaction. notes holds
+    (note_name, note_data, msgtype, buttons, file) tuples; a later note
+    replaces an earlier one of the same name, buttons included.
+    """
+    notes = {note[0]: note for note in notes}
+    if not notes:
+        return
+    with NOTES_INSERTION_LOCK, BUTTONS_INSERTION_LOCK:
+        uow = UnitOfWork()
+        uow.delete(
+            Buttons, Buttons.chat_id == int(chat_id), Buttons.note_name.in_(notes)
+        )
+        for note_name, note_data, msgtype, buttons, file in notes.values():
+            uow.upsert(
+                Notes,
+                chat_id=int(chat_id),
+                name=note_name,
+                value=note_data or "",
+                msgtype=msgtype.value,
+                file=file,
+            )
+            for b_name, url, same_line in buttons or ():
+                uow.insert(
+                    Buttons,
+                    chat_id=int(chat_id),
+                    note_name=note_name,
+                    name=b_name,
+                    url=url,
+                    same_line=same_line,
+                )
+        uow.commit()
+
+
+@replica_read
 def get_note(chat_id, note_name):
     try:
         return (
             SESSION.query(Notes)
-            .filter(func.lower(Notes.name) == note_name, Notes.chat_id == str(chat_id))
+            .filter(func.lower(Notes.name) == note_name, Notes.chat_id == int(chat_id))
+            .execution_options(cache=True)
             .first()
         )
     finally:
         SESSION.close()
 
 
+@async_query(get_note)
+async def get_note_async(session, chat_id, note_name):
+    result = await session.scalars(
+        select(Notes)
+        .where(func.lower(Notes.name) == note_name, Notes.chat_id == int(chat_id))
+        .limit(1)
+        .execution_options(cache=True)
+    )
+    return result.first()
+
+
 def rm_note(chat_id, note_name):
     with NOTES_INSERTION_LOCK:
         note = (
             SESSION.query(Notes)
-            .filter(func.lower(Notes.name) == note_name, Notes.chat_id == str(chat_id))
+            .filter(func.lower(Notes.name) == note_name, Notes.chat_id == int(chat_id))
             .first()
         )
         if note:
@@ -102,7 +169,7 @@ def rm_note(chat_id, note_name):
                 buttons = (
                     SESSION.query(Buttons)
                     .filter(
-                        Buttons.chat_id == str(chat_id), Buttons.note_name == note_name
+                        Buttons.chat_id == int(chat_id), Buttons.note_name == note_name
                     )
                     .all()
                 )
@@ -118,11 +185,19 @@ def rm_note(chat_id, note_name):
             return False
 
 
+def rm_all_notes(chat_id):
+    with NOTES_INSERTION_LOCK, BUTTONS_INSERTION_LOCK:
+        uow = UnitOfWork()
+        uow.delete(Buttons, Buttons.chat_id == int(chat_id))
+        uow.delete(Notes, Notes.chat_id == int(chat_id))
+        uow.commit()
+
+
 def get_all_chat_notes(chat_id):
     try:
         return (
             SESSION.query(Notes)
-            .filter(Notes.chat_id == str(chat_id))
+            .filter(Notes.chat_id == int(chat_id))
             .order_by(Notes.name.asc())
             .all()
         )
@@ -141,7 +216,7 @@ def get_buttons(chat_id, note_name):
     try:
         return (
             SESSION.query(Buttons)
-            .filter(Buttons.chat_id == str(chat_id), Buttons.note_name == note_name)
+            .filter(Buttons.chat_id == int(chat_id), Buttons.note_name == note_name)
             .order_by(Buttons.id)
             .all()
         )
@@ -149,6 +224,18 @@ def get_buttons(chat_id, note_name):
         SESSION.close()
 
 
+@async_query(get_buttons)
+async def get_buttons_async(session, chat_id, note_name):
+    result = await session.scalars(
+        select(Buttons)
+        .where(Buttons.chat_id == int(chat_id), Buttons.note_name == note_name)
+        .order_by(Buttons.id)
+    )
+    return result.all()
+
+
+@stat_counter("notes", Notes, rows=True)
+@replica_read
 def num_notes():
     try:
         return SESSION.query(Notes).count()
@@ -156,6 +243,8 @@ def num_notes():
         SESSION.close()
 
 
+@stat_counter("note_chats", Notes)
+@replica_read
 def num_chats():
     try:
         return SESSION.query(func.count(distinct(Notes.chat_id))).scalar()
@@ -166,16 +255,16 @@ def num_chats():
 def migrate_chat(old_chat_id, new_chat_id):
     with NOTES_INSERTION_LOCK:
         chat_notes = (
-            SESSION.query(Notes).filter(Notes.chat_id == str(old_chat_id)).all()
+            SESSION.query(Notes).filter(Notes.chat_id == int(old_chat_id)).all()
         )
         for note in chat_notes:
-            note.chat_id = str(new_chat_id)
+            note.chat_id = int(new_chat_id)
 
         with BUTTONS_INSERTION_LOCK:
             chat_buttons = (
-                SESSION.query(Buttons).filter(Buttons.chat_id == str(old_chat_id)).all()
+                SESSION.query(Buttons).filter(Buttons.chat_id == int(old_chat_id)).all()
             )
             for btn in chat_buttons:
-                btn.chat_id = str(new_chat_id)
+                btn.chat_id = int(new_chat_id)
 
         SESSION.commit()
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# upper bounds of the checkout wait histogram buckets, in seconds
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+# a p95 checkout wait above this means the pool is too small
+SLOW_WAIT = 0.05
+
+
+def percentiles(samples):
+    """(p50, p95, max) of samples, zeros when there are none."""
+    if not samples:
+        return 0.0, 0.0, 0.0
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return pick(0.5), pick(0.95), ordered[-1]
+
+
+class PoolStats:
+    """
+    Checkout telemetry for one engine's connection pool.
+    Counters come from pool events; checkout waits are timed by the
+    instrumented pool classes below, which events cannot see.
+    """
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self.pool = None  # replaced whenever the engine recreates its pool
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.recycles = 0
+        self.invalidations = 0
+        self.peak_checked_out = 0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.wait_sum = 0.0
+        self._waits = deque(maxlen=window)
+        self._timed_out = deque(maxlen=window)  # parallel to _waits
+        self._in_use = deque(maxlen=window)  # checked-out count at each checkout
+
+    def waited(self, seconds, timed_out=False):
+        with self._lock:
+            self.timeouts += timed_out
+            self.wait_sum += seconds
+            self._waits.append(seconds)
+            self._timed_out.append(timed_out)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+
+    def checked_out(self, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self._in_use.append(in_use)
+            self.peak_checked_out = max(self.peak_checked_out, in_use)
+
+    def snapshot(self):
+        pool = self.pool
+        with self._lock:
+            waits = list(self._waits)
+            out = {
+                "size": pool.size() if pool else 0,
+                "checked_out": pool.checkedout() if pool else 0,
+                "overflow": max(0, pool.overflow()) if pool else 0,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "recycles": self.recycles,
+                "invalidations": self.invalidations,
+                "wait_sum": self.wait_sum,
+                "wait_buckets": list(zip(WAIT_BUCKETS, self.wait_buckets)),
+            }
+        out["wait_p50"], out["wait_p95"], out["wait_max"] = percentiles(waits)
+        return out
+
+    def suggested_size(self, floor, ceiling):
+        """
+        Pool size that covers the p95 of recent concurrent checkouts, one
+        larger while checkouts still wait or time out; None without data.
+        """
+        with self._lock:
+            in_use = list(self._in_use)
+            waits = list(self._waits)
+            timed_out = any(self._timed_out)
+        if not in_use:
+            return None
+        size = int(percentiles(in_use)[1])
+        if timed_out or percentiles(waits)[1] > SLOW_WAIT:
+            size += 1
+        return max(floor, min(ceiling, size))
+
+
+class _InstrumentedPool:
+    stats = None
+    # pool_size for the next recreate(), see sql.adapt_pool_size
+    target_size = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            if self.stats:
+                self.stats.waited(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.stats:
+            self.stats.waited(time.perf_counter() - started)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        if self.target_size is not None and self._max_overflow >= 0:
+            # keep the connection ceiling, move the persistent share of it
+            total = self.size() + self._max_overflow
+            pool._pool.maxsize = self.target_size
+            pool._max_overflow = max(0, total - self.target_size)
+        pool.stats = self.stats
+        if self.stats:
+            self.stats.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncPool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument(engine, stats):
+    """Feeds stats from engine's pool; the listeners survive pool recreation."""
+    engine.pool.stats = stats
+    stats.pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, record, proxy):
+        stats.checked_out(stats.pool.checkedout())
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, record):
+        info = record.record_info
+        with stats._lock:
+            stats.connects += 1
+            # a record reconnecting without having been invalidated was
+            # recycled for exceeding pool_recycle
+            if info.get("connected") and not info.pop("invalidated", False):
+                stats.recycles += 1
+        info["connected"] = True
+
+    @event.listens_for(engine, "invalidate")
+    @event.listens_for(engine, "soft_invalidate")
+    def _on_invalidate(dbapi_connection, record, exception):
+        with stats._lock:
+            stats.invalidations += 1
+        record.record_info["invalidated"] = True
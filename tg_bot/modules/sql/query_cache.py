@@ -0,0 +1,230 @@
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session, loading
+
+from tg_bot.modules.sql.replicas import USE_REPLICA
+
+# Queries opt in with execution_options(cache=True); nothing else is cached.
+CACHE = "cache"
+
+
+class QueryCache:
+    """
+    Second-level cache for ORM SELECTs.
+    Entries are pickled frozen results, so a hit hands out fresh copies that
+    no session has touched since. They are keyed by SQLAlchemy's own
+    statement cache key plus bound values, evicted LRU past maxsize entries
+    or max_bytes of pickled data, expired after ttl seconds, and dropped per
+    table whenever a flush, commit or bulk statement touches that table.
+    Every invalidation bumps its tables' generation; a result read while a
+    generation moved is not stored, as it may predate the write. Results
+    over max_rows are never stored.
+    """
+
+    def __init__(self, maxsize=2048, ttl=300, max_bytes=32 * 1024 * 1024, max_rows=5000):
+        self.maxsize = maxsize
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires, tables, size, payload)
+        self._by_table = defaultdict(set)
+        self._generations = Counter()  # table -> invalidations so far
+        self._bytes = 0
+        self.hits = Counter()
+        self.misses = Counter()
+        self.invalidations = Counter()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            payload = entry[3]
+        return pickle.loads(payload)
+
+    def generation(self, tables):
+        """Snapshot to take before a read whose result goes to put()."""
+        with self._lock:
+            return tuple(self._generations[table] for table in sorted(tables))
+
+    def put(self, key, tables, frozen, generation=None):
+        if len(frozen.data) > self.max_rows:  # full-table loads aren't worth pickling
+            return
+        try:
+            payload = pickle.dumps(frozen, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != tuple(
+                self._generations[table] for table in sorted(tables)
+            ):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, tables, size, payload)
+            self._bytes += size
+            for table in tables:
+                self._by_table[table].add(key)
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] += 1
+                keys = self._by_table.pop(table, ())
+                if keys:
+                    self.invalidations[table] += 1
+                for key in keys:
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, tables, size, _ = entry
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def stats(self):
+        with self._lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "per_table": {
+                    table: (self.hits[table], self.misses[table], self.invalidations[table])
+                    for table in set(self.hits) | set(self.misses) | set(self.invalidations)
+                },
+            }
+
+
+def _statement_key(state):
+    # _generate_cache_key() is what SQLAlchemy uses for its compiled cache; it
+    # is built from the statement structure without compiling any SQL.
+    cache_key = state.statement._generate_cache_key()
+    if cache_key is None:
+        return None
+    values = tuple(bind.effective_value for bind in cache_key.bindparams)
+    params = tuple(sorted((state.parameters or {}).items()))
+    # results a possibly lagging replica served never answer primary reads
+    replica = bool(state.session.info.get(USE_REPLICA))
+    key = (replica, cache_key.key, values, params)
+    try:
+        hash(key)
+    except TypeError:  # list/dict bound values
+        return None
+    return key
+
+
+def _statement_tables(state):
+    tables = {table.name for mapper in state.all_mappers for table in mapper.tables}
+    target = getattr(state.statement, "table", None)  # Core insert/update/delete
+    if target is not None and getattr(target, "name", None):
+        tables.add(target.name)
+    return frozenset(tables)
+
+
+def _in_identity_map(session, frozen):
+    # Rows this session already holds must come from the session itself: a
+    # merge would overwrite unflushed changes (the sessions use autoflush=False).
+    for row in frozen.data:
+        # single-entity results store bare objects rather than tuples
+        for value in row if isinstance(row, tuple) else (row,):
+            state = getattr(value, "_sa_instance_state", None)
+            if state is not None and state.key in session.identity_map:
+                return True
+    return False
+
+
+def _object_tables(objects):
+    return {table.name for obj in objects for table in inspect(obj).mapper.tables}
+
+
+def install(cache: QueryCache, session_cls=Session):
+    @event.listens_for(session_cls, "do_orm_execute")
+    def _cache_orm_execute(state):
+        if not state.is_select:
+            # ORM-enabled bulk insert/update/delete, e.g. query(...).delete()
+            tables = _statement_tables(state)
+            cache.invalidate(tables)
+            state.session.info.setdefault("dirty_tables", set()).update(tables)
+            return None
+
+        if (
+            not state.execution_options.get(CACHE)
+            or state.is_column_load
+            or state.is_relationship_load
+        ):
+            return None
+
+        tables = _statement_tables(state)
+        key = _statement_key(state) if tables else None
+        if key is None:
+            return None
+
+        label = min(tables)
+        frozen = cache.get(key)
+        if frozen is not None and not _in_identity_map(state.session, frozen):
+            try:
+                merged = loading.merge_frozen_result(
+                    state.session, state.statement, frozen, load=False
+                )
+            except InvalidRequestError:
+                cache.invalidate(tables)
+            else:
+                cache.hits[label] += 1
+                return merged()
+
+        cache.misses[label] += 1
+        generation = cache.generation(tables)
+        frozen = state.invoke_statement().freeze()
+        cache.put(key, tables, frozen, generation)
+        return frozen()
+
+    @event.listens_for(session_cls, "after_flush")
+    def _invalidate_flushed(session, flush_context):
+        tables = _object_tables(list(session.new) + list(session.dirty) + list(session.deleted))
+        if tables:
+            cache.invalidate(tables)
+            session.info.setdefault("dirty_tables", set()).update(tables)
+
+    @event.listens_for(session_cls, "after_commit")
+    def _invalidate_committed(session):
+        # again after commit, in case another thread re-read the old rows
+        # between our flush and commit
+        tables = session.info.pop("dirty_tables", None)
+        if tables:
+            cache.invalidate(tables)
+
+    @event.listens_for(session_cls, "after_rollback")
+    def _forget_rolled_back(session):
+        session.info.pop("dirty_tables", None)
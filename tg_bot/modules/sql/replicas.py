@@ -0,0 +1,127 @@
+import inspect
+import itertools
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from tg_bot import KInit
+
+# session.info key set while a replica_read helper runs
+USE_REPLICA = "use_replica"
+
+_written_lock = threading.Lock()
+_written = {}  # chat id -> monotonic time of its last write
+
+
+class RoutingSession(Session):
+    """
+    Sends SELECTs to a replica while session.info[USE_REPLICA] is set;
+    everything else, flushes included, stays on the primary bind.
+    """
+
+    def __init__(self, *args, replicas=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self._replicas = itertools.cycle(replicas) if replicas else None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self._replicas is not None
+            and self.info.get(USE_REPLICA)
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+        ):
+            return next(self._replicas)
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def mark_written(chat_id):
+    """Pins chat_id's reads to the primary for DB_READ_YOUR_WRITES seconds."""
+    try:
+        chat_id = int(chat_id)
+    except (TypeError, ValueError):
+        return
+    now = time.monotonic()
+    with _written_lock:
+        _written[chat_id] = now
+        if len(_written) > 10000:
+            cutoff = now - KInit.DB_READ_YOUR_WRITES
+            for key in [k for k, at in _written.items() if at < cutoff]:
+                del _written[key]
+
+
+def recently_written(chat_id):
+    try:
+        chat_id = int(chat_id)
+    except (TypeError, ValueError):
+        return False
+    at = _written.get(chat_id)
+    return at is not None and time.monotonic() - at < KInit.DB_READ_YOUR_WRITES
+
+
+def _chat_ids_of(params):
+    if isinstance(params, dict):
+        params = [params]
+    for row in params or ():
+        for key, value in row.items():
+            if isinstance(key, str) and (key.startswith("chat_id") or key == "chat"):
+                yield value
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_flushed_chats(session, flush_context):
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        # users_sql.ChatMembers names its chat id column "chat"
+        chat_id = getattr(obj, "chat_id", None) or getattr(obj, "chat", None)
+        if chat_id is not None:
+            mark_written(chat_id)
+
+
+def _statement_params(statement):
+    """
+    The values a write statement binds, by column name, read off the
+    statement instead of compiling it.
+    """
+    for column, value in (getattr(statement, "_values", None) or {}).items():
+        yield {getattr(column, "key", column): getattr(value, "effective_value", value)}
+    for rows in getattr(statement, "_multi_values", None) or ():
+        for row in rows:
+            if isinstance(row, dict):
+                yield {
+                    getattr(column, "key", column): getattr(value, "effective_value", value)
+                    for column, value in row.items()
+                }
+    # WHERE clause values; anonymous binds keep their column name in _orig_key
+    cache_key = statement._generate_cache_key()
+    for bind in cache_key.bindparams if cache_key is not None else ():
+        values = bind.effective_value
+        for value in values if isinstance(values, (list, tuple)) else (values,):
+            yield {bind._orig_key: value}
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_statement_chats(state):
+    if state.is_select:
+        return
+    # executemany rows, then the values bound in the statement itself
+    for chat_id in _chat_ids_of(state.parameters):
+        mark_written(chat_id)
+    for chat_id in _chat_ids_of(_statement_params(state.statement)):
+        mark_written(chat_id)
+
+
+def chat_id_getter(func):
+    """Reads the chat id argument of a helper whose first parameter is chat_id."""
+    params = list(inspect.signature(func).parameters)
+    if not params or params[0] != "chat_id":
+        return lambda args, kwargs: None
+    return lambda args, kwargs: args[0] if args else kwargs.get("chat_id")
+
+
+def routes_to_replica(func, args, kwargs):
+    """Whether a call of the replica_read helper func may use a replica."""
+    if not getattr(func, "__replica_read__", False):
+        return False
+    chat_id = func.__replica_chat_id__(args, kwargs)
+    return chat_id is None or not recently_written(chat_id)
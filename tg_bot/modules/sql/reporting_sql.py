@@ -1,10 +1,10 @@
 import threading
 from typing import Union
 
-from sqlalchemy import Column, String, Boolean
+from sqlalchemy import Column, Boolean
 from sqlalchemy.sql.sqltypes import BigInteger
 
-from tg_bot.modules.sql import SESSION, BASE
+from tg_bot.modules.sql import SESSION, BASE, ChatId
 
 
 class ReportingUserSettings(BASE):
@@ -21,11 +21,11 @@ class ReportingUserSettings(BASE):
 
 class ReportingChatSettings(BASE):
     __tablename__ = "chat_report_settings"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     should_report = Column(Boolean, default=True)
 
     def __init__(self, chat_id):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
 
     def __repr__(self):
         return "<Chat report settings ({})>".format(self.chat_id)
@@ -40,7 +40,7 @@ USER_LOCK = threading.RLock()
 
 def chat_should_report(chat_id: Union[str, int]) -> bool:
     try:
-        chat_setting = SESSION.query(ReportingChatSettings).get(str(chat_id))
+        chat_setting = SESSION.query(ReportingChatSettings).get(int(chat_id))
         if chat_setting:
             return chat_setting.should_report
         return False
@@ -60,7 +60,7 @@ def user_should_report(user_id: int) -> bool:
 
 def set_chat_setting(chat_id: Union[int, str], setting: bool):
     with CHAT_LOCK:
-        chat_setting = SESSION.query(ReportingChatSettings).get(str(chat_id))
+        chat_setting = SESSION.query(ReportingChatSettings).get(int(chat_id))
         if not chat_setting:
             chat_setting = ReportingChatSettings(chat_id)
 
@@ -84,9 +84,9 @@ def migrate_chat(old_chat_id, new_chat_id):
     with CHAT_LOCK:
         chat_notes = (
             SESSION.query(ReportingChatSettings)
-            .filter(ReportingChatSettings.chat_id == str(old_chat_id))
+            .filter(ReportingChatSettings.chat_id == int(old_chat_id))
             .all()
         )
         for note in chat_notes:
-            note.chat_id = str(new_chat_id)
+            note.chat_id = int(new_chat_id)
         SESSION.commit()
@@ -1,16 +1,17 @@
 import threading
 
-from tg_bot.modules.sql import BASE, SESSION
-from sqlalchemy import Column, String, UnicodeText, distinct, func
+from tg_bot.modules.sql import BASE, ChatId, SESSION, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
+from sqlalchemy import Column, UnicodeText, distinct, func
 
 
 class Rules(BASE):
     __tablename__ = "rules"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     rules = Column(UnicodeText, default="")
 
     def __init__(self, chat_id):
-        self.chat_id = chat_id
+        self.chat_id = int(chat_id)
 
     def __repr__(self):
         return "<Chat {} rules: {}>".format(self.chat_id, self.rules)
@@ -24,9 +25,9 @@ INSERTION_LOCK = threading.RLock()
 
 def set_rules(chat_id, rules_text):
     with INSERTION_LOCK:
-        rules = SESSION.query(Rules).get(str(chat_id))
+        rules = SESSION.query(Rules).get(int(chat_id))
         if not rules:
-            rules = Rules(str(chat_id))
+            rules = Rules(int(chat_id))
         rules.rules = rules_text
 
         SESSION.add(rules)
@@ -34,7 +35,7 @@ def set_rules(chat_id, rules_text):
 
 
 def get_rules(chat_id):
-    rules = SESSION.query(Rules).get(str(chat_id))
+    rules = SESSION.query(Rules).get(int(chat_id))
     ret = ""
     if rules:
         ret = rules.rules
@@ -43,6 +44,8 @@ def get_rules(chat_id):
     return ret
 
 
+@stat_counter("rules_chats", Rules)
+@replica_read
 def num_chats():
     try:
         return SESSION.query(func.count(distinct(Rules.chat_id))).scalar()
@@ -52,7 +55,7 @@ def num_chats():
 
 def migrate_chat(old_chat_id, new_chat_id):
     with INSERTION_LOCK:
-        chat = SESSION.query(Rules).get(str(old_chat_id))
+        chat = SESSION.query(Rules).get(int(old_chat_id))
         if chat:
-            chat.chat_id = str(new_chat_id)
+            chat.chat_id = int(new_chat_id)
         SESSION.commit()
@@ -0,0 +1,205 @@
+import threading
+from collections import Counter
+from functools import wraps
+from itertools import chain
+
+from sqlalchemy import BigInteger, Column, UnicodeText, event, literal_column
+from sqlalchemy.orm import Session
+
+from tg_bot import log
+from tg_bot.modules.sql import BASE, SESSION, ensure_cache, startup_loader
+from tg_bot.modules.sql.bulk import UnitOfWork
+
+
+class StatCounters(BASE):
+    __tablename__ = "stat_counters"
+    name = Column(UnicodeText, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __init__(self, name, value=0):
+        self.name = name
+        self.value = value
+
+    def __repr__(self):
+        return "<Stat counter %s = %s>" % (self.name, self.value)
+
+
+with SESSION() as _s:
+    BASE.metadata.create_all(bind=_s.get_bind())
+
+STATS_LOCK = threading.RLock()
+# seconds between recounts of dirty counters, and between full reconciles
+REFRESH_INTERVAL = 60
+RECONCILE_INTERVAL = 3600
+
+COUNTERS = {}  # name -> exact counting function
+VALUES = {}  # name -> materialized value
+DIRTY = set()  # counters to recount on the next refresh
+CHANGED = set()  # counters whose value is not persisted yet
+# table name -> counters over it; ROW_COUNTERS is the subset that counts
+# the table's rows and so can follow inserts and deletes as deltas
+TABLE_COUNTERS = {}
+ROW_COUNTERS = {}
+
+# Execution option for bulk writes whose caller reports its row deltas
+# through count_rows; other bulk writes mark their counters dirty.
+COUNTED = "stat_counted"
+# RETURNING this from INSERT ... ON CONFLICT DO UPDATE is true for the rows
+# inserted and false for the ones updated
+INSERTED = literal_column("xmax = 0").label("inserted")
+
+
+def stat_counter(name, model, rows=False):
+    """
+    Serves a num_* helper from a materialized counter instead of a COUNT
+    over the table. Counters with rows=True count model's rows and follow
+    committed ORM inserts and deletes; any other write to the table, and
+    every write to the table of a counter without rows, marks the counter
+    for a recount by refresh_counters. The decorated function remains the
+    exact count and is available as .exact.
+    """
+    table = model.__table__.name
+
+    def decorator(func):
+        COUNTERS[name] = func
+        TABLE_COUNTERS.setdefault(table, set()).add(name)
+        if rows:
+            ROW_COUNTERS.setdefault(table, set()).add(name)
+
+        @wraps(func)
+        def wrapper():
+            ensure_cache("stats")
+            value = VALUES.get(name)
+            if value is None:
+                value = _recount(name, func)
+            return value
+
+        wrapper.exact = func
+        return wrapper
+    return decorator
+
+
+def count_rows(session, name, delta):
+    """Adds delta to counter name once session's transaction commits."""
+    if delta:
+        session.info.setdefault("stat_deltas", Counter())[name] += delta
+
+
+def _mark_dirty(tables):
+    names = set(chain.from_iterable(TABLE_COUNTERS.get(table, ()) for table in tables))
+    if names:
+        with STATS_LOCK:
+            DIRTY.update(names)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deltas(session, flush_context):
+    deltas = session.info.setdefault("stat_deltas", Counter())
+    touched = set()
+    for objects, step in ((session.new, 1), (session.deleted, -1), (session.dirty, 0)):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in TABLE_COUNTERS:
+                continue
+            touched.add(table)
+            if step:
+                for name in ROW_COUNTERS.get(table, ()):
+                    deltas[name] += step
+    if touched:
+        session.info.setdefault("stat_tables", set()).update(touched)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_write(state):
+    if state.is_select or state.execution_options.get(COUNTED):
+        return
+    # bulk statements report no reliable row count, recount instead
+    table = getattr(state.statement, "table", None)
+    if table is not None:
+        _mark_dirty([table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_deltas(session):
+    deltas = session.info.pop("stat_deltas", None)
+    tables = session.info.pop("stat_tables", None)
+    if deltas:
+        with STATS_LOCK:
+            for name, delta in deltas.items():
+                if delta and VALUES.get(name) is not None:
+                    VALUES[name] += delta
+                    CHANGED.add(name)
+    if tables:
+        row_counters = set(chain.from_iterable(ROW_COUNTERS.get(t, ()) for t in tables))
+        with STATS_LOCK:
+            DIRTY.update(
+                name
+                for table in tables
+                for name in TABLE_COUNTERS[table]
+                if name not in row_counters
+            )
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_deltas(session, transaction):
+    if transaction.parent is None:
+        # rolled back or closed without a commit
+        session.info.pop("stat_deltas", None)
+        session.info.pop("stat_tables", None)
+
+
+def _recount(name, func):
+    value = int(func() or 0)
+    with STATS_LOCK:
+        VALUES[name] = value
+        CHANGED.add(name)
+    return value
+
+
+def refresh_counters(full=False):
+    """
+    Recounts the dirty counters, or every counter with full=True, then
+    persists the values that changed. Returns the names recounted.
+    """
+    with STATS_LOCK:
+        names = set(COUNTERS) if full else set(DIRTY) | (set(COUNTERS) - set(VALUES))
+        DIRTY.difference_update(names)
+    for name in sorted(names):
+        func = COUNTERS[name]
+        try:
+            # a counter dirtied by a write is recounted on the primary
+            _recount(name, func if full else getattr(func, "__wrapped__", func))
+        except Exception:
+            log.exception(f"[Stats] Recounting {name} failed")
+            with STATS_LOCK:
+                DIRTY.add(name)
+    persist_counters()
+    return names
+
+
+def persist_counters():
+    with STATS_LOCK:
+        changed = {name: VALUES[name] for name in CHANGED if name in VALUES}
+        CHANGED.clear()
+    if not changed:
+        return
+    uow = UnitOfWork()
+    for name, value in changed.items():
+        uow.upsert(StatCounters, name=name, value=value)
+    try:
+        uow.commit()
+    except Exception:
+        with STATS_LOCK:
+            CHANGED.update(changed)
+        raise
+
+
+@startup_loader("stats")
+def __load_stat_counters():
+    try:
+        rows = SESSION.query(StatCounters.name, StatCounters.value).all()
+        with STATS_LOCK:
+            for name, value in rows:
+                VALUES.setdefault(name, value)
+    finally:
+        SESSION.close()
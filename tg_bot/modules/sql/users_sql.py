@@ -1,18 +1,24 @@
 import threading
 
 
-from tg_bot.modules.sql import BASE, SESSION
+from tg_bot import log
+from tg_bot.modules.sql import BASE, ChatId, SESSION, replica_read
+from tg_bot.modules.sql.stats_sql import COUNTED, INSERTED, count_rows, stat_counter
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import (
     Column,
     ForeignKey,
-    String,
+    Index,
     UnicodeText,
     UniqueConstraint,
     func,
+    select,
     BigInteger,
 )
 
-from tg_bot.modules.sql.cache_utils import cached, clear_cache, invalidate_cache_pattern
+from tg_bot.modules.sql.cache_utils import cached, clear_cache, invalidate_cache_tags
+from tg_bot.modules.sql.index_audit import audit_query
 
 
 class Users(BASE):
@@ -30,11 +36,11 @@ class Users(BASE):
 
 class Chats(BASE):
     __tablename__ = "chats"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     chat_name = Column(UnicodeText, nullable=False)
 
     def __init__(self, chat_id, chat_name):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.chat_name = chat_name
 
     def __repr__(self):
@@ -46,7 +52,7 @@ class ChatMembers(BASE):
     priv_chat_id = Column(BigInteger, primary_key=True)
     # NOTE: Use dual primary key instead of private primary key?
     chat = Column(
-        String(14),
+        ChatId,
         ForeignKey("chats.chat_id", onupdate="CASCADE", ondelete="CASCADE"),
         nullable=False,
     )
@@ -55,7 +61,12 @@ class ChatMembers(BASE):
         ForeignKey("users.user_id", onupdate="CASCADE", ondelete="CASCADE"),
         nullable=False,
     )
-    __table_args__ = (UniqueConstraint("chat", "user", name="_chat_members_uc"),)
+    __table_args__ = (
+        # (chat, user) lookups and per-chat scans use this one
+        UniqueConstraint("chat", "user", name="_chat_members_uc"),
+        # per-user scans (common chats, chat counts) read chat from the index
+        Index("ix_chat_members_user_chat", "user", "chat"),
+    )
 
     def __init__(self, chat, user):
         self.chat = chat
@@ -70,6 +81,14 @@ INSERTION_LOCK = threading.RLock()
 with SESSION() as _s:
     BASE.metadata.create_all(bind=_s.get_bind())
 
+audit_query("users.get_user_com_chats", select(ChatMembers.chat).where(ChatMembers.user == 0))
+audit_query(
+    "users.update_user",
+    select(ChatMembers).where(ChatMembers.chat == "0", ChatMembers.user == 0),
+)
+audit_query("users.get_chat_members", select(ChatMembers.user).where(ChatMembers.chat == "0"))
+
+
 def ensure_bot_in_db_by_values(bot_id: int, username: str | None):
     """
     Insert/merge the bot into the users table using known id/username.
@@ -83,7 +102,7 @@ def ensure_bot_in_db_by_values(bot_id: int, username: str | None):
         else:
             bot.username = username
         SESSION.commit()
-        invalidate_user_cache(bot_id)
+        invalidate_cache_tags(bot_id, "users")
 
 
 async def ensure_bot_in_db_app(app):
@@ -94,41 +113,125 @@ async def ensure_bot_in_db_app(app):
     ensure_bot_in_db_by_values(me.id, me.username)
 
 
+# Sightings from update_user are buffered here and written in bulk by
+# flush_user_buffer, so logging users costs no transaction per message.
+# The buffer never holds more than USER_BUFFER_MAX users or memberships;
+# sightings past that are dropped until a flush makes room.
+USER_BUFFER_MAX = 5000
+USER_FLUSH_INTERVAL = 10  # seconds
+
+BUFFER_LOCK = threading.Lock()
+PENDING_USERS = {}
+PENDING_CHATS = {}
+PENDING_MEMBERS = set()
+FLUSH_REQUESTED = False
+# called, without blocking, when the buffer fills up before the next flush
+FLUSH_TRIGGER = None
+
+
+def set_flush_trigger(func):
+    global FLUSH_TRIGGER
+    FLUSH_TRIGGER = func
+
+
+def _buffer_full():
+    return len(PENDING_USERS) >= USER_BUFFER_MAX or len(PENDING_MEMBERS) >= USER_BUFFER_MAX
+
+
 def update_user(user_id, username, chat_id=None, chat_name=None):
-    with INSERTION_LOCK:
-        user = SESSION.get(Users, user_id)
-        if not user:
-            user = Users(user_id, username)
-            SESSION.add(user)
-            SESSION.flush()
-        else:
-            user.username = username
+    global FLUSH_REQUESTED
+    with BUFFER_LOCK:
+        if _buffer_full():
+            return
+        PENDING_USERS[user_id] = username
+        if chat_id and chat_name:
+            PENDING_CHATS[int(chat_id)] = chat_name
+            PENDING_MEMBERS.add((int(chat_id), user_id))
 
-        if not chat_id or not chat_name:
-            SESSION.commit()
-            invalidate_user_cache(user_id)
+        if not _buffer_full() or FLUSH_REQUESTED:
             return
+        FLUSH_REQUESTED = True
 
-        chat = SESSION.get(Chats, str(chat_id))
-        if not chat:
-            chat = Chats(str(chat_id), chat_name)
-            SESSION.add(chat)
-            SESSION.flush()
-        else:
-            chat.chat_name = chat_name
+    if FLUSH_TRIGGER:
+        FLUSH_TRIGGER()
 
-        member = (
-            SESSION.query(ChatMembers)
-            .filter(ChatMembers.chat == chat.chat_id, ChatMembers.user == user.user_id)
-            .first()
-        )
-        if not member:
-            chat_member = ChatMembers(chat.chat_id, user.user_id)
-            SESSION.add(chat_member)
 
-        SESSION.commit()
-        invalidate_user_cache(user_id)
-        invalidate_chat_cache(chat_id)
+def flush_user_buffer():
+    global PENDING_USERS, PENDING_CHATS, PENDING_MEMBERS, FLUSH_REQUESTED
+    with BUFFER_LOCK:
+        users, chats, members = PENDING_USERS, PENDING_CHATS, PENDING_MEMBERS
+        PENDING_USERS, PENDING_CHATS, PENDING_MEMBERS = {}, {}, set()
+        FLUSH_REQUESTED = False
+
+    if not users:
+        return 0
+
+    with INSERTION_LOCK:
+        try:
+            stmt = insert(Users.__table__).values(
+                [{"user_id": uid, "username": uname} for uid, uname in users.items()]
+            )
+            result = SESSION.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[Users.user_id],
+                    set_={"username": stmt.excluded.username},
+                )
+                .returning(INSERTED)
+                .execution_options(**{COUNTED: True})
+            )
+            new_users = sum(result.scalars())
+            count_rows(SESSION, "users", new_users)
+            new_chats = 0
+
+            if chats:
+                stmt = insert(Chats.__table__).values(
+                    [{"chat_id": cid, "chat_name": cname} for cid, cname in chats.items()]
+                )
+                result = SESSION.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[Chats.chat_id],
+                        set_={"chat_name": stmt.excluded.chat_name},
+                    )
+                    .returning(INSERTED)
+                    .execution_options(**{COUNTED: True})
+                )
+                new_chats = sum(result.scalars())
+                count_rows(SESSION, "chats", new_chats)
+
+            if members:
+                SESSION.execute(
+                    insert(ChatMembers.__table__)
+                    .values([{"chat": cid, "user": uid} for cid, uid in members])
+                    .on_conflict_do_nothing(constraint="_chat_members_uc")
+                )
+
+            SESSION.commit()
+        except SQLAlchemyError:
+            SESSION.rollback()
+            log.exception("[users_sql] Failed to flush %d buffered users", len(users))
+            # put the batch back so the next flush retries it, unless that
+            # would overfill the buffer; the batch goes back whole or not at
+            # all so no membership is left without its user and chat
+            with BUFFER_LOCK:
+                if (
+                    len(PENDING_USERS) + len(users) <= USER_BUFFER_MAX
+                    and len(PENDING_MEMBERS) + len(members) <= USER_BUFFER_MAX
+                ):
+                    for uid, uname in users.items():
+                        PENDING_USERS.setdefault(uid, uname)
+                    for cid, cname in chats.items():
+                        PENDING_CHATS.setdefault(cid, cname)
+                    PENDING_MEMBERS.update(members)
+                else:
+                    log.warning("[users_sql] Buffer full, dropped %d unflushed users", len(users))
+            return 0
+
+    # get_all_users/get_all_chats only change when rows are added
+    invalidate_cache_tags(
+        *users, *chats, *(["users"] if new_users else []), *(["chats"] if new_chats else [])
+    )
+
+    return len(users)
 
 
 @cached(ttl=300)
@@ -152,17 +255,17 @@ def get_chat_members(chat_id):
     return [
         member.user
         for member in SESSION.query(ChatMembers)
-        .filter(ChatMembers.chat == str(chat_id))
+        .filter(ChatMembers.chat == int(chat_id))
         .all()
     ]
 
 
-@cached(ttl=300)
+@cached(ttl=300, tags=("chats",))
 def get_all_chats():
     return [chat.chat_id for chat in SESSION.query(Chats).all()]
 
 
-@cached(ttl=300)
+@cached(ttl=300, tags=("users",))
 def get_all_users():
     return [user.user_id for user in SESSION.query(Users).all()]
 
@@ -180,46 +283,49 @@ def get_user_com_chats(user_id):
     return [member.chat for member in chat_members]
 
 
-@cached(ttl=300)
+@stat_counter("chats", Chats, rows=True)
+@replica_read
 def num_chats():
     return SESSION.query(Chats).count()
 
 
-@cached(ttl=300)
+@stat_counter("users", Users, rows=True)
+@replica_read
 def num_users():
     return SESSION.query(Users).count()
 
 
 def migrate_chat(old_chat_id, new_chat_id):
+    flush_user_buffer()
     with INSERTION_LOCK:
-        chat = SESSION.get(Chats, str(old_chat_id))
+        chat = SESSION.get(Chats, int(old_chat_id))
         if chat:
-            chat.chat_id = str(new_chat_id)
+            chat.chat_id = int(new_chat_id)
             SESSION.add(chat)
 
         SESSION.flush()
 
         chat_members = (
             SESSION.query(ChatMembers)
-            .filter(ChatMembers.chat == str(old_chat_id))
+            .filter(ChatMembers.chat == int(old_chat_id))
             .all()
         )
         for member in chat_members:
-            member.chat = str(new_chat_id)
+            member.chat = int(new_chat_id)
             SESSION.add(member)
 
         SESSION.commit()
-        invalidate_chat_cache(old_chat_id)
-        invalidate_chat_cache(new_chat_id)
+        invalidate_cache_tags(old_chat_id, new_chat_id, "chats")
 
 
 def del_user(user_id):
+    flush_user_buffer()
     with INSERTION_LOCK:
         curr = SESSION.get(Users, user_id)
         if curr:
             SESSION.delete(curr)
             SESSION.commit()
-            invalidate_user_cache(user_id)
+            invalidate_cache_tags(user_id, "users")
             return True
 
         SESSION.query(ChatMembers).filter(ChatMembers.user == user_id).delete(synchronize_session=False)
@@ -229,22 +335,24 @@ def del_user(user_id):
 
 
 def rem_chat(chat_id):
+    flush_user_buffer()
     with INSERTION_LOCK:
-        chat = SESSION.get(Chats, str(chat_id))
+        chat = SESSION.get(Chats, int(chat_id))
         if chat:
             SESSION.delete(chat)
             SESSION.commit()
-            invalidate_chat_cache(chat_id)
-        else:
-            SESSION.close()
+            invalidate_cache_tags(chat_id, "chats")
+            return True
+        SESSION.close()
+        return False
 
 
 def invalidate_user_cache(user_id):
-    invalidate_cache_pattern(f"*:{user_id}:*")
+    invalidate_cache_tags(user_id)
 
 
 def invalidate_chat_cache(chat_id):
-    invalidate_cache_pattern(f"*:{chat_id}:*")
+    invalidate_cache_tags(chat_id)
 
 
 def invalidate_all_cache():
@@ -2,22 +2,28 @@ import threading
 
 #from sqlalchemy.sql.sqltypes import BigInteger
 
-from tg_bot.modules.sql import BASE, SESSION
-from sqlalchemy import Boolean, Column, Integer, String, UnicodeText, distinct, func, BigInteger
+from tg_bot.modules.helper_funcs.trigger_index import TriggerIndex
+from tg_bot.modules.sql import BASE, ChatId, SESSION, async_query, startup_loader, needs_cache, replica_read
+from tg_bot.modules.sql.stats_sql import stat_counter
+from tg_bot.modules.sql.index_audit import audit_query
+from sqlalchemy import Boolean, Column, Index, Integer, UnicodeText, distinct, func, BigInteger, literal, select
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert
 
 
 class Warns(BASE):
     __tablename__ = "warns"
 
     user_id = Column(BigInteger, primary_key=True)
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     num_warns = Column(Integer, default=0)
     reasons = Column(postgresql.ARRAY(UnicodeText))
+    # primary key leads with user_id; migrations and chat stats go by chat
+    __table_args__ = (Index("ix_warns_chat_id", "chat_id"),)
 
     def __init__(self, user_id, chat_id):
         self.user_id = user_id
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.num_warns = 0
         self.reasons = []
 
@@ -29,12 +35,12 @@ class Warns(BASE):
 
 class WarnFilters(BASE):
     __tablename__ = "warn_filters"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     keyword = Column(UnicodeText, primary_key=True, nullable=False)
     reply = Column(UnicodeText, nullable=False)
 
     def __init__(self, chat_id, keyword, reply):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.keyword = keyword
         self.reply = reply
 
@@ -51,12 +57,12 @@ class WarnFilters(BASE):
 
 class WarnSettings(BASE):
     __tablename__ = "warn_settings"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     warn_limit = Column(Integer, default=3)
     soft_warn = Column(Boolean, default=False)
 
     def __init__(self, chat_id, warn_limit=3, soft_warn=False):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.warn_limit = warn_limit
         self.soft_warn = soft_warn
 
@@ -67,6 +73,9 @@ class WarnSettings(BASE):
 with SESSION() as _s:
     BASE.metadata.create_all(bind=_s.get_bind())
 
+audit_query("warns.warn_user", select(Warns).where(Warns.user_id == 0, Warns.chat_id == "0"))
+audit_query("warns.migrate_chat", select(Warns).where(Warns.chat_id == "0"))
+
 WARN_INSERTION_LOCK = threading.RLock()
 WARN_FILTER_INSERTION_LOCK = threading.RLock()
 WARN_SETTINGS_LOCK = threading.RLock()
@@ -76,9 +85,9 @@ WARN_FILTERS = {}
 
 def warn_user(user_id, chat_id, reason=None):
     with WARN_INSERTION_LOCK:
-        warned_user = SESSION.query(Warns).get((user_id, str(chat_id)))
+        warned_user = SESSION.query(Warns).get((user_id, int(chat_id)))
         if not warned_user:
-            warned_user = Warns(user_id, str(chat_id))
+            warned_user = Warns(user_id, int(chat_id))
 
         warned_user.num_warns += 1
         if reason:
@@ -95,10 +104,35 @@ def warn_user(user_id, chat_id, reason=None):
         return num, reasons
 
 
+@async_query(warn_user)
+async def warn_user_async(session, user_id, chat_id, reason=None):
+    # single atomic upsert instead of read-modify-write under a thread lock
+    update = {"num_warns": Warns.num_warns + 1}
+    if reason:
+        update["reasons"] = func.array_append(
+            func.coalesce(Warns.reasons, literal([], postgresql.ARRAY(UnicodeText))),
+            reason,
+        )
+    stmt = (
+        insert(Warns)
+        .values(
+            user_id=user_id,
+            chat_id=int(chat_id),
+            num_warns=1,
+            reasons=[reason] if reason else [],
+        )
+        .on_conflict_do_update(index_elements=[Warns.user_id, Warns.chat_id], set_=update)
+        .returning(Warns.num_warns, Warns.reasons)
+    )
+    num, reasons = (await session.execute(stmt)).one()
+    await session.commit()
+    return num, reasons
+
+
 def remove_warn(user_id, chat_id):
     with WARN_INSERTION_LOCK:
         removed = False
-        warned_user = SESSION.query(Warns).get((user_id, str(chat_id)))
+        warned_user = SESSION.query(Warns).get((user_id, int(chat_id)))
 
         if warned_user and warned_user.num_warns > 0:
             warned_user.num_warns -= 1
@@ -113,7 +147,7 @@ def remove_warn(user_id, chat_id):
 
 def reset_warns(user_id, chat_id):
     with WARN_INSERTION_LOCK:
-        warned_user = SESSION.query(Warns).get((user_id, str(chat_id)))
+        warned_user = SESSION.query(Warns).get((user_id, int(chat_id)))
         if warned_user:
             warned_user.num_warns = 0
             warned_user.reasons = []
@@ -125,7 +159,7 @@ def reset_warns(user_id, chat_id):
 
 def get_warns(user_id, chat_id):
     try:
-        user = SESSION.query(Warns).get((user_id, str(chat_id)))
+        user = SESSION.query(Warns).get((user_id, int(chat_id)))
         if not user:
             return None
         reasons = user.reasons
@@ -135,26 +169,30 @@ def get_warns(user_id, chat_id):
         SESSION.close()
 
 
+@needs_cache("warns")
 def add_warn_filter(chat_id, keyword, reply):
     with WARN_FILTER_INSERTION_LOCK:
-        warn_filt = WarnFilters(str(chat_id), keyword, reply)
+        warn_filt = WarnFilters(int(chat_id), keyword, reply)
 
-        if keyword not in WARN_FILTERS.get(str(chat_id), []):
-            WARN_FILTERS[str(chat_id)] = sorted(
-                WARN_FILTERS.get(str(chat_id), []) + [keyword],
+        if keyword not in WARN_FILTERS.get(int(chat_id), []):
+            WARN_FILTERS[int(chat_id)] = sorted(
+                WARN_FILTERS.get(int(chat_id), []) + [keyword],
                 key=lambda x: (-len(x), x),
             )
+            WARN_FILTER_INDEX.invalidate(chat_id)
 
         SESSION.merge(warn_filt)  # merge to avoid duplicate key issues
         SESSION.commit()
 
 
+@needs_cache("warns")
 def remove_warn_filter(chat_id, keyword):
     with WARN_FILTER_INSERTION_LOCK:
-        warn_filt = SESSION.query(WarnFilters).get((str(chat_id), keyword))
+        warn_filt = SESSION.query(WarnFilters).get((int(chat_id), keyword))
         if warn_filt:
-            if keyword in WARN_FILTERS.get(str(chat_id), []):  # sanity check
-                WARN_FILTERS.get(str(chat_id), []).remove(keyword)
+            if keyword in WARN_FILTERS.get(int(chat_id), []):  # sanity check
+                WARN_FILTERS.get(int(chat_id), []).remove(keyword)
+                WARN_FILTER_INDEX.invalidate(chat_id)
 
             SESSION.delete(warn_filt)
             SESSION.commit()
@@ -163,14 +201,22 @@ def remove_warn_filter(chat_id, keyword):
         return False
 
 
+@needs_cache("warns")
 def get_chat_warn_triggers(chat_id):
-    return WARN_FILTERS.get(str(chat_id), set())
+    return WARN_FILTERS.get(int(chat_id), set())
+
+
+WARN_FILTER_INDEX = TriggerIndex(get_chat_warn_triggers)
+
+
+def match_warn_filter(chat_id, text):
+    return WARN_FILTER_INDEX.match(chat_id, text)
 
 
 def get_chat_warn_filters(chat_id):
     try:
         return (
-            SESSION.query(WarnFilters).filter(WarnFilters.chat_id == str(chat_id)).all()
+            SESSION.query(WarnFilters).filter(WarnFilters.chat_id == int(chat_id)).all()
         )
     finally:
         SESSION.close()
@@ -178,14 +224,19 @@ def get_chat_warn_filters(chat_id):
 
 def get_warn_filter(chat_id, keyword):
     try:
-        return SESSION.query(WarnFilters).get((str(chat_id), keyword))
+        return SESSION.query(WarnFilters).get((int(chat_id), keyword))
     finally:
         SESSION.close()
 
 
+@async_query(get_warn_filter)
+async def get_warn_filter_async(session, chat_id, keyword):
+    return await session.get(WarnFilters, (int(chat_id), keyword))
+
+
 def set_warn_limit(chat_id, warn_limit):
     with WARN_SETTINGS_LOCK:
-        curr_setting = SESSION.query(WarnSettings).get(str(chat_id))
+        curr_setting = SESSION.query(WarnSettings).get(int(chat_id))
         if not curr_setting:
             curr_setting = WarnSettings(chat_id, warn_limit=warn_limit)
 
@@ -197,7 +248,7 @@ def set_warn_limit(chat_id, warn_limit):
 
 def set_warn_strength(chat_id, soft_warn):
     with WARN_SETTINGS_LOCK:
-        curr_setting = SESSION.query(WarnSettings).get(str(chat_id))
+        curr_setting = SESSION.query(WarnSettings).get(int(chat_id))
         if not curr_setting:
             curr_setting = WarnSettings(chat_id, soft_warn=soft_warn)
 
@@ -207,9 +258,10 @@ def set_warn_strength(chat_id, soft_warn):
         SESSION.commit()
 
 
+@replica_read
 def get_warn_setting(chat_id):
     try:
-        setting = SESSION.query(WarnSettings).get(str(chat_id))
+        setting = SESSION.query(WarnSettings).execution_options(cache=True).get(int(chat_id))
         if setting:
             return setting.warn_limit, setting.soft_warn
         else:
@@ -219,6 +271,16 @@ def get_warn_setting(chat_id):
         SESSION.close()
 
 
+@async_query(get_warn_setting)
+async def get_warn_setting_async(session, chat_id):
+    setting = await session.get(WarnSettings, int(chat_id), execution_options={"cache": True})
+    if setting:
+        return setting.warn_limit, setting.soft_warn
+    return 3, False
+
+
+@stat_counter("warns", Warns)
+@replica_read
 def num_warns():
     try:
         return SESSION.query(func.sum(Warns.num_warns)).scalar() or 0
@@ -226,6 +288,8 @@ def num_warns():
         SESSION.close()
 
 
+@stat_counter("warn_chats", Warns)
+@replica_read
 def num_warn_chats():
     try:
         return SESSION.query(func.count(distinct(Warns.chat_id))).scalar()
@@ -233,6 +297,8 @@ def num_warn_chats():
         SESSION.close()
 
 
+@stat_counter("warn_filters", WarnFilters, rows=True)
+@replica_read
 def num_warn_filters():
     try:
         return SESSION.query(WarnFilters).count()
@@ -240,17 +306,20 @@ def num_warn_filters():
         SESSION.close()
 
 
+@replica_read
 def num_warn_chat_filters(chat_id):
     try:
         return (
             SESSION.query(WarnFilters.chat_id)
-            .filter(WarnFilters.chat_id == str(chat_id))
+            .filter(WarnFilters.chat_id == int(chat_id))
             .count()
         )
     finally:
         SESSION.close()
 
 
+@stat_counter("warn_filter_chats", WarnFilters)
+@replica_read
 def num_warn_filter_chats():
     try:
         return SESSION.query(func.count(distinct(WarnFilters.chat_id))).scalar()
@@ -258,16 +327,12 @@ def num_warn_filter_chats():
         SESSION.close()
 
 
+@startup_loader("warns")
 def __load_chat_warn_filters():
     global WARN_FILTERS
     try:
-        chats = SESSION.query(WarnFilters.chat_id).distinct().all()
-        for (chat_id,) in chats:  # remove tuple by ( ,)
-            WARN_FILTERS[chat_id] = []
-
-        all_filters = SESSION.query(WarnFilters).all()
-        for x in all_filters:
-            WARN_FILTERS[x.chat_id] += [x.keyword]
+        for chat_id, keyword in SESSION.query(WarnFilters.chat_id, WarnFilters.keyword):
+            WARN_FILTERS.setdefault(chat_id, []).append(keyword)
 
         WARN_FILTERS = {
             x: sorted(set(y), key=lambda i: (-len(i), i))
@@ -278,36 +343,35 @@ def __load_chat_warn_filters():
         SESSION.close()
 
 
+@needs_cache("warns")
 def migrate_chat(old_chat_id, new_chat_id):
     with WARN_INSERTION_LOCK:
         chat_notes = (
-            SESSION.query(Warns).filter(Warns.chat_id == str(old_chat_id)).all()
+            SESSION.query(Warns).filter(Warns.chat_id == int(old_chat_id)).all()
         )
         for note in chat_notes:
-            note.chat_id = str(new_chat_id)
+            note.chat_id = int(new_chat_id)
         SESSION.commit()
 
     with WARN_FILTER_INSERTION_LOCK:
         chat_filters = (
             SESSION.query(WarnFilters)
-            .filter(WarnFilters.chat_id == str(old_chat_id))
+            .filter(WarnFilters.chat_id == int(old_chat_id))
             .all()
         )
         for filt in chat_filters:
-            filt.chat_id = str(new_chat_id)
+            filt.chat_id = int(new_chat_id)
         SESSION.commit()
-        WARN_FILTERS[str(new_chat_id)] = WARN_FILTERS[str(old_chat_id)]
-        del WARN_FILTERS[str(old_chat_id)]
+        WARN_FILTERS[int(new_chat_id)] = WARN_FILTERS[int(old_chat_id)]
+        del WARN_FILTERS[int(old_chat_id)]
+        WARN_FILTER_INDEX.migrate(old_chat_id, new_chat_id)
 
     with WARN_SETTINGS_LOCK:
         chat_settings = (
             SESSION.query(WarnSettings)
-            .filter(WarnSettings.chat_id == str(old_chat_id))
+            .filter(WarnSettings.chat_id == int(old_chat_id))
             .all()
         )
         for setting in chat_settings:
-            setting.chat_id = str(new_chat_id)
+            setting.chat_id = int(new_chat_id)
         SESSION.commit()
-
-
-__load_chat_warn_filters()
@@ -3,8 +3,8 @@ import threading
 from typing import Union
 
 from tg_bot.modules.helper_funcs.msg_types import Types
-from tg_bot.modules.sql import BASE, SESSION
-from sqlalchemy import BigInteger, Boolean, Column, Integer, String, UnicodeText
+from tg_bot.modules.sql import BASE, ChatId, SESSION, async_query, replica_read
+from sqlalchemy import BigInteger, Boolean, Column, Integer, UnicodeText, select
 
 DEFAULT_WELCOME = "Hey {first}, how are you?"
 DEFAULT_GOODBYE = "Nice knowing ya!"
@@ -212,7 +212,7 @@ DEFAULT_GOODBYE_MESSAGES = [
 
 class Welcome(BASE):
     __tablename__ = "welcome_pref"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     should_welcome = Column(Boolean, default=True)
     should_goodbye = Column(Boolean, default=True)
     custom_content = Column(UnicodeText, default=None)
@@ -241,13 +241,13 @@ class Welcome(BASE):
 class WelcomeButtons(BASE):
     __tablename__ = "welcome_urls"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     name = Column(UnicodeText, nullable=False)
     url = Column(UnicodeText, nullable=False)
     same_line = Column(Boolean, default=False)
 
     def __init__(self, chat_id, name, url, same_line=False):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.name = name
         self.url = url
         self.same_line = same_line
@@ -256,13 +256,13 @@ class WelcomeButtons(BASE):
 class GoodbyeButtons(BASE):
     __tablename__ = "leave_urls"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     name = Column(UnicodeText, nullable=False)
     url = Column(UnicodeText, nullable=False)
     same_line = Column(Boolean, default=False)
 
     def __init__(self, chat_id, name, url, same_line=False):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.name = name
         self.url = url
         self.same_line = same_line
@@ -270,47 +270,47 @@ class GoodbyeButtons(BASE):
 
 class WelcomeMute(BASE):
     __tablename__ = "welcome_mutes"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     welcomemutes = Column(UnicodeText, default=False)
 
     def __init__(self, chat_id, welcomemutes):
-        self.chat_id = str(chat_id)  # ensure string
+        self.chat_id = int(chat_id)
         self.welcomemutes = welcomemutes
 
 
 class WelcomeMuteUsers(BASE):
     __tablename__ = "human_checks"
     user_id = Column(BigInteger, primary_key=True)
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     human_check = Column(Boolean)
 
     def __init__(self, user_id, chat_id, human_check):
         self.user_id = user_id  # ensure string
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.human_check = human_check
 
 
 class CleanServiceSetting(BASE):
     __tablename__ = "clean_service"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     clean_service = Column(Boolean, default=True)
 
     def __init__(self, chat_id):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
 
     def __repr__(self):
         return "<Chat used clean service ({})>".format(self.chat_id)
 
 class RaidMode(BASE):
     __tablename__ = "raid_mode"
-    chat_id = Column(String(14), primary_key=True)
+    chat_id = Column(ChatId, primary_key=True)
     status = Column(Boolean, default=False)
     time = Column(Integer, default=21600)
     acttime = Column(Integer, default=3600)
     # permanent = Column(Boolean, default=False)
 
     def __init__(self, chat_id, status, time, acttime):
-        self.chat_id = str(chat_id)
+        self.chat_id = int(chat_id)
         self.status = status
         self.time = time
         self.acttime = acttime
@@ -329,7 +329,7 @@ RAID_LOCK = threading.RLock()
 
 def welcome_mutes(chat_id):
     try:
-        welcomemutes = SESSION.query(WelcomeMute).get(str(chat_id))
+        welcomemutes = SESSION.query(WelcomeMute).get(int(chat_id))
         if welcomemutes:
             return welcomemutes.welcomemutes
         return False
@@ -339,19 +339,19 @@ def welcome_mutes(chat_id):
 
 def set_welcome_mutes(chat_id, welcomemutes):
     with WM_LOCK:
-        prev = SESSION.query(WelcomeMute).get((str(chat_id)))
+        prev = SESSION.query(WelcomeMute).get((int(chat_id)))
         if prev:
             SESSION.delete(prev)
-        welcome_m = WelcomeMute(str(chat_id), welcomemutes)
+        welcome_m = WelcomeMute(int(chat_id), welcomemutes)
         SESSION.add(welcome_m)
         SESSION.commit()
 
 
 def set_human_checks(user_id, chat_id):
     with INSERTION_LOCK:
-        human_check = SESSION.query(WelcomeMuteUsers).get((user_id, str(chat_id)))
+        human_check = SESSION.query(WelcomeMuteUsers).get((user_id, int(chat_id)))
         if not human_check:
-            human_check = WelcomeMuteUsers(user_id, str(chat_id), True)
+            human_check = WelcomeMuteUsers(user_id, int(chat_id), True)
 
         else:
             human_check.human_check = True
@@ -364,7 +364,7 @@ def set_human_checks(user_id, chat_id):
 
 def get_human_checks(user_id, chat_id):
     try:
-        human_check = SESSION.query(WelcomeMuteUsers).get((user_id, str(chat_id)))
+        human_check = SESSION.query(WelcomeMuteUsers).get((user_id, int(chat_id)))
         if not human_check:
             return None
         human_check = human_check.human_check
@@ -374,7 +374,7 @@ def get_human_checks(user_id, chat_id):
 
 
 def get_welc_mutes_pref(chat_id):
-    welcomemutes = SESSION.query(WelcomeMute).get(str(chat_id))
+    welcomemutes = SESSION.query(WelcomeMute).get(int(chat_id))
     SESSION.close()
 
     if welcomemutes:
@@ -383,9 +383,7 @@ def get_welc_mutes_pref(chat_id):
     return False
 
 
-def get_welc_pref(chat_id):
-    welc = SESSION.query(Welcome).get(str(chat_id))
-    SESSION.close()
+def _welc_pref(welc):
     if welc:
         return (
             welc.should_welcome,
@@ -399,9 +397,7 @@ def get_welc_pref(chat_id):
         return True, DEFAULT_WELCOME, None, Types.TEXT
 
 
-def get_gdbye_pref(chat_id):
-    welc = SESSION.query(Welcome).get(str(chat_id))
-    SESSION.close()
+def _gdbye_pref(welc):
     if welc:
         return welc.should_goodbye, welc.custom_leave, welc.leave_type
     else:
@@ -409,11 +405,39 @@ def get_gdbye_pref(chat_id):
         return True, DEFAULT_GOODBYE, Types.TEXT
 
 
+@replica_read
+def get_welc_pref(chat_id):
+    welc = SESSION.query(Welcome).execution_options(cache=True).get(int(chat_id))
+    SESSION.close()
+    return _welc_pref(welc)
+
+
+@async_query(get_welc_pref)
+async def get_welc_pref_async(session, chat_id):
+    return _welc_pref(
+        await session.get(Welcome, int(chat_id), execution_options={"cache": True})
+    )
+
+
+@replica_read
+def get_gdbye_pref(chat_id):
+    welc = SESSION.query(Welcome).execution_options(cache=True).get(int(chat_id))
+    SESSION.close()
+    return _gdbye_pref(welc)
+
+
+@async_query(get_gdbye_pref)
+async def get_gdbye_pref_async(session, chat_id):
+    return _gdbye_pref(
+        await session.get(Welcome, int(chat_id), execution_options={"cache": True})
+    )
+
+
 def set_clean_welcome(chat_id, clean_welcome):
     with INSERTION_LOCK:
-        curr = SESSION.query(Welcome).get(str(chat_id))
+        curr = SESSION.query(Welcome).get(int(chat_id))
         if not curr:
-            curr = Welcome(str(chat_id))
+            curr = Welcome(int(chat_id))
 
         curr.clean_welcome = int(clean_welcome)
 
@@ -422,7 +446,7 @@ def set_clean_welcome(chat_id, clean_welcome):
 
 
 def get_clean_pref(chat_id):
-    welc = SESSION.query(Welcome).get(str(chat_id))
+    welc = SESSION.query(Welcome).get(int(chat_id))
     SESSION.close()
 
     if welc:
@@ -431,11 +455,17 @@ def get_clean_pref(chat_id):
     return False
 
 
+@async_query(get_clean_pref)
+async def get_clean_pref_async(session, chat_id):
+    welc = await session.get(Welcome, int(chat_id))
+    return welc.clean_welcome if welc else False
+
+
 def set_welc_preference(chat_id, should_welcome):
     with INSERTION_LOCK:
-        curr = SESSION.query(Welcome).get(str(chat_id))
+        curr = SESSION.query(Welcome).get(int(chat_id))
         if not curr:
-            curr = Welcome(str(chat_id), should_welcome=should_welcome)
+            curr = Welcome(int(chat_id), should_welcome=should_welcome)
         else:
             curr.should_welcome = should_welcome
 
@@ -445,9 +475,9 @@ def set_welc_preference(chat_id, should_welcome):
 
 def set_gdbye_preference(chat_id, should_goodbye):
     with INSERTION_LOCK:
-        curr = SESSION.query(Welcome).get(str(chat_id))
+        curr = SESSION.query(Welcome).get(int(chat_id))
         if not curr:
-            curr = Welcome(str(chat_id), should_goodbye=should_goodbye)
+            curr = Welcome(int(chat_id), should_goodbye=should_goodbye)
         else:
             curr.should_goodbye = should_goodbye
 
@@ -462,9 +492,9 @@ def set_custom_welcome(
         buttons = []
 
     with INSERTION_LOCK:
-        welcome_settings = SESSION.query(Welcome).get(str(chat_id))
+        welcome_settings = SESSION.query(Welcome).get(int(chat_id))
         if not welcome_settings:
-            welcome_settings = Welcome(str(chat_id), True)
+            welcome_settings = Welcome(int(chat_id), True)
 
         if custom_welcome or custom_content:
             welcome_settings.custom_content = custom_content
@@ -480,7 +510,7 @@ def set_custom_welcome(
         with WELC_BTN_LOCK:
             prev_buttons = (
                 SESSION.query(WelcomeButtons)
-                .filter(WelcomeButtons.chat_id == str(chat_id))
+                .filter(WelcomeButtons.chat_id == int(chat_id))
                 .all()
             )
             for btn in prev_buttons:
@@ -494,7 +524,7 @@ def set_custom_welcome(
 
 
 def get_custom_welcome(chat_id):
-    welcome_settings = SESSION.query(Welcome).get(str(chat_id))
+    welcome_settings = SESSION.query(Welcome).get(int(chat_id))
     ret = DEFAULT_WELCOME
     if welcome_settings and welcome_settings.custom_welcome:
         ret = welcome_settings.custom_welcome
@@ -508,9 +538,9 @@ def set_custom_gdbye(chat_id, custom_goodbye, goodbye_type, buttons=None):
         buttons = []
 
     with INSERTION_LOCK:
-        welcome_settings = SESSION.query(Welcome).get(str(chat_id))
+        welcome_settings = SESSION.query(Welcome).get(int(chat_id))
         if not welcome_settings:
-            welcome_settings = Welcome(str(chat_id), True)
+            welcome_settings = Welcome(int(chat_id), True)
 
         if custom_goodbye:
             welcome_settings.custom_leave = custom_goodbye
@@ -525,7 +555,7 @@ def set_custom_gdbye(chat_id, custom_goodbye, goodbye_type, buttons=None):
         with LEAVE_BTN_LOCK:
             prev_buttons = (
                 SESSION.query(GoodbyeButtons)
-                .filter(GoodbyeButtons.chat_id == str(chat_id))
+                .filter(GoodbyeButtons.chat_id == int(chat_id))
                 .all()
             )
             for btn in prev_buttons:
@@ -539,7 +569,7 @@ def set_custom_gdbye(chat_id, custom_goodbye, goodbye_type, buttons=None):
 
 
 def get_custom_gdbye(chat_id):
-    welcome_settings = SESSION.query(Welcome).get(str(chat_id))
+    welcome_settings = SESSION.query(Welcome).get(int(chat_id))
     ret = DEFAULT_GOODBYE
     if welcome_settings and welcome_settings.custom_leave:
         ret = welcome_settings.custom_leave
@@ -552,7 +582,7 @@ def get_welc_buttons(chat_id):
     try:
         return (
             SESSION.query(WelcomeButtons)
-            .filter(WelcomeButtons.chat_id == str(chat_id))
+            .filter(WelcomeButtons.chat_id == int(chat_id))
             .order_by(WelcomeButtons.id)
             .all()
         )
@@ -560,11 +590,21 @@ def get_welc_buttons(chat_id):
         SESSION.close()
 
 
+@async_query(get_welc_buttons)
+async def get_welc_buttons_async(session, chat_id):
+    result = await session.scalars(
+        select(WelcomeButtons)
+        .where(WelcomeButtons.chat_id == int(chat_id))
+        .order_by(WelcomeButtons.id)
+    )
+    return result.all()
+
+
 def get_gdbye_buttons(chat_id):
     try:
         return (
             SESSION.query(GoodbyeButtons)
-            .filter(GoodbyeButtons.chat_id == str(chat_id))
+            .filter(GoodbyeButtons.chat_id == int(chat_id))
             .order_by(GoodbyeButtons.id)
             .all()
         )
@@ -572,9 +612,19 @@ def get_gdbye_buttons(chat_id):
         SESSION.close()
 
 
+@async_query(get_gdbye_buttons)
+async def get_gdbye_buttons_async(session, chat_id):
+    result = await session.scalars(
+        select(GoodbyeButtons)
+        .where(GoodbyeButtons.chat_id == int(chat_id))
+        .order_by(GoodbyeButtons.id)
+    )
+    return result.all()
+
+
 def clean_service(chat_id: Union[str, int]) -> bool:
     try:
-        chat_setting = SESSION.query(CleanServiceSetting).get(str(chat_id))
+        chat_setting = SESSION.query(CleanServiceSetting).get(int(chat_id))
         if chat_setting:
             return chat_setting.clean_service
         return False
@@ -584,7 +634,7 @@ def clean_service(chat_id: Union[str, int]) -> bool:
 
 def set_clean_service(chat_id: Union[int, str], setting: bool):
     with CS_LOCK:
-        chat_setting = SESSION.query(CleanServiceSetting).get(str(chat_id))
+        chat_setting = SESSION.query(CleanServiceSetting).get(int(chat_id))
         if not chat_setting:
             chat_setting = CleanServiceSetting(chat_id)
 
@@ -595,33 +645,33 @@ def set_clean_service(chat_id: Union[int, str], setting: bool):
 
 def migrate_chat(old_chat_id, new_chat_id):
     with INSERTION_LOCK:
-        chat = SESSION.query(Welcome).get(str(old_chat_id))
+        chat = SESSION.query(Welcome).get(int(old_chat_id))
         if chat:
-            chat.chat_id = str(new_chat_id)
+            chat.chat_id = int(new_chat_id)
 
         with WELC_BTN_LOCK:
             chat_buttons = (
                 SESSION.query(WelcomeButtons)
-                .filter(WelcomeButtons.chat_id == str(old_chat_id))
+                .filter(WelcomeButtons.chat_id == int(old_chat_id))
                 .all()
             )
             for btn in chat_buttons:
-                btn.chat_id = str(new_chat_id)
+                btn.chat_id = int(new_chat_id)
 
         with LEAVE_BTN_LOCK:
             chat_buttons = (
                 SESSION.query(GoodbyeButtons)
-                .filter(GoodbyeButtons.chat_id == str(old_chat_id))
+                .filter(GoodbyeButtons.chat_id == int(old_chat_id))
                 .all()
             )
             for btn in chat_buttons:
-                btn.chat_id = str(new_chat_id)
+                btn.chat_id = int(new_chat_id)
 
         SESSION.commit()
 
 def getRaidStatus(chat_id):
     try:
-        if stat := SESSION.query(RaidMode).get(str(chat_id)):
+        if stat := SESSION.query(RaidMode).get(int(chat_id)):
             return stat.status, stat.time, stat.acttime
         return False, 21600, 3600 #default
     finally:
@@ -630,19 +680,19 @@ def getRaidStatus(chat_id):
 
 def setRaidStatus(chat_id, status, time=21600, acttime=3600):
     with RAID_LOCK:
-        if prevObj := SESSION.query(RaidMode).get(str(chat_id)):
+        if prevObj := SESSION.query(RaidMode).get(int(chat_id)):
             SESSION.delete(prevObj)
-        newObj = RaidMode(str(chat_id), status, time, acttime)
+        newObj = RaidMode(int(chat_id), status, time, acttime)
         SESSION.add(newObj)
         SESSION.commit()
 
 def toggleRaidStatus(chat_id):
     newObj = True
     with RAID_LOCK:
-        prevObj = SESSION.query(RaidMode).get(str(chat_id))
+        prevObj = SESSION.query(RaidMode).get(int(chat_id))
         if prevObj:
             newObj = not prevObj.status
-        stat = RaidMode(str(chat_id), newObj, prevObj.time or 21600, prevObj.acttime or 3600)
+        stat = RaidMode(int(chat_id), newObj, prevObj.time or 21600, prevObj.acttime or 3600)
         SESSION.add(stat)
         SESSION.commit()
         return newObj
@@ -20,7 +20,7 @@ from tg_bot.modules.helper_funcs.misc import split_message
 from tg_bot.modules.helper_funcs.string_handling import extract_time
 from tg_bot.modules.language import gs
 from tg_bot.modules.log_channel import loggable
-from tg_bot.modules.sql.approve_sql import is_approved
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 from tg_bot.modules.warns import warn
 
 
@@ -94,20 +94,8 @@ async def add_blackliststicker(update: Update, context: ContextTypes.DEFAULT_TYP
         text = words[1].replace("https://t.me/addstickers/", "")
         to_blacklist = list({trigger.strip() for trigger in text.split("\n") if trigger.strip()})
 
-        added = 0
-        for trigger in to_blacklist:
-            try:
-                sql.add_to_stickers(chat_id, trigger.lower())
-                added += 1
-            except BadRequest:
-                await send_message(
-                    update.effective_message,
-                    f"Sticker `{trigger}` can not be found!",
-                    parse_mode=ParseMode.MARKDOWN,
-                )
-
-        if added == 0:
-            return
+        sql.add_many_to_stickers(chat_id, [trigger.lower() for trigger in to_blacklist])
+        added = len(to_blacklist)
 
         if len(to_blacklist) == 1:
             await send_message(
@@ -183,11 +171,9 @@ async def unblackliststicker(update: Update, context: ContextTypes.DEFAULT_TYPE)
         text = words[1].replace("https://t.me/addstickers/", "")
         to_unblacklist = list({trigger.strip() for trigger in text.split("\n") if trigger.strip()})
 
-        successful = 0
-        for trigger in to_unblacklist:
-            success = sql.rm_from_stickers(chat_id, trigger.lower())
-            if success:
-                successful += 1
+        successful = sql.rm_many_from_stickers(
+            chat_id, [trigger.lower() for trigger in to_unblacklist]
+        )
 
         if len(to_unblacklist) == 1:
             if successful:
@@ -381,108 +367,107 @@ async def del_blackliststicker(update: Update, context: ContextTypes.DEFAULT_TYP
     if not to_match or not to_match.set_name:
         return
 
-    if is_approved(chat.id, user.id):
+    mode = sql.get_sticker_blacklist_mode(chat.id, to_match.set_name)
+    if mode is None:
         return
-    getmode, value = sql.get_blacklist_setting(chat.id)
-
-    chat_filters = sql.get_chat_stickers(chat.id)
-    for trigger in chat_filters:
-        if to_match.set_name.lower() == trigger.lower():
-            try:
-                if getmode == 0:
-                    return
-                elif getmode == 1:
-                    await message.delete()
-                elif getmode == 2:
-                    await message.delete()
-                    await warn(
-                        update.effective_user,
-                        update,
-                        "Using sticker '{}' which in blacklist stickers".format(
-                            trigger,
-                        ),
-                        message,
-                        update.effective_user,
-                    )
-                    return
-                elif getmode == 3:
-                    await message.delete()
-                    await bot.restrict_chat_member(
-                        chat.id,
-                        update.effective_user.id,
-                        permissions=ChatPermissions(can_send_messages=False),
-                    )
-                    await bot.send_message(
-                        chat.id,
-                        "{} muted because using '{}' which in blacklist stickers".format(
-                            mention_markdown(user.id, user.first_name, version=2), trigger,
-                        ),
-                        parse_mode=ParseMode.MARKDOWN,
-                    )
-                    return
-                elif getmode == 4:
-                    await message.delete()
-                    res = await chat.unban_member(update.effective_user.id)
-                    if res:
-                        await bot.send_message(
-                            chat.id,
-                            "{} kicked because using '{}' which in blacklist stickers".format(
-                                mention_markdown(user.id, user.first_name, version=2), trigger,
-                            ),
-                            parse_mode=ParseMode.MARKDOWN,
-                        )
-                    return
-                elif getmode == 5:
-                    await message.delete()
-                    await chat.ban_member(user.id)
-                    await bot.send_message(
-                        chat.id,
-                        "{} banned because using '{}' which in blacklist stickers".format(
-                            mention_markdown(user.id, user.first_name, version=2), trigger,
-                        ),
-                        parse_mode=ParseMode.MARKDOWN,
-                    )
-                    return
-                elif getmode == 6:
-                    await message.delete()
-                    bantime = extract_time(message, value)
-                    await chat.ban_member(user.id, until_date=bantime)
-                    await bot.send_message(
-                        chat.id,
-                        "{} banned for {} because using '{}' which in blacklist stickers".format(
-                            mention_markdown(user.id, user.first_name, version=2), value, trigger,
-                        ),
-                        parse_mode=ParseMode.MARKDOWN,
-                    )
-                    return
-                elif getmode == 7:
-                    await message.delete()
-                    mutetime = extract_time(message, value)
-                    await bot.restrict_chat_member(
-                        chat.id,
-                        user.id,
-                        permissions=ChatPermissions(can_send_messages=False),
-                        until_date=mutetime,
-                    )
-                    await bot.send_message(
-                        chat.id,
-                        "{} muted for {} because using '{}' which in blacklist stickers".format(
-                            mention_markdown(user.id, user.first_name, version=2), value, trigger,
-                        ),
-                        parse_mode=ParseMode.MARKDOWN,
-                    )
-                    return
-            except BadRequest as excp:
-                if excp.message != "Message to delete not found":
-                    LOGGER.exception("Error while deleting blacklist message.")
-                break
+    if get_moderation_context(update, context).is_approved:
+        return
+
+    getmode, value = mode
+    trigger = to_match.set_name
+    try:
+        if getmode == 0:
+            return
+        elif getmode == 1:
+            await message.delete()
+        elif getmode == 2:
+            await message.delete()
+            await warn(
+                update.effective_user,
+                update,
+                "Using sticker '{}' which in blacklist stickers".format(
+                    trigger,
+                ),
+                message,
+                update.effective_user,
+            )
+            return
+        elif getmode == 3:
+            await message.delete()
+            await bot.restrict_chat_member(
+                chat.id,
+                update.effective_user.id,
+                permissions=ChatPermissions(can_send_messages=False),
+            )
+            await bot.send_message(
+                chat.id,
+                "{} muted because using '{}' which in blacklist stickers".format(
+                    mention_markdown(user.id, user.first_name, version=2), trigger,
+                ),
+                parse_mode=ParseMode.MARKDOWN,
+            )
+            return
+        elif getmode == 4:
+            await message.delete()
+            res = await chat.unban_member(update.effective_user.id)
+            if res:
+                await bot.send_message(
+                    chat.id,
+                    "{} kicked because using '{}' which in blacklist stickers".format(
+                        mention_markdown(user.id, user.first_name, version=2), trigger,
+                    ),
+                    parse_mode=ParseMode.MARKDOWN,
+                )
+            return
+        elif getmode == 5:
+            await message.delete()
+            await chat.ban_member(user.id)
+            await bot.send_message(
+                chat.id,
+                "{} banned because using '{}' which in blacklist stickers".format(
+                    mention_markdown(user.id, user.first_name, version=2), trigger,
+                ),
+                parse_mode=ParseMode.MARKDOWN,
+            )
+            return
+        elif getmode == 6:
+            await message.delete()
+            bantime = extract_time(message, value)
+            await chat.ban_member(user.id, until_date=bantime)
+            await bot.send_message(
+                chat.id,
+                "{} banned for {} because using '{}' which in blacklist stickers".format(
+                    mention_markdown(user.id, user.first_name, version=2), value, trigger,
+                ),
+                parse_mode=ParseMode.MARKDOWN,
+            )
+            return
+        elif getmode == 7:
+            await message.delete()
+            mutetime = extract_time(message, value)
+            await bot.restrict_chat_member(
+                chat.id,
+                user.id,
+                permissions=ChatPermissions(can_send_messages=False),
+                until_date=mutetime,
+            )
+            await bot.send_message(
+                chat.id,
+                "{} muted for {} because using '{}' which in blacklist stickers".format(
+                    mention_markdown(user.id, user.first_name, version=2), value, trigger,
+                ),
+                parse_mode=ParseMode.MARKDOWN,
+            )
+            return
+    except BadRequest as excp:
+        if excp.message != "Message to delete not found":
+            LOGGER.exception("Error while deleting blacklist message.")
 
 
 def __import_data__(chat_id, data):
     # set chat blacklist
     blacklist = data.get("sticker_blacklist", {})
-    for trigger in blacklist:
-        sql.add_to_stickers(chat_id, trigger)
+    sql.add_many_to_stickers(chat_id, blacklist)
 
 
 def __migrate__(old_chat_id, new_chat_id):
@@ -1,13 +1,14 @@
 import contextlib
 from io import BytesIO
-from asyncio import sleep
 
 import tg_bot.modules.sql.users_sql as sql
+from tg_bot.modules.sql import run_blocking
 from tg_bot import DEV_USERS, log, OWNER_ID, application
-from tg_bot.modules.helper_funcs.chat_status import dev_plus, sudo_plus
+from tg_bot.modules.helper_funcs.broadcast import broadcast_pruner, resume_broadcasts, start_broadcast
+from tg_bot.modules.helper_funcs.chat_status import dev_plus, get_bot_member, sudo_plus
 from tg_bot.modules.sql.users_sql import get_all_users
 from telegram import Update
-from telegram.error import BadRequest, TelegramError
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
     ContextTypes,
@@ -140,41 +141,30 @@ async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             to_group = to_user = True
 
-        chats = sql.get_all_chats() or []
-        users = get_all_users()
-        failed = 0
-        failed_user = 0
-
+        targets = []
         if to_group:
-            for chat in chats:
-                try:
-                    await context.bot.send_message(
-                        int(chat.chat_id),
-                        to_send[1],
-                        parse_mode="MARKDOWN",
-                        disable_web_page_preview=True,
-                    )
-                    await sleep(0.1)
-                except TelegramError:
-                    failed += 1
+            targets += [int(chat_id) for chat_id in sql.get_all_chats() or []]
         if to_user:
-            for user in users:
-                try:
-                    await context.bot.send_message(
-                        int(user.user_id),
-                        to_send[1],
-                        parse_mode="MARKDOWN",
-                        disable_web_page_preview=True,
-                    )
-                    await sleep(0.1)
-                except TelegramError:
-                    failed_user += 1
-
-        await update.effective_message.reply_text(
-            f"Broadcast complete.\nGroups failed: {failed}.\nUsers failed: {failed_user}."
+            targets += [int(user_id) for user_id in get_all_users() or []]
+
+        status = await update.effective_message.reply_text("Broadcast started.")
+        await start_broadcast(
+            context.application,
+            targets,
+            to_send[1],
+            status=status,
+            prune="users",
+            parse_mode="MARKDOWN",
+            disable_web_page_preview=True,
         )
 
 
+@broadcast_pruner("users")
+def prune_broadcast_chat(chat_id):
+    # users who blocked the bot are still members of their groups, keep them
+    return chat_id < 0 and sql.rem_chat(chat_id)
+
+
 async def welcomeFilter(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_chat.type not in ["group", "supergroup"]:
         return
@@ -286,7 +276,7 @@ async def chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
 @rate_limit(50, 60)
 async def chat_checker(update: Update, context: ContextTypes.DEFAULT_TYPE):
     bot = context.bot
-    member = await update.effective_chat.get_member(bot.id)
+    member = await get_bot_member(update.effective_chat, bot.id)
     can_send = getattr(member, "can_send_messages", None)
     if can_send is False:
         await bot.leave_chat(update.effective_chat.id)
@@ -328,6 +318,18 @@ application.add_handler(
     group=110,
 )
 
+async def flush_users(_: ContextTypes.DEFAULT_TYPE):
+    await run_blocking(sql.flush_user_buffer)
+
+
+if application.job_queue:
+    application.job_queue.run_repeating(
+        flush_users, interval=sql.USER_FLUSH_INTERVAL, first=sql.USER_FLUSH_INTERVAL
+    )
+    # a full buffer is flushed right away instead of waiting for the interval
+    sql.set_flush_trigger(lambda: application.job_queue.run_once(flush_users, 0))
+    application.job_queue.run_once(resume_broadcasts, 0)
+
 application.add_handler(USER_HANDLER, USERS_GROUP)
 application.add_handler(BROADCAST_HANDLER)
 application.add_handler(CHAT_CHECKER_HANDLER, CHAT_GROUP)
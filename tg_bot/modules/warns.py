@@ -13,7 +13,6 @@ from tg_bot.modules.helper_funcs.chat_status import (
 )
 from tg_bot.modules.helper_funcs.decorators import rate_limit
 from tg_bot.modules.helper_funcs.extraction import (
-    extract_text,
     extract_user,
     extract_user_and_text,
 )
@@ -21,8 +20,8 @@ from tg_bot.modules.helper_funcs.filters import CustomFilters
 from tg_bot.modules.helper_funcs.misc import split_message
 from tg_bot.modules.helper_funcs.string_handling import split_quotes
 from tg_bot.modules.log_channel import loggable
-from tg_bot.modules.sql import warns_sql as sql
-from tg_bot.modules.sql.approve_sql import is_approved
+from tg_bot.modules.sql import run_blocking, warns_sql as sql
+from tg_bot.modules.helper_funcs.update_context import get_moderation_context
 
 from telegram import (
     CallbackQuery,
@@ -83,10 +82,10 @@ async def warn(
     else:
         warner_tag = "Automated warn filter."
 
-    limit, soft_warn = sql.get_warn_setting(chat.id)
-    num_warns, reasons = sql.warn_user(user.id, chat.id, reason)
+    limit, soft_warn = await sql.get_warn_setting_async(chat.id)
+    num_warns, reasons = await sql.warn_user_async(user.id, chat.id, reason)
     if num_warns >= limit:
-        sql.reset_warns(user.id, chat.id)
+        await run_blocking(sql.reset_warns, user.id, chat.id)
         if soft_warn:
             # Soft action = kick (ban + unban pattern)
             await chat.ban_member(user.id)
@@ -349,19 +348,18 @@ async def reply_filter(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Op
 
     if user.id == 777000:
         return
-    if is_approved(chat.id, user.id):
+    mod_ctx = get_moderation_context(update, context)
+    if mod_ctx.is_approved:
         return
 
-    chat_warn_filters = sql.get_chat_warn_triggers(chat.id)
-    to_match = extract_text(message)
+    to_match = mod_ctx.text
     if not to_match:
         return ""
 
-    for keyword in chat_warn_filters:
-        pattern = r"( |^|[^\w])" + re.escape(keyword) + r"( |$|[^\w])"
-        if re.search(pattern, to_match, flags=re.IGNORECASE):
-            warn_filter = sql.get_warn_filter(chat.id, keyword)
-            return await warn(user, update, warn_filter.reply, message)
+    keyword = sql.match_warn_filter(chat.id, to_match)
+    if keyword:
+        warn_filter = await sql.get_warn_filter_async(chat.id, keyword)
+        return await warn(user, update, warn_filter.reply, message)
     return ""
 
 
@@ -27,6 +27,7 @@ from telegram.helpers import mention_html
 from tg_bot.modules.helper_funcs.decorators import rate_limit, kigmsg
 from tg_bot.modules.helper_funcs.filters import CustomFilters  # if used elsewhere
 import tg_bot.modules.sql.welcome_sql as sql
+from tg_bot.modules.sql import run_blocking
 from tg_bot import (
     DEV_USERS,
     SYS_ADMIN,
@@ -202,10 +203,10 @@ async def new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):  # sou
         )
         log_setting = logsql.get_chat_setting(chat.id)
 
-    should_welc, cust_welcome, cust_content, welc_type = sql.get_welc_pref(chat.id)
-    welc_mutes = sql.welcome_mutes(chat.id)
-    human_checks = sql.get_human_checks(user.id, chat.id)
-    raid, _, deftime = sql.getRaidStatus(str(chat.id))
+    should_welc, cust_welcome, cust_content, welc_type = await sql.get_welc_pref_async(chat.id)
+    welc_mutes = await run_blocking(sql.welcome_mutes, chat.id)
+    human_checks = await run_blocking(sql.get_human_checks, user.id, chat.id)
+    raid, _, deftime = await run_blocking(sql.getRaidStatus, str(chat.id))
 
     new_mem = update.chat_member.new_chat_member.user
 
@@ -225,7 +226,7 @@ async def new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):  # sou
         if new_mem.id == bot.id:
             return
         else:
-            buttons = sql.get_welc_buttons(chat.id)
+            buttons = await sql.get_welc_buttons_async(chat.id)
             keyb = build_keyboard(buttons)
 
             if welc_type not in (sql.Types.TEXT, sql.Types.BUTTON_TEXT):
@@ -458,7 +459,7 @@ async def new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):  # sou
         else:
             sent = await send(update, context, res, keyboard, backup_message)
 
-        prev_welc = sql.get_clean_pref(chat.id)
+        prev_welc = await sql.get_clean_pref_async(chat.id)
         if prev_welc:
             with contextlib.suppress(BadRequest, TelegramError):
                 await bot.delete_message(chat.id, prev_welc)
@@ -528,7 +529,7 @@ async def left_member(update: Update, context: ContextTypes.DEFAULT_TYPE):  # so
     bot = context.bot
     chat = update.effective_chat
     user = update.effective_user
-    should_goodbye, cust_goodbye, goodbye_type = sql.get_gdbye_pref(chat.id)
+    should_goodbye, cust_goodbye, goodbye_type = await sql.get_gdbye_pref_async(chat.id)
 
     if user.id == bot.id:
         return
@@ -579,7 +580,7 @@ async def left_member(update: Update, context: ContextTypes.DEFAULT_TYPE):  # so
                     chatname=_esc(chat.title),
                     id=left_mem.id,
                 )
-                buttons = sql.get_gdbye_buttons(chat.id)
+                buttons = await sql.get_gdbye_buttons_async(chat.id)
                 keyb = build_keyboard(buttons)
             else:
                 res = random.choice(sql.DEFAULT_GOODBYE_MESSAGES).format(first=_esc(first_name))